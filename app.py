@@ -1,7 +1,11 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from dotenv import load_dotenv
+from collections import deque
 import logging
 import os
+import queue
+import threading
 
 # Importa as ferramentas para apresentar 
 from src.tools import (
@@ -11,7 +15,8 @@ from src.tools import (
 )
 
 # Importa o agente do projeto
-from src.biblia_agent import BibliaAgent
+from src.biblia_agent import obter_agente
+from src import tracing
 
 # Configuração de página (precisa vir antes de qualquer output)
 st.set_page_config(
@@ -61,31 +66,73 @@ root_logger.setLevel(level)
 # Captura warnings do módulo warnings no logging
 logging.captureWarnings(True)
 
-# Handler de logging para exibir logs em tempo real no Streamlit durante a inicialização
+# Handler de logging para exibir logs em tempo real no Streamlit durante a inicialização.
+# emit() só enfileira o registro, sem bloquear quem está logando (ex.: a indexação); uma
+# thread de fundo formata os registros em um buffer circular e redesenha a área de logs
+# no máximo uma vez a cada `intervalo` segundos
 class StreamlitLogHandler(logging.Handler):
-    def __init__(self, placeholder: "st.delta_generator.DeltaGenerator"):
+    def __init__(self, placeholder: "st.delta_generator.DeltaGenerator", max_linhas: int = 300, intervalo: float = 0.25):
         super().__init__()
         self.placeholder = placeholder
-        self.logs = []
+        self.intervalo = intervalo
+        # Mantém apenas as últimas linhas para evitar crescer indefinidamente
+        self.logs = deque(maxlen=max_linhas)
+        self.fila = queue.SimpleQueue()
         self.setFormatter(logging.Formatter(
             fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
             datefmt="%H:%M:%S"
         ))
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._descarregar_periodicamente, name="streamlit-log-flush", daemon=True)
+        # A thread precisa do contexto da sessão para poder atualizar o placeholder
+        add_script_run_ctx(self._thread, get_script_run_ctx())
+        self._thread.start()
 
     def emit(self, record: logging.LogRecord) -> None:
-        try:
-            msg = self.format(record)
-            self.logs.append(msg)
-            # Mantém apenas as últimas 300 linhas para evitar crescer indefinidamente
-            if len(self.logs) > 300:
-                self.logs = self.logs[-300:]
-            self.placeholder.code("\n".join(self.logs), language="text")
-        except Exception:
-            # Não deixa o logging quebrar o app
-            pass
-
-# Garante uma única instância do agente por sessão do usuário e mostra tela de carregamento com logs
-if "agent" not in st.session_state:
+        self.fila.put_nowait(record)
+
+    def _descarregar(self) -> None:
+        novos = False
+        while True:
+            try:
+                record = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self.logs.append(self.format(record))
+                novos = True
+            except Exception:
+                pass
+        if novos:
+            try:
+                self.placeholder.code("\n".join(self.logs), language="text")
+            except Exception:
+                # Não deixa o logging quebrar o app
+                pass
+
+    def _descarregar_periodicamente(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            self._descarregar()
+
+    def close(self) -> None:
+        self._parar.set()
+        self._thread.join(timeout=self.intervalo + 1.0)
+        # Registros emitidos depois do último ciclo da thread ainda estão na fila
+        self._descarregar()
+        super().close()
+
+# Recursos pesados (modelo de embedding, cliente Chroma, índices) são compartilhados por
+# todas as sessões do processo; por sessão guardamos apenas o histórico da conversa
+@st.cache_resource(show_spinner=False)
+def carregar_agente():
+    return obter_agente()
+
+if "historico" not in st.session_state:
+    st.session_state.historico = []
+
+# Mostra a tela de carregamento com logs apenas na primeira vez da sessão; nas execuções
+# seguintes o agente vem direto do cache de recursos do processo
+if "agente_carregado" not in st.session_state:
     loading_container = st.container()
     with loading_container:
         log_area = st.empty()
@@ -94,13 +141,15 @@ if "agent" not in st.session_state:
 
         try:
             with st.spinner("Carregando recursos (ChromaDB, embeddings, coleções)..."):
-                # A criação do agente deverá emitir logs que aparecerão acima em tempo real
-                st.session_state.agent = BibliaAgent()
+                # Na primeira carga do processo, a criação do agente emite logs que aparecem acima em tempo real
+                carregar_agente()
+                st.session_state.agente_carregado = True
         except Exception as e:
             st.error(f"Falha na inicialização: {e}")
         finally:
-            # Remove o handler para evitar logs duplicados após a inicialização
+            # Remove o handler (e para a thread de atualização) para evitar logs duplicados após a inicialização
             root_logger.removeHandler(handler)
+            handler.close()
             # Limpa a área de logs e o container de carregamento
             try:
                 log_area.empty()
@@ -108,7 +157,7 @@ if "agent" not in st.session_state:
                 pass
             loading_container.empty()
 
-agent = st.session_state.get("agent")
+agent = carregar_agente() if st.session_state.get("agente_carregado") else None
 if agent is None:
     st.stop()
 
@@ -125,15 +174,83 @@ with tabs[0]:
     st.subheader("Pergunte algo relacionado à Bíblia")
     question = st.text_area("Sua pergunta", placeholder="Ex.: O que a Bíblia ensina sobre perdão?", height=120)
     ask_clicked = st.button("Perguntar", type="primary", use_container_width=True)
+    depuracao = st.toggle("Painel de depuração (tempo por etapa)", key="depuracao")
 
     if ask_clicked:
-        with st.spinner("Consultando o agente..."):
-            try:
-                answer = agent.ask(question)
-                st.markdown("**Resposta:**")
-                st.write(answer)
-            except Exception as e:
-                st.error(f"Erro ao consultar o agente: {e}")
+        # Passos intermediários e tokens da resposta final aparecem conforme chegam
+        status = st.status("Consultando o agente...", expanded=False)
+        st.markdown("**Resposta:**")
+        resposta_area = st.empty()
+        parcial = ""
+        try:
+            answer = None
+            trace = None
+            for evento in agent.stream(question):
+                if evento["tipo"] == "ferramenta":
+                    status.write(f"🔧 `{evento['nome']}` ← {evento['entrada']}")
+                elif evento["tipo"] == "observacao":
+                    status.code(evento["conteudo"][:1500], language="text")
+                elif evento["tipo"] == "token":
+                    parcial += evento["conteudo"]
+                    resposta_area.markdown(parcial)
+                elif evento["tipo"] == "resposta":
+                    answer = evento["conteudo"]
+                    resposta_area.markdown(answer)
+                elif evento["tipo"] == "trace":
+                    trace = evento["dados"]
+            status.update(label="Consulta concluída", state="complete")
+            if answer is not None:
+                st.session_state.historico.append({"pergunta": question, "resposta": answer})
+            if agent.answer_cache is not None:
+                cache = agent.answer_cache.stats()
+                st.caption(
+                    f"Cache de respostas: {cache['itens']} itens, {cache['hits']} hits, "
+                    f"{cache['misses']} misses (taxa de acerto {cache['hit_rate']:.0%})"
+                )
+            if depuracao and trace is not None:
+                with st.expander("Depuração: tempo por etapa desta pergunta", expanded=True):
+                    st.markdown(
+                        f"**Total:** {trace['duracao_ms']:.0f} ms · "
+                        f"**Caminho:** {trace['atributos'].get('caminho', '-')} · "
+                        f"**Trace:** `{trace['trace_id']}`"
+                    )
+                    st.json(trace["contadores"], expanded=False)
+                    # Indenta cada etapa pela profundidade do span na árvore
+                    pais = {s["id"]: s["pai"] for s in trace["spans"]}
+
+                    def profundidade(span_id):
+                        nivel = 0
+                        while pais.get(span_id) is not None:
+                            span_id, nivel = pais[span_id], nivel + 1
+                        return nivel
+
+                    st.dataframe(
+                        [
+                            {
+                                "etapa": "  " * profundidade(s["id"]) + s["nome"],
+                                "início (ms)": s["inicio_ms"],
+                                "duração (ms)": s["duracao_ms"],
+                                "detalhes": ", ".join(f"{k}={v}" for k, v in s["atributos"].items()),
+                            }
+                            for s in trace["spans"]
+                        ],
+                        use_container_width=True,
+                        hide_index=True,
+                    )
+        except Exception as e:
+            status.update(label="Falha na consulta", state="error")
+            st.error(f"Erro ao consultar o agente: {e}")
+
+    if depuracao and tracing.traces_recentes():
+        with st.expander("Depuração: etapas mais lentas nas últimas requisições"):
+            st.dataframe(tracing.resumo_etapas(), use_container_width=True, hide_index=True)
+
+    if st.session_state.historico:
+        with st.expander("Histórico desta sessão"):
+            for item in reversed(st.session_state.historico):
+                st.markdown(f"**Pergunta:** {item['pergunta']}")
+                st.write(item["resposta"])
+                st.divider()
 
 # ------------------------- Aba 2: Leitura por Capítulo ------------------------- #
 with tabs[1]:
@@ -178,6 +295,11 @@ with tabs[3]:
             try:
                 res = buscar_versiculos_semantica(semantica_query)
                 st.code(res)
+                cache = agent.retrieval.estatisticas_cache()
+                st.caption(
+                    f"Cache de embeddings: {cache['hits']} hits, {cache['misses']} misses, "
+                    f"{cache['evictions']} evictions (taxa de acerto {cache['hit_rate']:.0%})"
+                )
             except Exception as e:
                 st.error(f"Erro ao buscar semântica: {e}")
 
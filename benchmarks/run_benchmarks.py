@@ -0,0 +1,336 @@
+"""
+Suíte de benchmark da recuperação, executada offline (o LLM é substituído por um cliente
+falso local) e com saída em JSON para comparar regressões entre commits.
+
+Mede: partida a frio (imports, índices em memória, carga do modelo de embeddings e
+ensure_collections), construção dos índices, latência p50/p95/p99 de cada ferramenta,
+vazão com N chamadores simultâneos, pico de memória (RSS) e recall@k/MRR sobre um
+conjunto rotulado de perguntas -> versículos esperados.
+
+Uso:
+    python -m benchmarks.run_benchmarks --saida benchmarks/resultados/atual.json
+    python -m benchmarks.run_benchmarks --comparar benchmarks/resultados/base.json
+    python -m benchmarks.run_benchmarks --reindexar   # inclui a indexação completa em diretório temporário
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+PERGUNTAS_PATH = os.path.join(os.path.dirname(__file__), "perguntas_rotuladas.jsonl")
+RESULTADOS_DIR = os.path.join(os.path.dirname(__file__), "resultados")
+
+# Consultas do dicionário (termos do índice em português) por camada da busca: acerto
+# exato, erro de digitação (distância de edição) e só prefixo; e capítulos do resumo
+CONSULTAS_EASTON = {
+    "exato": ["Abraão", "Getsêmani", "Fariseus"],
+    "aproximado": ["Abrahão", "Getsemane", "Farizeus"],
+    "prefixo": ["Abra", "Getsê", "Fari"],
+}
+CONSULTAS_CAPITULO = ["Gênesis:1", "Êxodo:20", "Salmos:22", "Isaías:53", "Mateus:5", "João:3", "Romanos:8", "1 Coríntios:13"]
+
+logger = logging.getLogger("benchmarks")
+
+
+class FakeOpenAI:
+    """
+    Cliente OpenAI falso: responde chat.completions.create localmente, sem rede, com uma
+    latência simulada opcional, para que o custo medido seja apenas o da recuperação.
+    """
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.chamadas = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        conteudo = f"Resumo simulado: {messages[-1]['content'][-120:]}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=conteudo))])
+
+
+def pico_memoria_mb() -> float:
+    """
+    Pico de memória residente do processo até agora (ru_maxrss é KB no Linux e bytes no macOS).
+    """
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+
+def cronometrar(fn, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = fn(*args, **kwargs)
+    return resultado, round(time.perf_counter() - inicio, 4)
+
+
+def resumo_latencias(latencias: list[float]) -> dict:
+    ms = np.asarray(latencias) * 1000.0
+    return {
+        "n": len(ms),
+        "media_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def medir_latencia(fn, entradas: list, repeticoes: int) -> dict:
+    latencias = []
+    for _ in range(repeticoes):
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            fn(entrada)
+            latencias.append(time.perf_counter() - inicio)
+    return resumo_latencias(latencias)
+
+
+def medir_vazao(fn, entradas: list, chamadores: int, total: int) -> dict:
+    """
+    Executa `total` chamadas distribuídas entre `chamadores` threads simultâneas.
+    """
+    carga = [entradas[i % len(entradas)] for i in range(total)]
+    latencias = []
+
+    def chamar(entrada):
+        inicio = time.perf_counter()
+        fn(entrada)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=chamadores) as executor:
+        list(executor.map(chamar, carga))
+    segundos = time.perf_counter() - inicio
+    return {
+        "chamadores": chamadores,
+        "chamadas": total,
+        "segundos": round(segundos, 3),
+        "chamadas_por_segundo": round(total / segundos, 2),
+        "latencia": resumo_latencias(latencias),
+    }
+
+
+def carregar_perguntas(path: str, indice) -> tuple[list[dict], int]:
+    """
+    Lê o conjunto rotulado e resolve os livros esperados para os nomes do JSON da Bíblia
+    (ids no formato "Livro capítulo:versículo"). Itens sem nenhum livro resolvido são ignorados.
+    """
+    perguntas, ignoradas = [], 0
+    with open(path, "r", encoding="utf-8") as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            item = json.loads(linha)
+            esperados = set()
+            for ref in item["esperados"]:
+                livro_obj = indice.encontrar_livro(ref["livro"]) or indice.encontrar_livro(f"São {ref['livro']}")
+                if livro_obj is not None:
+                    esperados.add(f"{livro_obj['nome']} {ref['capitulo']}:{ref['versiculo']}")
+            if esperados:
+                perguntas.append({"pergunta": item["pergunta"], "esperados": esperados})
+            else:
+                ignoradas += 1
+    return perguntas, ignoradas
+
+
+def avaliar_qualidade(busca, perguntas: list[dict], ks: tuple[int, ...]) -> dict:
+    """
+    recall@k (fração das perguntas com algum versículo esperado entre os k primeiros) e MRR@max(k).
+    """
+    k_max = max(ks)
+    acertos = {k: 0 for k in ks}
+    rr_total = 0.0
+    for item in perguntas:
+        ids = [r["id"] for r in busca(item["pergunta"], k_max)]
+        posicao = next((i for i, doc_id in enumerate(ids) if doc_id in item["esperados"]), None)
+        if posicao is None:
+            continue
+        rr_total += 1.0 / (posicao + 1)
+        for k in ks:
+            if posicao < k:
+                acertos[k] += 1
+    n = len(perguntas)
+    resultado = {f"recall@{k}": round(acertos[k] / n, 4) if n else 0.0 for k in ks}
+    resultado[f"mrr@{k_max}"] = round(rr_total / n, 4) if n else 0.0
+    return resultado
+
+
+def commit_atual() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def executar(args) -> dict:
+    resultado = {
+        "metadados": {
+            "commit": commit_atual(),
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeticoes": args.repeticoes,
+            "cache_embeddings": args.cache_embeddings,
+            "vector_store": os.getenv("VECTOR_STORE", "chroma"),
+            "vector_store_precisao": os.getenv("VECTOR_STORE_PRECISION", "float32"),
+        },
+        "partida_a_frio_s": {},
+        "construcao_indices_s": {},
+        "memoria_mb": {"inicio": pico_memoria_mb()},
+    }
+    partida = resultado["partida_a_frio_s"]
+    construcao = resultado["construcao_indices_s"]
+    memoria = resultado["memoria_mb"]
+
+    # Imports ficam aqui para que a partida a frio inclua o custo do LangChain/Chroma
+    _, partida["import_tools"] = cronometrar(__import__, "src.tools")
+    import src.chromadb_utils as chromadb_utils
+    import src.llm_clients as llm_clients
+    from src import tools
+    from src.biblia_index import obter_indice_biblia
+    from src.easton_index import obter_indice_easton
+    from src.bm25_index import obter_indice_bm25
+    from src.retrieval import RetrievalService
+
+    fake = FakeOpenAI(latencia=args.latencia_llm)
+    llm_clients._openai_client = fake
+
+    biblia, construcao["biblia"] = cronometrar(obter_indice_biblia)
+    _, construcao["easton"] = cronometrar(obter_indice_easton)
+    _, construcao["bm25"] = cronometrar(obter_indice_bm25)
+    memoria["indices"] = pico_memoria_mb()
+
+    if args.reindexar:
+        chromadb_utils.CHROMA_PATH = tempfile.mkdtemp(prefix="bench_chroma_")
+        logger.info("Reindexando em %s", chromadb_utils.CHROMA_PATH)
+
+    db, partida["modelo_embeddings"] = cronometrar(chromadb_utils.ChromaDB)
+    servico = RetrievalService(db)
+    _, partida["ensure_collections"] = cronometrar(servico.ensure_collections)
+    if args.reindexar:
+        construcao["colecao_chroma"] = partida["ensure_collections"]
+    # O singleton usado pelas ferramentas passa a ser o serviço já aquecido
+    import src.retrieval as retrieval
+    retrieval._servico = servico
+    _, partida["primeira_consulta"] = cronometrar(servico.buscar, "amor ao próximo")
+    memoria["apos_partida"] = pico_memoria_mb()
+
+    perguntas, ignoradas = carregar_perguntas(args.perguntas, biblia)
+    consultas = [p["pergunta"] for p in perguntas] or ["amor ao próximo"]
+
+    resultado["latencia_ferramentas"] = {
+        "buscar_versiculos_semantica": medir_latencia(tools.buscar_versiculos_semantica.invoke, consultas, args.repeticoes),
+        **{
+            f"buscar_dicionario_easton.{camada}": medir_latencia(tools.buscar_dicionario_easton.invoke, termos, args.repeticoes)
+            for camada, termos in CONSULTAS_EASTON.items()
+        },
+        "buscar_na_biblia_json": medir_latencia(tools.buscar_na_biblia_json.invoke, CONSULTAS_CAPITULO, args.repeticoes),
+        "busca_vetorial": medir_latencia(lambda q: servico.buscar(q, n_results=5), consultas, args.repeticoes),
+        "busca_hibrida": medir_latencia(lambda q: servico.buscar_hibrido(q, n_results=5), consultas, args.repeticoes),
+    }
+    memoria["apos_latencia"] = pico_memoria_mb()
+
+    resultado["vazao"] = [
+        medir_vazao(tools.buscar_versiculos_semantica.invoke, consultas, chamadores, args.chamadas)
+        for chamadores in args.chamadores
+    ]
+    memoria["apos_vazao"] = pico_memoria_mb()
+
+    ks = (1, 5, 10)
+    resultado["qualidade"] = {
+        "perguntas": len(perguntas),
+        "perguntas_ignoradas": ignoradas,
+        "vetorial": avaliar_qualidade(lambda q, k: servico.buscar(q, n_results=k), perguntas, ks),
+        "hibrida": avaliar_qualidade(lambda q, k: servico.buscar_hibrido(q, n_results=k), perguntas, ks),
+    }
+    resultado["cache_embeddings"] = servico.estatisticas_cache()
+    resultado["llm_falso_chamadas"] = fake.chamadas
+    memoria["pico"] = pico_memoria_mb()
+    return resultado
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list[str]:
+    """
+    Lista as regressões do resultado atual em relação ao de referência: latência p95 acima
+    de (1 + tolerancia) vezes a base ou recall/MRR abaixo da base.
+    """
+    regressoes = []
+    for nome, lat in atual.get("latencia_ferramentas", {}).items():
+        anterior = base.get("latencia_ferramentas", {}).get(nome)
+        if anterior and lat["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {anterior['p95_ms']:.1f} ms -> {lat['p95_ms']:.1f} ms")
+    for modo, metricas in atual.get("qualidade", {}).items():
+        if not isinstance(metricas, dict):
+            continue
+        anteriores = base.get("qualidade", {}).get(modo, {})
+        for metrica, valor in metricas.items():
+            if metrica in anteriores and valor < anteriores[metrica]:
+                regressoes.append(f"{modo} {metrica}: {anteriores[metrica]} -> {valor}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline da recuperação (latência, vazão, memória e recall).")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: benchmarks/resultados/<data>_<commit>.json)")
+    parser.add_argument("--perguntas", default=PERGUNTAS_PATH, help="Conjunto rotulado (JSONL com pergunta e esperados)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições de cada consulta na medição de latência")
+    parser.add_argument("--chamadores", type=int, nargs="+", default=[1, 4, 8], help="Níveis de concorrência da medição de vazão")
+    parser.add_argument("--chamadas", type=int, default=64, help="Chamadas por nível de concorrência")
+    parser.add_argument("--latencia-llm", type=float, default=0.0, help="Latência simulada (s) do LLM falso")
+    parser.add_argument("--cache-embeddings", action="store_true", help="Mantém o cache LRU de embeddings de consultas ligado")
+    parser.add_argument("--reindexar", action="store_true", help="Mede a indexação completa em um diretório Chroma temporário")
+    parser.add_argument("--comparar", help="JSON de referência: sai com código 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Aumento relativo de p95 tolerado na comparação")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    logger.setLevel(logging.INFO)
+
+    # Nada do benchmark deve tocar os caches persistentes da aplicação
+    temporario = tempfile.mkdtemp(prefix="bench_")
+    os.environ["SUMMARY_CACHE_PATH"] = os.path.join(temporario, "resumos.sqlite3")
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    if not args.cache_embeddings:
+        os.environ["EMBEDDING_CACHE_SIZE"] = "0"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-offline")
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+    resultado = executar(args)
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(RESULTADOS_DIR, exist_ok=True)
+        carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+        saida = os.path.join(RESULTADOS_DIR, f"{carimbo}_{resultado['metadados']['commit'] or 'sem_commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    logger.info("Resultado salvo em %s", saida)
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(resultado, base, args.tolerancia)
+        for regressao in regressoes:
+            logger.warning("Regressão: %s", regressao)
+        if regressoes:
+            sys.exit(1)
+        logger.info("Nenhuma regressão em relação a %s", args.comparar)
+
+
+if __name__ == "__main__":
+    main()
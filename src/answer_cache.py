@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+import logging
+from src.embedding_cache import normalizar_consulta
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+ANSWER_CACHE_COLLECTION = "cache_respostas"
+# Ao passar de max_itens, o despejo reduz a coleção a esta fração da capacidade de uma vez
+FRACAO_APOS_DESPEJO = 0.9
+# Entradas expiradas já são ignoradas na busca; a remoção delas roda a cada tantas gravações
+EXPURGO_A_CADA = 100
+
+
+def calcular_versao(*partes: str) -> str:
+    """
+    Versão do cache derivada dos prompts e modelos: qualquer mudança invalida as respostas antigas.
+    """
+    return hashlib.sha1("\x00".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerCache:
+    """
+    Cache semântico de respostas: guarda pergunta (embedding) e resposta em uma coleção
+    dedicada do Chroma e devolve a resposta de uma pergunta anterior quando a nova é
+    suficientemente parecida (similaridade de cosseno >= limiar).
+
+    As entradas expiram após ttl_segundos, a coleção é limitada a max_itens (as mais
+    antigas saem primeiro, em lote, até FRACAO_APOS_DESPEJO da capacidade) e entradas de
+    outra versão de prompt/modelo são descartadas.
+    """
+
+    def __init__(
+        self,
+        client,
+        embed_fn,
+        versao: str,
+        limiar: float = 0.95,
+        ttl_segundos: float | None = 7 * 24 * 3600,
+        max_itens: int = 5000,
+        collection_name: str = ANSWER_CACHE_COLLECTION,
+    ):
+        self.embed_fn = embed_fn
+        self.versao = versao
+        self.limiar = limiar
+        self.ttl_segundos = ttl_segundos
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._gravacoes = 0
+        self._lock = threading.Lock()
+        self.collection = client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None
+        )
+        # Respostas geradas com outros prompts/modelos não valem mais
+        obsoletas = self.collection.get(where={"versao": {"$ne": versao}}, include=[])["ids"]
+        if obsoletas:
+            self.collection.delete(ids=obsoletas)
+            logger.info("Cache de respostas: %d entradas de versões anteriores removidas", len(obsoletas))
+
+    def buscar(self, question: str) -> str | None:
+        """
+        Retorna a resposta em cache para uma pergunta equivalente, se houver.
+        """
+        try:
+            # embed_fn recebe o texto original: a normalização é só chave (do cache de
+            # embeddings e do id da entrada), para o vetor ser o mesmo usado na busca
+            embedding = self.embed_fn([question])
+            results = self.collection.query(
+                query_embeddings=embedding,
+                n_results=1,
+                where={"versao": self.versao},
+                include=["metadatas", "distances"]
+            )
+        except Exception as e:
+            logger.warning("Falha ao consultar o cache de respostas: %s", e)
+            return None
+
+        encontrado = None
+        if results["ids"] and results["ids"][0]:
+            meta = results["metadatas"][0][0]
+            similaridade = 1.0 - results["distances"][0][0]
+            expirada = self.ttl_segundos is not None and time.time() - meta["criado_em"] > self.ttl_segundos
+            if similaridade >= self.limiar and not expirada:
+                encontrado = meta["resposta"]
+                logger.info("Cache de respostas: acerto (similaridade %.3f)", similaridade)
+
+        with self._lock:
+            if encontrado is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return encontrado
+
+    def salvar(self, question: str, resposta: str) -> None:
+        texto = normalizar_consulta(question)
+        try:
+            self.collection.upsert(
+                ids=[hashlib.sha1(f"{self.versao}\x00{texto}".encode("utf-8")).hexdigest()],
+                embeddings=self.embed_fn([question]),
+                documents=[question],
+                metadatas=[{"resposta": resposta, "versao": self.versao, "criado_em": time.time()}]
+            )
+            self._despejar()
+        except Exception as e:
+            logger.warning("Falha ao salvar no cache de respostas: %s", e)
+
+    def _despejar(self) -> None:
+        """
+        Remove entradas expiradas e, acima de max_itens, as mais antigas até sobrar
+        FRACAO_APOS_DESPEJO da capacidade. Despejar em lote faz a leitura dos metadados de
+        toda a coleção acontecer uma vez a cada ~10% de max_itens gravações, não a cada uma;
+        abaixo da capacidade, a busca das expiradas só roda a cada EXPURGO_A_CADA gravações.
+        """
+        with self._lock:
+            self._gravacoes += 1
+            expurgar = self.ttl_segundos is not None and self._gravacoes % EXPURGO_A_CADA == 0
+        total = self.collection.count()
+        if not expurgar and total <= self.max_itens:
+            return
+        removidas = []
+        if self.ttl_segundos is not None:
+            removidas = self.collection.get(
+                where={"criado_em": {"$lt": time.time() - self.ttl_segundos}}, include=[]
+            )["ids"]
+        if total - len(removidas) > self.max_itens:
+            excesso = total - len(removidas) - int(self.max_itens * FRACAO_APOS_DESPEJO)
+            todas = self.collection.get(include=["metadatas"])
+            ja_removidas = set(removidas)
+            restantes = [
+                (meta["criado_em"], doc_id)
+                for doc_id, meta in zip(todas["ids"], todas["metadatas"])
+                if doc_id not in ja_removidas
+            ]
+            removidas += [doc_id for _, doc_id in sorted(restantes)[:excesso]]
+        if removidas:
+            self.collection.delete(ids=removidas)
+            with self._lock:
+                self.evictions += len(removidas)
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "itens": self.collection.count(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import logging
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def obter_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retorna o event loop de fundo do processo (uma thread daemon dedicada).
+    Todas as chamadas assíncronas do agente rodam nele, de modo que clientes HTTP
+    assíncronos e seus pools de conexão ficam presos a um único loop, mesmo com o
+    Streamlit executando cada sessão em uma thread diferente.
+    """
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="biblia-async-loop", daemon=True)
+                thread.start()
+                logger.info("Event loop assíncrono de fundo iniciado")
+                _loop = loop
+    return _loop
+
+
+def executar(coro):
+    """
+    Executa a corrotina no loop de fundo e bloqueia até o resultado.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, obter_loop()).result()
+
+
+def iterar(agen):
+    """
+    Consome um gerador assíncrono a partir de código síncrono, item a item,
+    conforme os itens são produzidos no loop de fundo.
+    """
+    loop = obter_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        # Se o consumidor parar antes do fim, fecha o gerador no próprio loop
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
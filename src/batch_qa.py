@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import openai
+from src.embedding_cache import normalizar_consulta
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Erros da API que valem nova tentativa (limite de taxa, timeout, falha de conexão/servidor)
+ERROS_TRANSITORIOS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def ler_perguntas(path: str) -> list[dict]:
+    """
+    Lê o JSONL de entrada. Aceita o formato de requests.jsonl (request_id, title, body) e
+    também as chaves id/pergunta/question; a pergunta é body, pergunta, question ou title.
+    """
+    itens = []
+    with open(path, "r", encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            pergunta = next(
+                (registro[c] for c in ("body", "pergunta", "question", "title") if str(registro.get(c) or "").strip()),
+                None
+            )
+            if pergunta is None:
+                logger.warning("Linha %d sem pergunta, ignorada", numero)
+                continue
+            request_id = str(registro.get("request_id") or registro.get("id") or f"linha-{numero}")
+            itens.append({"request_id": request_id, "pergunta": pergunta})
+    return itens
+
+
+def ler_checkpoint(path: str) -> dict[str, dict]:
+    """
+    Resultados já gravados com sucesso no JSONL de saída, por request_id.
+    """
+    concluidos = {}
+    if not os.path.exists(path):
+        return concluidos
+    with open(path, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                # Última linha truncada por uma interrupção
+                continue
+            if registro.get("status") == "ok":
+                concluidos[registro["request_id"]] = registro
+    return concluidos
+
+
+def espera_sugerida(erro: Exception) -> float | None:
+    """
+    Segundos pedidos pela API no header Retry-After, quando houver.
+    """
+    resposta = getattr(erro, "response", None)
+    try:
+        valor = resposta.headers.get("retry-after") if resposta is not None else None
+        return float(valor) if valor else None
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchQA:
+    """
+    Responde um lote de perguntas com o BibliaAgent compartilhado: perguntas idênticas
+    (após normalização) são respondidas uma vez, os embeddings de todas as perguntas são
+    pré-calculados em lote, até `concorrencia` perguntas rodam ao mesmo tempo e cada
+    resultado é anexado ao JSONL de saída assim que fica pronto (o próprio arquivo serve
+    de checkpoint). Em limite de taxa, todos os workers pausam juntos com backoff exponencial.
+    """
+
+    def __init__(
+        self,
+        agent,
+        saida: str,
+        concorrencia: int = 4,
+        max_tentativas: int = 6,
+        espera_base: float = 2.0,
+        espera_maxima: float = 60.0,
+    ):
+        self.agent = agent
+        self.saida = saida
+        self.concorrencia = max(1, concorrencia)
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._pausar_ate = 0.0
+        self._lock = threading.Lock()
+        self._lock_saida = threading.Lock()
+
+    def _gravar(self, registros: list[dict]) -> None:
+        with self._lock_saida:
+            with open(self.saida, "a", encoding="utf-8") as f:
+                for registro in registros:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                f.flush()
+
+    def _fechar_linha_truncada(self) -> None:
+        """
+        Uma interrupção pode deixar a última linha da saída sem quebra de linha; sem isso o
+        próximo registro seria gravado colado nela e perdido na próxima leitura do checkpoint.
+        """
+        if not os.path.exists(self.saida) or os.path.getsize(self.saida) == 0:
+            return
+        with open(self.saida, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _aguardar_pausa(self) -> None:
+        while True:
+            with self._lock:
+                restante = self._pausar_ate - time.monotonic()
+            if restante <= 0:
+                return
+            time.sleep(restante)
+
+    def _pausar(self, segundos: float) -> None:
+        with self._lock:
+            self._pausar_ate = max(self._pausar_ate, time.monotonic() + segundos)
+
+    def _responder(self, pergunta: str) -> tuple[str | None, int, Exception | None]:
+        """
+        Chama o agente com novas tentativas para erros transitórios da API.
+        Retorna (resposta, tentativas, erro), com resposta None quando todas falharem.
+        """
+        for tentativa in range(1, self.max_tentativas + 1):
+            self._aguardar_pausa()
+            try:
+                return self.agent.ask(pergunta, propagar_erros=True), tentativa, None
+            except ERROS_TRANSITORIOS as e:
+                if tentativa == self.max_tentativas:
+                    return None, tentativa, e
+                espera = espera_sugerida(e) or min(self.espera_maxima, self.espera_base * 2 ** (tentativa - 1))
+                espera *= 1.0 + random.random() * 0.25
+                logger.warning("%s na tentativa %d; aguardando %.1fs", type(e).__name__, tentativa, espera)
+                if isinstance(e, openai.RateLimitError):
+                    # Limite de taxa é da conta inteira: segura todos os workers
+                    self._pausar(espera)
+                else:
+                    time.sleep(espera)
+            except Exception as e:
+                return None, tentativa, e
+
+    def aquecer_embeddings(self, perguntas: list[str], lote: int = 64) -> None:
+        """
+        Calcula em lote os embeddings de todas as perguntas, deixando-os no cache de consultas
+        usado depois pela análise de escopo, pelo cache de respostas e pela busca.
+        """
+        cache = self.agent.db.embedding_cache
+        if cache.max_itens < len(perguntas):
+            logger.warning(
+                "EMBEDDING_CACHE_SIZE=%d é menor que o número de perguntas (%d); parte do aquecimento será descartada",
+                cache.max_itens, len(perguntas)
+            )
+        inicio = time.perf_counter()
+        for i in range(0, len(perguntas), lote):
+            self.agent.db.functiom_embedder.embed_query(perguntas[i:i + lote])
+        logger.info("Embeddings de %d perguntas calculados em %.1fs", len(perguntas), time.perf_counter() - inicio)
+
+    def executar(self, itens: list[dict], retomar: bool = True) -> dict:
+        """
+        Processa os itens {request_id, pergunta} e retorna um resumo da execução.
+        """
+        if not retomar and os.path.exists(self.saida):
+            os.remove(self.saida)
+        concluidos = ler_checkpoint(self.saida) if retomar else {}
+        self._fechar_linha_truncada()
+
+        # Respostas já conhecidas (checkpoint) por pergunta normalizada
+        respostas = {normalizar_consulta(r["pergunta"]): r for r in concluidos.values()}
+        grupos: dict[str, list[dict]] = {}
+        reaproveitados = []
+        for item in itens:
+            if item["request_id"] in concluidos:
+                continue
+            chave = normalizar_consulta(item["pergunta"])
+            if chave in respostas:
+                anterior = respostas[chave]
+                reaproveitados.append({
+                    **item, "status": "ok", "resposta": anterior["resposta"], "duplicada_de": anterior["request_id"],
+                    "segundos": 0.0, "tentativas": 0,
+                })
+            else:
+                grupos.setdefault(chave, []).append(item)
+        if reaproveitados:
+            self._gravar(reaproveitados)
+
+        resumo = {
+            "itens": len(itens),
+            "ja_concluidos": len(concluidos),
+            "reaproveitados": len(reaproveitados),
+            "perguntas_unicas": len(grupos),
+            "ok": 0,
+            "erros": 0,
+        }
+        logger.info(
+            "Lote: %d itens, %d já concluídos, %d perguntas únicas a responder",
+            len(itens), len(concluidos), len(grupos)
+        )
+        if not grupos:
+            return resumo
+
+        self.aquecer_embeddings([g[0]["pergunta"] for g in grupos.values()])
+
+        def processar(grupo: list[dict]) -> list[dict]:
+            principal = grupo[0]
+            inicio = time.perf_counter()
+            resposta, tentativas, erro = self._responder(principal["pergunta"])
+            base = {"status": "ok", "resposta": resposta, "erro": None, "tentativas": tentativas}
+            if erro is not None:
+                logger.error("Falha em %s: %s", principal["request_id"], erro)
+                base.update(status="erro", erro=f"{type(erro).__name__}: {erro}")
+            base["segundos"] = round(time.perf_counter() - inicio, 3)
+            registros = [{**principal, **base}]
+            registros += [{**item, **base, "duplicada_de": principal["request_id"]} for item in grupo[1:]]
+            self._gravar(registros)
+            return registros
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix="batch-qa") as executor:
+            futuros = [executor.submit(processar, grupo) for grupo in grupos.values()]
+            for feitos, futuro in enumerate(as_completed(futuros), start=1):
+                for registro in futuro.result():
+                    resumo["ok" if registro["status"] == "ok" else "erros"] += 1
+                if feitos % 10 == 0 or feitos == len(futuros):
+                    logger.info("Lote: %d/%d perguntas respondidas", feitos, len(futuros))
+        resumo["segundos"] = round(time.perf_counter() - inicio, 1)
+        return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde em lote perguntas de um JSONL com o BibliaAgent.")
+    parser.add_argument("entrada", help="JSONL de perguntas (request_id, title, body ou id/pergunta)")
+    parser.add_argument("--saida", help="JSONL de respostas, também usado como checkpoint (padrão: <entrada>.respostas.jsonl)")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Perguntas respondidas ao mesmo tempo")
+    parser.add_argument("--max-tentativas", type=int, default=6, help="Tentativas por pergunta em erros transitórios da API")
+    parser.add_argument("--modelo", default="gpt-4o-mini", help="Modelo do agente")
+    parser.add_argument("--temperatura", type=float, default=0.2, help="Temperatura do agente")
+    parser.add_argument("--sem-retomar", action="store_true", help="Ignora o checkpoint e recomeça a saída do zero")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    # Importado aqui para que --help não carregue modelo, Chroma e LangChain
+    from src.biblia_agent import obter_agente
+
+    saida = args.saida or f"{os.path.splitext(args.entrada)[0]}.respostas.jsonl"
+    batch = BatchQA(
+        obter_agente(model_name=args.modelo, temperature=args.temperatura),
+        saida,
+        concorrencia=args.concorrencia,
+        max_tentativas=args.max_tentativas,
+    )
+    resumo = batch.executar(ler_perguntas(args.entrada), retomar=not args.sem_retomar)
+    print(json.dumps(resumo, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 from langchain_openai import OpenAI
-from src.system_prompts import SYSTEM_INSTRUCTION_TEMPLATE, ANALISE_QUESTION
-from src.chromadb_utils import ChromaDB
+from src.system_prompts import SYSTEM_INSTRUCTION_TEMPLATE, ANALISE_QUESTION, RESPOSTA_DIRETA_TEMPLATE
+from src.retrieval import obter_servico_busca
+from src.llm_clients import obter_http_client, obter_async_http_client
+from src import async_runtime, context_packing, tracing
 from langchain.agents import initialize_agent
 from langchain.agents.agent_types import AgentType
+import asyncio
 import logging
+import os
+import re
+import threading
+from src.scope_classifier import ScopeClassifier
+from src.fast_path import FastPath
+from src.answer_cache import AnswerCache, calcular_versao
 from src.tools import (
     buscar_versiculos_semantica,
+    buscar_passagens_biblia,
     buscar_dicionario_easton,
     buscar_na_biblia_json
 )
@@ -14,75 +24,394 @@ from src.tools import (
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+def interpretar_resposta_escopo(resposta: str) -> bool:
+    """
+    Interpreta a resposta "true"/"false" do LLM de análise de escopo.
+    Usa a primeira ocorrência de true/false; sem nenhuma, não bloqueia a pergunta.
+    """
+    encontrado = re.search(r"\b(true|false|verdadeiro|falso)\b", resposta.lower())
+    if encontrado is None:
+        logger.warning("Resposta de escopo não reconhecida: %r", resposta)
+        return True
+    return encontrado.group(1) in ("true", "verdadeiro")
+
+# Saídas que não são respostas de fato (parada do executor por limite de iterações/tempo e
+# respostas-padrão de "nada encontrado"); comparadas em minúsculas, por trecho
+RESPOSTAS_NAO_CACHEAVEIS = (
+    "agent stopped due to iteration limit or time limit",
+    "em minha base de conhecimento não consegui encontrar algo fundamentado",
+)
+# Nome da ferramenta interna do LangChain que registra erros de parsing do ReAct
+FERRAMENTA_ERRO_REACT = "_Exception"
+
+def resposta_cacheavel(resposta: str, passos: list | None = None) -> bool:
+    """
+    Se a resposta pode ir para o cache semântico: não vazia, sem as mensagens de parada ou
+    de "nada encontrado" e, no ReAct, de uma execução sem erros de parsing nos passos.
+    """
+    if not resposta or not resposta.strip():
+        return False
+    texto = resposta.lower()
+    if any(mensagem in texto for mensagem in RESPOSTAS_NAO_CACHEAVEIS):
+        return False
+    return not any(getattr(acao, "tool", None) == FERRAMENTA_ERRO_REACT for acao, _ in (passos or []))
+
 class BibliaAgent:
-    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.2):
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        temperature: float = 0.2,
+        fast_path: bool | None = None,
+        answer_cache: bool | None = None
+    ):
         self.model_name = model_name
         self.temperature = temperature
+        # Modo rápido (recupera e gera em uma chamada) ligado por padrão; BIBLIA_FAST_PATH=0 desliga
+        if fast_path is None:
+            fast_path = os.getenv("BIBLIA_FAST_PATH", "1") != "0"
+        # Cache semântico de respostas ligado por padrão; ANSWER_CACHE=0 desliga
+        if answer_cache is None:
+            answer_cache = os.getenv("ANSWER_CACHE", "1") != "0"
         logger.info("Inicializando BibliaAgent | model=%s temperature=%.2f", self.model_name, self.temperature)
         try:
-            self.db = ChromaDB()
-            collections = self.db.ensure_collections()
+            # Serviço de busca compartilhado com as ferramentas (mesmo cliente e embedder)
+            self.retrieval = obter_servico_busca()
+            self.db = self.retrieval.db
+            collections = self.retrieval.ensure_collections()
             self.biblia = collections["biblia"]
             logger.info("Coleções ChromaDB carregadas com sucesso: biblia")
         except Exception as e:
             logger.exception("Falha ao inicializar ChromaDB/coleções: %s", e)
             raise
 
-    def analisar_pergunta(self, question: str):
+        # LLMs e executor do agente são criados uma vez e reutilizados em todas as perguntas.
+        # O executor não guarda estado entre invocações, então pode ser chamado em paralelo;
+        # o cliente HTTP compartilhado mantém as conexões com a OpenAI abertas (keep-alive).
+        http_client = obter_http_client()
+        http_async_client = obter_async_http_client()
+        self.llm_analise = OpenAI(
+            model=self.model_name, temperature=self.temperature,
+            http_client=http_client, http_async_client=http_async_client
+        )
+        self.llm = OpenAI(
+            model=self.model_name, temperature=self.temperature, max_tokens=10000,
+            http_client=http_client, http_async_client=http_async_client
+        )
+        # Classificador local de escopo (reutiliza o MiniLM já carregado); o LLM só é
+        # consultado quando a decisão local é ambígua
+        self.scope_classifier = ScopeClassifier(self.db.functiom_embedder.embed_query)
+        self.fast_path = FastPath(self.retrieval) if fast_path else None
+        self.answer_cache = None
+        if answer_cache:
+            ttl = os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600))
+            self.answer_cache = AnswerCache(
+                self.db.client,
+                self.db.functiom_embedder.embed_query,
+                versao=calcular_versao(
+                    self.model_name,
+                    self.db.model_name,
+                    SYSTEM_INSTRUCTION_TEMPLATE.template,
+                    RESPOSTA_DIRETA_TEMPLATE.template
+                ),
+                limiar=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+                ttl_segundos=float(ttl) if ttl else None,
+                max_itens=int(os.getenv("ANSWER_CACHE_MAX", "5000"))
+            )
+        self.tools = [
+            buscar_na_biblia_json,
+            buscar_dicionario_easton,
+            buscar_versiculos_semantica,
+            buscar_passagens_biblia
+        ]
+        logger.debug("Configurando agente ReAct com ferramentas: %s",
+                     ", ".join([t.name if hasattr(t, 'name') else t.__name__ for t in self.tools]))
+        self.agent_executor = initialize_agent(
+            tools=self.tools,
+            llm=self.llm,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=True,
+            handle_parsing_errors="Check your output and make sure it conforms to the expected format. Try again.",
+            # Os passos só são usados para decidir se a resposta pode ir para o cache
+            return_intermediate_steps=True
+        )
+
+    def analisar_pergunta(self, question: str) -> bool:
         """
         Analisa a pergunta do usuário para determinar se é relevante para o contexto bíblico.
+        Decide localmente quando o classificador de escopo tem confiança e escala para o LLM
+        apenas nos casos ambíguos.
         """
         logger.debug("Analisando pergunta recebida: %s", question)
-        model = OpenAI(model=self.model_name, temperature=self.temperature)
-        prompt = ANALISE_QUESTION.format(question=question)
-        try:
-            response = model.invoke(prompt)
-            logger.info("Resultado da análise de escopo: %s", str(response))
-            return response
-        except Exception as e:
-            logger.exception("Erro ao analisar pergunta: %s", e)
-            raise
+        with tracing.span("analisar_pergunta") as atributos:
+            try:
+                decisao, prob = self.scope_classifier.classificar(question)
+            except Exception as e:
+                logger.warning("Classificador local de escopo indisponível, usando LLM: %s", e)
+                decisao, prob = None, float("nan")
+            atributos["prob_local"] = round(prob, 3)
+            if decisao is not None:
+                logger.info("Resultado da análise de escopo (local, p=%.2f): %s", prob, decisao)
+                atributos.update(origem="local", decisao=decisao)
+                return decisao
+
+            prompt = ANALISE_QUESTION.format(question=question)
+            try:
+                response = self.llm_analise.invoke(prompt, config={"callbacks": tracing.callbacks()})
+                logger.info("Resultado da análise de escopo (LLM, p local=%.2f): %s", prob, str(response))
+                decisao = interpretar_resposta_escopo(response)
+                atributos.update(origem="llm", decisao=decisao)
+                return decisao
+            except Exception as e:
+                logger.exception("Erro ao analisar pergunta: %s", e)
+                raise
 
-    def ask(self, question: str):
+    def _salvar_no_cache(self, question: str, resposta: str, passos: list | None = None):
+        """
+        Guarda no cache semântico apenas respostas substantivas: mensagens de parada do
+        executor (limite de iterações/tempo), execuções com erro de parsing e as respostas
+        de "nada encontrado" ficam de fora, para que uma falha não responda às perguntas
+        parecidas até expirar.
+        """
+        if self.answer_cache is None:
+            return
+        if not resposta_cacheavel(resposta, passos):
+            logger.info("Resposta não salva no cache de respostas (parada, erro ou sem fundamento)")
+            tracing.contar("cache_respostas.ignoradas")
+            return
+        with tracing.span("cache_respostas.salvar"):
+            self.answer_cache.salvar(question, resposta)
+
+    def _buscar_no_cache(self, question: str) -> str | None:
+        with tracing.span("cache_respostas.buscar") as atributos:
+            resposta = self.answer_cache.buscar(question)
+            atributos["acerto"] = resposta is not None
+        tracing.contar("cache_respostas.acertos" if resposta is not None else "cache_respostas.erros")
+        return resposta
+
+    def _coletar_contexto(self, question: str) -> str | None:
+        # Orçamento próprio: se o modo rápido desistir, o ReAct começa com o orçamento inteiro
+        with tracing.span("fast_path.coletar") as atributos, context_packing.orcamento(question):
+            contexto = self.fast_path.coletar(question)
+            atributos["contexto_chars"] = len(contexto) if contexto is not None else 0
+        return contexto
+
+    def ask(self, question: str, propagar_erros: bool = False):
         """
         Faz uma pergunta ao agente bíblico utilizando o modelo LLM e ferramentas associadas.
+        Cada chamada gera um trace (src/tracing.py) com o tempo de cada etapa.
+        Com propagar_erros=True, uma falha na análise de escopo é levantada em vez de virar
+        mensagem de desculpas (o modo em lote usa isso para tentar de novo).
         """
+        with tracing.iniciar_trace("ask", pergunta=question):
+            return self._responder(question, propagar_erros)
+
+    def _responder(self, question: str, propagar_erros: bool = False):
         logger.info("Iniciando processamento da pergunta do usuário")
+        if self.answer_cache is not None:
+            resposta = self._buscar_no_cache(question)
+            if resposta is not None:
+                tracing.anotar(caminho="cache")
+                return resposta
         try:
-            analise = self.analisar_pergunta(question)
+            dentro_do_escopo = self.analisar_pergunta(question)
         except Exception as e:
             logger.error("Erro na análise da pergunta, abortando: %s", e)
+            tracing.anotar(caminho="erro")
+            if propagar_erros:
+                raise
             return "Desculpe, ocorreu um erro ao processar sua pergunta."
-        if "false" in analise.lower():
+        if not dentro_do_escopo:
             logger.info("Pergunta fora de escopo bíblico. Encerrando com mensagem padrão.")
+            tracing.anotar(caminho="fora_do_escopo")
             return "Desculpe, não posso ajudar com essa pergunta. Por favor, faça uma pergunta relacionada a ensinamentos bíblicos."
         
-        tools = [
-            buscar_na_biblia_json,
-            buscar_dicionario_easton,
-            buscar_versiculos_semantica
-        ]
-        logger.debug("Configurando LLM e agente ReAct com ferramentas: %s", 
-                     ", ".join([t.name if hasattr(t, 'name') else t.__name__ for t in tools]))
+        # Modo rápido: recuperação concorrente + uma única geração; ReAct fica como fallback
+        if self.fast_path is not None:
+            try:
+                contexto = self._coletar_contexto(question)
+                if contexto is not None:
+                    prompt = self.fast_path.prompt(question, contexto)
+                    resposta = self.llm.invoke(prompt, config={"callbacks": tracing.callbacks()}).strip()
+                    logger.info("Resposta gerada com sucesso pelo modo rápido")
+                    tracing.anotar(caminho="fast_path")
+                    self._salvar_no_cache(question, resposta)
+                    return resposta
+            except Exception as e:
+                logger.warning("Falha no modo rápido, usando agente ReAct: %s", e)
 
-        llm = OpenAI(model=self.model_name, temperature=self.temperature, max_tokens=10000)
-        
         # Usando ReAct Agent
         try:
-            agent_executor = initialize_agent(
-                tools=tools,
-                llm=llm,
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=True,
-                handle_parsing_errors="Check your output and make sure it conforms to the expected format. Try again.",
-                return_intermediate_steps=False
-            )
-
             prompt = SYSTEM_INSTRUCTION_TEMPLATE.format(question=question)
             logger.debug("Invocando agente com prompt formatado")
-            response = agent_executor.invoke(prompt)
+            tracing.anotar(caminho="react")
+            # As saídas das ferramentas são limitadas por CONTEXT_TOKEN_BUDGET (src/context_packing.py)
+            with tracing.span("react"), context_packing.orcamento(question):
+                response = self.agent_executor.invoke(prompt, config={"callbacks": tracing.callbacks()})
             logger.info("Resposta gerada com sucesso pelo agente")
+            self._salvar_no_cache(question, response['output'], response.get("intermediate_steps"))
             return response['output']
         except Exception as e:
             logger.exception("Erro ao gerar resposta com o agente: %s", e)
             raise
+
+    async def astream(self, question: str):
+        """
+        Versão assíncrona e incremental de ask. Gera eventos (dicts com a chave "tipo"):
+        - "ferramenta": chamada de ferramenta iniciada (nome, entrada)
+        - "observacao": retorno de uma ferramenta (nome, conteudo)
+        - "token": trecho da resposta final assim que o LLM o produz (conteudo)
+        - "resposta": resposta final completa (conteudo)
+
+        As ferramentas são síncronas e o LangChain as executa no thread pool do loop,
+        assim o embedding (CPU) não bloqueia outras requisições no mesmo processo.
+        Deve rodar no loop de fundo (src/async_runtime.py); use stream() a partir de código síncrono.
+
+        Ao final, um evento "trace" traz o trace da requisição (tempo de cada etapa).
+        """
+        fila: asyncio.Queue = asyncio.Queue()
+        fim = object()
+
+        async def produzir():
+            # Os eventos são produzidos em uma única tarefa para que o trace (contextvar)
+            # sobreviva entre os passos; cada __anext__ vindo de async_runtime.iterar roda
+            # em uma tarefa diferente e perderia o contexto
+            try:
+                with tracing.iniciar_trace("astream", pergunta=question) as trace:
+                    async for evento in self._eventos(question):
+                        fila.put_nowait(evento)
+                fila.put_nowait({"tipo": "trace", "dados": trace.para_dict()})
+            except Exception as e:
+                fila.put_nowait(e)
+            finally:
+                fila.put_nowait(fim)
+
+        tarefa = asyncio.create_task(produzir())
+        try:
+            while (item := await fila.get()) is not fim:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if not tarefa.done():
+                tarefa.cancel()
+
+    async def _eventos(self, question: str):
+        logger.info("Iniciando processamento assíncrono da pergunta do usuário")
+        if self.answer_cache is not None:
+            resposta = await asyncio.to_thread(self._buscar_no_cache, question)
+            if resposta is not None:
+                tracing.anotar(caminho="cache")
+                yield {"tipo": "resposta", "conteudo": resposta}
+                return
+        try:
+            dentro_do_escopo = await asyncio.to_thread(self.analisar_pergunta, question)
+        except Exception as e:
+            logger.error("Erro na análise da pergunta, abortando: %s", e)
+            tracing.anotar(caminho="erro")
+            yield {"tipo": "resposta", "conteudo": "Desculpe, ocorreu um erro ao processar sua pergunta."}
+            return
+        if not dentro_do_escopo:
+            logger.info("Pergunta fora de escopo bíblico. Encerrando com mensagem padrão.")
+            tracing.anotar(caminho="fora_do_escopo")
+            yield {"tipo": "resposta", "conteudo": "Desculpe, não posso ajudar com essa pergunta. Por favor, faça uma pergunta relacionada a ensinamentos bíblicos."}
+            return
+
+        if self.fast_path is not None:
+            contexto = None
+            try:
+                contexto = await asyncio.to_thread(self._coletar_contexto, question)
+            except Exception as e:
+                logger.warning("Falha no modo rápido, usando agente ReAct: %s", e)
+            if contexto is not None:
+                tracing.anotar(caminho="fast_path")
+                partes = []
+                prompt = self.fast_path.prompt(question, contexto)
+                try:
+                    async for token in self.llm.astream(prompt, config={"callbacks": tracing.callbacks()}):
+                        partes.append(token)
+                        yield {"tipo": "token", "conteudo": token}
+                except Exception as e:
+                    # Como no caminho síncrono, uma falha na geração direta cai para o ReAct;
+                    # o evento "resposta" do ReAct substitui os tokens parciais já emitidos
+                    logger.warning("Falha no modo rápido, usando agente ReAct: %s", e)
+                    partes = None
+                if partes is not None:
+                    logger.info("Resposta gerada com sucesso pelo modo rápido")
+                    resposta = "".join(partes).strip()
+                    await asyncio.to_thread(self._salvar_no_cache, question, resposta)
+                    yield {"tipo": "resposta", "conteudo": resposta}
+                    return
+
+        prompt = SYSTEM_INSTRUCTION_TEMPLATE.format(question=question)
+        marcador = "Final Answer:"
+        gerado = {}    # run_id do LLM -> texto acumulado
+        emitido = {}   # run_id do LLM -> posição até onde a resposta final já foi emitida
+        tracing.anotar(caminho="react")
+        try:
+            # As saídas das ferramentas são limitadas por CONTEXT_TOKEN_BUDGET (src/context_packing.py)
+            with context_packing.orcamento(question):
+                eventos = self.agent_executor.astream_events(prompt, version="v2", config={"callbacks": tracing.callbacks()})
+                async for evento in eventos:
+                    tipo = evento["event"]
+                    if tipo == "on_tool_start":
+                        yield {"tipo": "ferramenta", "nome": evento["name"], "entrada": evento["data"].get("input")}
+                    elif tipo == "on_tool_end":
+                        yield {"tipo": "observacao", "nome": evento["name"], "conteudo": str(evento["data"].get("output"))}
+                    elif tipo == "on_llm_stream":
+                        chunk = evento["data"]["chunk"]
+                        run_id = evento["run_id"]
+                        texto = gerado.get(run_id, "") + getattr(chunk, "text", str(chunk))
+                        gerado[run_id] = texto
+                        # Só o que vem depois de "Final Answer:" é resposta para o usuário
+                        inicio = texto.find(marcador)
+                        if inicio >= 0:
+                            inicio = max(inicio + len(marcador), emitido.get(run_id, 0))
+                            if len(texto) > inicio:
+                                yield {"tipo": "token", "conteudo": texto[inicio:]}
+                                emitido[run_id] = len(texto)
+                    elif tipo == "on_chain_end" and not evento.get("parent_ids"):
+                        logger.info("Resposta gerada com sucesso pelo agente")
+                        saida = evento["data"]["output"]
+                        resposta = saida["output"]
+                        await asyncio.to_thread(self._salvar_no_cache, question, resposta, saida.get("intermediate_steps"))
+                        yield {"tipo": "resposta", "conteudo": resposta}
+        except Exception as e:
+            logger.exception("Erro ao gerar resposta com o agente: %s", e)
+            raise
+
+    async def aask(self, question: str) -> str:
+        """
+        Versão assíncrona de ask: retorna apenas a resposta final.
+        """
+        resposta = None
+        async for evento in self.astream(question):
+            if evento["tipo"] == "resposta":
+                resposta = evento["conteudo"]
+        return resposta
+
+    def stream(self, question: str):
+        """
+        Consome astream a partir de código síncrono (ex.: Streamlit), rodando-o no loop
+        de fundo do processo e repassando os eventos conforme chegam.
+        """
+        yield from async_runtime.iterar(self.astream(question))
+
+
+_agentes: dict[tuple[str, float], BibliaAgent] = {}
+_lock = threading.Lock()
+
+
+def obter_agente(model_name: str = "gpt-4o-mini", temperature: float = 0.2) -> BibliaAgent:
+    """
+    Retorna o BibliaAgent compartilhado pelo processo para a configuração informada.
+    Modelo de embedding, cliente Chroma e índices são carregados uma única vez.
+    """
+    chave = (model_name, temperature)
+    agente = _agentes.get(chave)
+    if agente is None:
+        with _lock:
+            agente = _agentes.get(chave)
+            if agente is None:
+                agente = BibliaAgent(model_name=model_name, temperature=temperature)
+                _agentes[chave] = agente
+    return agente
@@ -0,0 +1,270 @@
+import json
+import os
+import threading
+import logging
+import numpy as np
+from src.text_utils import normalizar_texto
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+BIBLIA_PATH = "./data/biblia_ave_maria.json"
+TESTAMENTOS = ("antigoTestamento", "novoTestamento")
+# Formas aceitas nos filtros (comparadas normalizadas) -> chave do JSON
+_TESTAMENTOS_ALIASES = {
+    "antigotestamento": "antigoTestamento", "antigo": "antigoTestamento", "at": "antigoTestamento",
+    "novotestamento": "novoTestamento", "novo": "novoTestamento", "nt": "novoTestamento",
+}
+
+
+def normalizar_testamento(testamento: str) -> str:
+    """
+    Converte "antigo"/"novo" (ou as chaves do JSON, em qualquer caixa) para a chave do JSON.
+    """
+    chave = _TESTAMENTOS_ALIASES.get(normalizar_texto(testamento))
+    if chave is None:
+        raise ValueError(f"Testamento inválido: {testamento!r} (use {', '.join(TESTAMENTOS)}, antigo ou novo)")
+    return chave
+
+
+class BibliaIndex:
+    """
+    Índice em memória da Bíblia: mapeia nomes/abreviações normalizados para o livro
+    e (livro, capítulo) para a lista de versículos, com acesso O(1).
+    """
+
+    def __init__(self, biblia: dict, mtime: float | None = None):
+        self.mtime = mtime
+        self.livros = []        # livros na ordem canônica do JSON
+        self._por_nome = {}     # nome/abreviação normalizados -> livro
+        self._capitulos = {}    # (nome do livro, capítulo) -> versículos
+        self._testamento = {}   # nome do livro -> testamento
+        self._documentos = None
+        self._passagens = {}    # (janela, passo) -> (docs, ids, metadatas)
+        self._capitulos_docs = None
+        self._posicoes = None   # (livro, capítulo) de cada documento, para filtros
+        self._lock = threading.Lock()
+
+        for testamento in TESTAMENTOS:
+            for livro_obj in biblia.get(testamento, []):
+                self.livros.append(livro_obj)
+                nome = livro_obj.get("nome", livro_obj.get("abreviacao"))
+                self._testamento[nome] = testamento
+                for chave in (livro_obj.get("nome", ""), livro_obj.get("abreviacao", "")):
+                    chave_norm = normalizar_texto(chave)
+                    # Mantém o primeiro livro encontrado, como na busca linear original
+                    if chave_norm and chave_norm not in self._por_nome:
+                        self._por_nome[chave_norm] = livro_obj
+                for cap in livro_obj.get("capitulos", []):
+                    self._capitulos[(nome, str(cap["capitulo"]).strip())] = cap.get("versiculos", [])
+
+        logger.info("Índice da Bíblia construído: %d livros, %d capítulos", len(self.livros), len(self._capitulos))
+
+    def encontrar_livro(self, livro: str) -> dict | None:
+        """
+        Retorna o livro pelo nome ou abreviação (comparação normalizada).
+        """
+        return self._por_nome.get(normalizar_texto(livro))
+
+    def obter_capitulo(self, livro: str, capitulo) -> tuple[dict, list] | None:
+        """
+        Retorna (livro, versículos) do capítulo solicitado ou None se não existir.
+        """
+        livro_obj = self.encontrar_livro(livro)
+        if livro_obj is None:
+            return None
+        nome = livro_obj.get("nome", livro_obj.get("abreviacao"))
+        versiculos = self._capitulos.get((nome, str(capitulo).strip()))
+        if versiculos is None:
+            return None
+        return livro_obj, versiculos
+
+    def testamento(self, nome_livro: str) -> str | None:
+        return self._testamento.get(nome_livro)
+
+    def livros_do_testamento(self, testamento: str) -> list[str]:
+        testamento = normalizar_testamento(testamento)
+        return [nome for nome, t in self._testamento.items() if t == testamento]
+
+    def documentos(self) -> tuple[list, list, list]:
+        """
+        Fluxo de versículos usado na indexação: (docs, ids, metadatas), montado uma vez
+        por índice e compartilhado entre o ChromaDB e o índice lexical (BM25).
+        """
+        if self._documentos is None:
+            with self._lock:
+                if self._documentos is None:
+                    docs, ids, metadatas = [], [], []
+                    for livro, cap, versiculo in self.iter_versiculos():
+                        texto = versiculo["texto"]
+                        ref = f"{livro['nome']} {cap['capitulo']}:{versiculo['versiculo']}"
+                        docs.append(texto)
+                        ids.append(ref)
+                        metadatas.append({
+                            "livro": livro["nome"],
+                            "capitulo": cap["capitulo"],
+                            "versiculo": versiculo["versiculo"]
+                        })
+                    self._documentos = (docs, ids, metadatas)
+        return self._documentos
+
+    def passagens(self, janela: int = 4, passo: int = 2) -> tuple[list, list, list]:
+        """
+        Passagens de `janela` versículos consecutivos, deslizando de `passo` em `passo` dentro
+        de cada capítulo (a última janela sempre cobre o fim do capítulo). Ids no formato
+        "Livro capítulo:início-fim".
+        """
+        chave = (janela, passo)
+        if chave not in self._passagens:
+            with self._lock:
+                if chave not in self._passagens:
+                    docs, ids, metadatas = [], [], []
+                    for livro, cap in self.iter_capitulos():
+                        versiculos = cap.get("versiculos", [])
+                        if not versiculos:
+                            continue
+                        inicios = list(range(0, max(len(versiculos) - janela, 0) + 1, passo))
+                        if inicios[-1] + janela < len(versiculos):
+                            inicios.append(len(versiculos) - janela)
+                        for inicio in inicios:
+                            trecho = versiculos[inicio:inicio + janela]
+                            primeiro, ultimo = trecho[0]["versiculo"], trecho[-1]["versiculo"]
+                            docs.append(" ".join(v["texto"] for v in trecho))
+                            ids.append(f"{livro['nome']} {cap['capitulo']}:{primeiro}-{ultimo}")
+                            metadatas.append({
+                                "livro": livro["nome"],
+                                "capitulo": cap["capitulo"],
+                                "versiculo_inicio": primeiro,
+                                "versiculo_fim": ultimo
+                            })
+                    self._passagens[chave] = (docs, ids, metadatas)
+        return self._passagens[chave]
+
+    def capitulos(self) -> tuple[list, list, list]:
+        """
+        Um documento por capítulo (texto completo), na ordem de documentos(); o metadado
+        "versiculos" é a quantidade de versículos, de modo que os capítulos ocupam faixas
+        contíguas de documentos().
+        """
+        if self._capitulos_docs is None:
+            with self._lock:
+                if self._capitulos_docs is None:
+                    docs, ids, metadatas = [], [], []
+                    for livro, cap in self.iter_capitulos():
+                        versiculos = cap.get("versiculos", [])
+                        if not versiculos:
+                            continue
+                        docs.append(" ".join(v["texto"] for v in versiculos))
+                        ids.append(f"{livro['nome']} {cap['capitulo']}")
+                        metadatas.append({"livro": livro["nome"], "capitulo": cap["capitulo"], "versiculos": len(versiculos)})
+                    self._capitulos_docs = (docs, ids, metadatas)
+        return self._capitulos_docs
+
+    def trecho(self, livro: str, capitulo, versiculo_inicio, versiculo_fim=None, contexto: int = 2) -> tuple[dict, list] | None:
+        """
+        Versículos de versiculo_inicio a versiculo_fim com `contexto` versículos vizinhos de
+        cada lado, lidos da lista em memória do capítulo. Retorna (livro, versículos) ou None.
+        """
+        encontrado = self.obter_capitulo(livro, capitulo)
+        if encontrado is None:
+            return None
+        livro_obj, versiculos = encontrado
+        numeros = [str(v["versiculo"]) for v in versiculos]
+        inicio = numeros.index(str(versiculo_inicio)) if str(versiculo_inicio) in numeros else 0
+        fim = numeros.index(str(versiculo_fim)) if versiculo_fim is not None and str(versiculo_fim) in numeros else inicio
+        return livro_obj, versiculos[max(0, inicio - contexto):min(len(versiculos), fim + contexto + 1)]
+
+    def _posicoes_documentos(self) -> tuple[dict, np.ndarray, np.ndarray]:
+        if self._posicoes is None:
+            _, _, metadatas = self.documentos()
+            livros = {l.get("nome", l.get("abreviacao")): i for i, l in enumerate(self.livros)}
+            livro_doc = np.fromiter((livros[m["livro"]] for m in metadatas), dtype=np.int16, count=len(metadatas))
+            capitulo_doc = np.fromiter((int(m["capitulo"]) for m in metadatas), dtype=np.int16, count=len(metadatas))
+            self._posicoes = (livros, livro_doc, capitulo_doc)
+        return self._posicoes
+
+    def mascara(
+        self,
+        livro: str | None = None,
+        capitulo_min: int | None = None,
+        capitulo_max: int | None = None,
+        testamento: str | None = None,
+    ) -> np.ndarray | None:
+        """
+        Máscara booleana, alinhada com documentos(), dos versículos que atendem aos filtros
+        (None se não houver filtro). Compartilhada pelo BM25 e pelo backend vetorial NumPy.
+        """
+        livros, livro_doc, capitulo_doc = self._posicoes_documentos()
+        mascara = None
+
+        def combinar(atual, nova):
+            return nova if atual is None else atual & nova
+
+        if livro is not None:
+            livro_obj = self.encontrar_livro(livro)
+            indice = livros.get(livro_obj.get("nome", livro_obj.get("abreviacao"))) if livro_obj else -1
+            mascara = combinar(mascara, livro_doc == indice)
+        if testamento is not None:
+            indices = [livros[nome] for nome in self.livros_do_testamento(testamento)]
+            mascara = combinar(mascara, np.isin(livro_doc, indices))
+        if capitulo_min is not None:
+            mascara = combinar(mascara, capitulo_doc >= capitulo_min)
+        if capitulo_max is not None:
+            mascara = combinar(mascara, capitulo_doc <= capitulo_max)
+        return mascara
+
+    def iter_capitulos(self):
+        """
+        Percorre todos os capítulos na ordem do JSON, gerando (livro, capítulo).
+        """
+        for livro_obj in self.livros:
+            for cap in livro_obj.get("capitulos", []):
+                yield livro_obj, cap
+
+    def iter_versiculos(self):
+        """
+        Percorre todos os versículos na ordem do JSON, gerando (livro, capítulo, versículo).
+        """
+        for livro_obj in self.livros:
+            for cap in livro_obj.get("capitulos", []):
+                for versiculo in cap.get("versiculos", []):
+                    yield livro_obj, cap, versiculo
+
+
+_indices: dict[str, BibliaIndex] = {}
+_lock = threading.Lock()
+
+
+def obter_indice_biblia(path: str = BIBLIA_PATH) -> BibliaIndex:
+    """
+    Retorna o índice da Bíblia compartilhado pelo processo, construindo-o na primeira
+    chamada e reconstruindo-o quando o mtime do arquivo JSON mudar.
+    """
+    mtime = os.path.getmtime(path)
+    indice = _indices.get(path)
+    if indice is not None and indice.mtime == mtime:
+        return indice
+
+    with _lock:
+        indice = _indices.get(path)
+        if indice is None or indice.mtime != mtime:
+            if indice is not None:
+                logger.info("Arquivo %s alterado; reconstruindo índice da Bíblia", path)
+            with open(path, "r", encoding="utf-8") as f:
+                biblia = json.load(f)
+            indice = BibliaIndex(biblia, mtime=mtime)
+            _indices[path] = indice
+        return indice
+
+
+def invalidar_indice_biblia(path: str | None = None) -> None:
+    """
+    Descarta o índice em cache (de um arquivo ou de todos), forçando nova leitura.
+    """
+    with _lock:
+        if path is None:
+            _indices.clear()
+        else:
+            _indices.pop(path, None)
+    logger.info("Índice da Bíblia invalidado: %s", path or "todos")
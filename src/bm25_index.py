@@ -0,0 +1,117 @@
+import re
+import threading
+import logging
+import numpy as np
+from unidecode import unidecode
+from src.biblia_index import BibliaIndex, obter_indice_biblia
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Palavras muito frequentes que só diluem a pontuação lexical
+STOPWORDS = set("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas
+para pra com sem sob sobre e ou mas que se nao sim ao aos a eu tu ele ela nos vos eles elas
+me te lhe lhes meu minha teu tua seu sua nosso nossa vosso vossa isto isso aquilo este esta
+esse essa aquele aquela como quando onde qual quais quem porque pois ja mais muito foi ser
+era sao sera diz disse fala biblia
+""".split())
+
+
+def tokenizar(texto: str) -> list[str]:
+    """
+    Tokens lexicais: sem acentos, minúsculos, apenas letras/dígitos e sem stopwords.
+    """
+    return [t for t in re.findall(r"[a-z0-9]+", unidecode(texto).lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 sobre o texto normalizado dos versículos, guardado em arrays
+    compactos (postings em formato CSR: offsets -> ids de documento e frequências).
+    """
+
+    def __init__(self, biblia: BibliaIndex, k1: float = 1.5, b: float = 0.75):
+        self.biblia = biblia
+        self.k1 = k1
+        self.b = b
+        self.docs, self.ids, self.metadatas = biblia.documentos()
+
+        vocabulario: dict[str, int] = {}
+        pares_termo, pares_doc, pares_tf = [], [], []
+        tamanhos = np.zeros(len(self.docs), dtype=np.float32)
+        for doc_id, texto in enumerate(self.docs):
+            tokens = tokenizar(texto)
+            tamanhos[doc_id] = len(tokens)
+            contagem: dict[str, int] = {}
+            for token in tokens:
+                contagem[token] = contagem.get(token, 0) + 1
+            for token, tf in contagem.items():
+                pares_termo.append(vocabulario.setdefault(token, len(vocabulario)))
+                pares_doc.append(doc_id)
+                pares_tf.append(tf)
+
+        termos = np.asarray(pares_termo, dtype=np.int32)
+        ordem = np.argsort(termos, kind="stable")
+        self.vocabulario = vocabulario
+        self.postings_doc = np.asarray(pares_doc, dtype=np.int32)[ordem]
+        self.postings_tf = np.asarray(pares_tf, dtype=np.float32)[ordem]
+        self.offsets = np.zeros(len(vocabulario) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(termos, minlength=len(vocabulario)), out=self.offsets[1:])
+
+        n_docs = len(self.docs)
+        df = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.norma_doc = (self.k1 * (1.0 - self.b + self.b * tamanhos / max(float(tamanhos.mean()), 1.0))).astype(np.float32)
+        logger.info("Índice BM25 construído: %d versículos, %d termos", n_docs, len(vocabulario))
+
+    def mascara(
+        self,
+        livro: str | None = None,
+        capitulo_min: int | None = None,
+        capitulo_max: int | None = None,
+        testamento: str | None = None,
+    ) -> np.ndarray | None:
+        """
+        Máscara booleana dos versículos que atendem aos filtros (None se não houver filtro).
+        """
+        return self.biblia.mascara(livro=livro, capitulo_min=capitulo_min, capitulo_max=capitulo_max, testamento=testamento)
+
+    def buscar(self, query: str, k: int = 20, mascara: np.ndarray | None = None) -> list[tuple[int, float]]:
+        """
+        Retorna [(posição do versículo, pontuação)] dos k melhores resultados BM25.
+        """
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for token in set(tokenizar(query)):
+            termo = self.vocabulario.get(token)
+            if termo is None:
+                continue
+            inicio, fim = self.offsets[termo], self.offsets[termo + 1]
+            docs = self.postings_doc[inicio:fim]
+            tf = self.postings_tf[inicio:fim]
+            scores[docs] += self.idf[termo] * tf * (self.k1 + 1.0) / (tf + self.norma_doc[docs])
+        if mascara is not None:
+            scores[~mascara] = 0.0
+        candidatos = np.flatnonzero(scores)
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(-scores[candidatos], k - 1)[:k]]
+        candidatos = candidatos[np.argsort(-scores[candidatos], kind="stable")]
+        return [(int(i), float(scores[i])) for i in candidatos]
+
+
+_indice: BM25Index | None = None
+_lock = threading.Lock()
+
+
+def obter_indice_bm25() -> BM25Index:
+    """
+    Retorna o índice BM25 do processo, reconstruído quando o índice da Bíblia muda.
+    """
+    global _indice
+    biblia = obter_indice_biblia()
+    if _indice is None or _indice.biblia is not biblia:
+        with _lock:
+            if _indice is None or _indice.biblia is not biblia:
+                _indice = BM25Index(biblia)
+    return _indice
@@ -1,28 +1,94 @@
+import hashlib
 import json
+import os
+import time
 import chromadb
 import logging
+import numpy as np
 from langchain_huggingface import HuggingFaceEmbeddings
 from chromadb.api.types import EmbeddingFunction
+from src.biblia_index import BIBLIA_PATH, obter_indice_biblia
+from src.embedding_cache import QueryEmbeddingCache, normalizar_consulta
+from src.indexing_pipeline import IndexingPipeline
+from src.embedding_artifact import EmbeddingArtifact, diretorio_artefato, ler_vetores_da_colecao, normalizar_linhas
+from src import tracing
 
 # Logger de módulo (não configurar root logger aqui para evitar duplicação em apps como Streamlit)
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+CHROMA_PATH = "./data/chroma_db"
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+BIBLIA_COLLECTION = "biblia_ave_maria"
+# Coleções de granularidade maior, montadas na mesma passada de ingestão dos versículos
+PASSAGENS_COLLECTION = "biblia_ave_maria_passagens"
+CAPITULOS_COLLECTION = "biblia_ave_maria_capitulos"
+# Passagens: janelas de PASSAGEM_JANELA versículos deslizando de PASSAGEM_PASSO em PASSAGEM_PASSO
+PASSAGEM_JANELA = 4
+PASSAGEM_PASSO = 2
+
+def calcular_hash_arquivo(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
 class LangchainEmbeddingFunction(EmbeddingFunction):
-    def __init__(self, embedder):
+    def __init__(self, embedder, model_name: str = EMBEDDING_MODEL, cache: QueryEmbeddingCache | None = None):
         self.embedder = embedder
+        self.model_name = model_name
+        self.cache = cache
 
     def __call__(self, input: list[str]) -> list[list[float]]:
         logger.info(f"Gerando embeddings para {len(input)} documentos")
         return self.embedder.embed_documents(input)
 
+    def embed_query(self, input: list[str]) -> list[list[float]]:
+        with tracing.span("embedding.consulta", textos=len(input)) as atributos:
+            if self.cache is None:
+                return self.embedder.embed_documents(list(input))
+
+            # A consulta normalizada é só a chave do cache (variações de caixa e espaçamento
+            # compartilham a entrada); o modelo recebe o texto original, como sem cache
+            chaves = [normalizar_consulta(texto) for texto in input]
+            vetores = [self.cache.get(self.model_name, chave) for chave in chaves]
+            faltando = [i for i, vetor in enumerate(vetores) if vetor is None]
+            if faltando:
+                # As consultas fora do cache são codificadas juntas, em um único encode
+                # (uma vez por chave, mesmo que ela se repita no lote)
+                originais = {}
+                for i in faltando:
+                    originais.setdefault(chaves[i], input[i])
+                novos = dict(zip(originais, self.embedder.embed_documents(list(originais.values()))))
+                for chave, vetor in novos.items():
+                    self.cache.put(self.model_name, chave, vetor)
+                for i in faltando:
+                    vetores[i] = novos[chaves[i]]
+            acertos = len(chaves) - len(faltando)
+            atributos["cache_acertos"] = acertos
+            tracing.contar("cache_embeddings.acertos", acertos)
+            tracing.contar("cache_embeddings.erros", len(faltando))
+            return vetores
+
 class ChromaDB:
     def __init__(self):
         logger.info("Inicializando ChromaDB")
-        self.client = chromadb.PersistentClient(path="./data/chroma_db")
-        self.biblia_path = "./data/biblia_ave_maria.json"
-        self.embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-        self.functiom_embedder = LangchainEmbeddingFunction(self.embedding)
+        self.client = chromadb.PersistentClient(path=CHROMA_PATH)
+        self.biblia_path = BIBLIA_PATH
+        self.model_name = EMBEDDING_MODEL
+        # Paralelismo da indexação em massa (processos de embedding e batch do encode)
+        self.embedding_workers = int(os.getenv("EMBEDDING_WORKERS", "1"))
+        self.encode_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.embedding = HuggingFaceEmbeddings(
+            model_name=self.model_name,
+            encode_kwargs={"batch_size": self.encode_batch_size}
+        )
+        self.embedding_cache = QueryEmbeddingCache(
+            max_itens=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+            path=os.getenv("EMBEDDING_CACHE_PATH") or None
+        )
+        self.functiom_embedder = LangchainEmbeddingFunction(self.embedding, self.model_name, self.embedding_cache)
 
     def load_json(self, filepath: str):
         logger.info(f"Carregando JSON: {filepath}")
@@ -33,7 +99,8 @@ class ChromaDB:
         logger.info(f"Obtendo coleção: {name}")
         if name in [col.name for col in self.client.list_collections()]:
             logger.info(f"Coleção '{name}' já existe")
-            return self.client.get_collection(name=name)
+            # Sempre associa o embedder do projeto; sem ele o Chroma usaria o modelo padrão
+            return self.client.get_collection(name=name, embedding_function=self.functiom_embedder)
         
         logger.info(f"Coleção '{name}' não existe. Criando...")
         return self.client.create_collection(
@@ -55,7 +122,7 @@ class ChromaDB:
     def add_documents(self, collection_name: str, docs: list, ids: list):
         logger.info(f"Adicionando {len(docs)} documentos à coleção '{collection_name}'")
         collection = self._get_collection(collection_name)
-        existing_ids = set(collection.get()["ids"])  # todos os ids já existentes
+        existing_ids = set(collection.get(include=[])["ids"])  # todos os ids já existentes
         new_docs, new_ids = [], []
 
         for doc, doc_id in zip(docs, ids):
@@ -73,45 +140,225 @@ class ChromaDB:
 
     def _add_in_batches(self, collection_name: str, docs: list, ids: list, metadatas: list, batch_size: int = 5000):
         logger.info(f"Adicionando documentos com metadados em lotes de {batch_size} para '{collection_name}'")
+        collection = self._get_collection(collection_name)
         for i in range(0, len(docs), batch_size):
             batch_docs = docs[i:i + batch_size]
             batch_ids = ids[i:i + batch_size]
             batch_metadatas = metadatas[i:i + batch_size]
             logger.info(f"Adicionando lote {i // batch_size + 1} com {len(batch_docs)} documentos")
-            collection = self._get_collection(collection_name)
             collection.add(documents=batch_docs, ids=batch_ids, metadatas=batch_metadatas)
 
+    def _hashes_existentes(self, collection, page_size: int = 10000) -> dict:
+        """
+        Retorna {id: hash} de todos os documentos da coleção, paginando a leitura.
+        """
+        existentes = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            for doc_id, meta in zip(page["ids"], page["metadatas"]):
+                existentes[doc_id] = (meta or {}).get("hash")
+            if len(page["ids"]) < page_size:
+                return existentes
+            offset += page_size
+
+    def sincronizar_colecao(self, collection, docs: list, ids: list, metadatas: list, batch_size: int = 1000, vetores=None):
+        """
+        Sincroniza a coleção com os documentos informados, sem apagar e reconstruir tudo:
+        compara por id e hash (texto + modelo de embedding), remove os ids que não existem
+        mais e faz upsert apenas do que mudou, com embeddings calculados pelo IndexingPipeline
+        ou, se `vetores` (alinhado com ids) for informado, copiados dele sem rodar o modelo.
+
+        O hash gravado nos metadados de cada documento funciona como checkpoint: cada lote
+        confirmado fica marcado como atualizado, então uma sincronização interrompida é
+        retomada de onde parou na próxima execução.
+        """
+        existentes = self._hashes_existentes(collection)
+        novos_ids = set(ids)
+
+        removidos = [doc_id for doc_id in existentes if doc_id not in novos_ids]
+        for i in range(0, len(removidos), batch_size):
+            collection.delete(ids=removidos[i:i + batch_size])
+
+        def pendentes():
+            # Produtor em streaming: só os documentos novos ou alterados seguem para embedding
+            for posicao, (doc, doc_id, meta) in enumerate(zip(docs, ids, metadatas)):
+                doc_hash = hashlib.sha1(f"{self.model_name}\x00{doc}".encode("utf-8")).hexdigest()
+                if existentes.get(doc_id) != doc_hash:
+                    yield posicao, (doc, doc_id, {**meta, "hash": doc_hash})
+
+        if vetores is not None:
+            atualizados = self._gravar_vetores_prontos(collection, pendentes(), vetores, batch_size)
+            logger.info(f"Sincronização de '{collection.name}' pelo artefato: {atualizados} atualizados, {len(ids) - atualizados} inalterados")
+            return atualizados, len(removidos)
+
+        logger.info(f"Sincronizando '{collection.name}': {len(removidos)} removidos, {self.embedding_workers} worker(s) de embedding")
+        pipeline = IndexingPipeline(
+            self.embedding,
+            self.model_name,
+            workers=self.embedding_workers,
+            chunk_size=batch_size,
+            encode_batch_size=self.encode_batch_size
+        )
+        resultado = pipeline.executar(collection, (item for _, item in pendentes()))
+        logger.info(f"Sincronização de '{collection.name}': {resultado['documentos']} atualizados, {len(ids) - resultado['documentos']} inalterados")
+        return resultado["documentos"], len(removidos)
+
+    def _gravar_vetores_prontos(self, collection, pendentes, vetores, batch_size: int) -> int:
+        """
+        Grava em lotes os itens (posição, (doc, id, metadata)) com os vetores já calculados.
+        """
+        inicio = time.perf_counter()
+        gravados = 0
+        lote = []
+
+        def gravar():
+            collection.upsert(
+                documents=[doc for _, (doc, _, _) in lote],
+                ids=[doc_id for _, (_, doc_id, _) in lote],
+                metadatas=[meta for _, (_, _, meta) in lote],
+                embeddings=np.asarray(vetores[[posicao for posicao, _ in lote]], dtype=np.float32)
+            )
+
+        for item in pendentes:
+            lote.append(item)
+            if len(lote) >= batch_size:
+                gravar()
+                gravados += len(lote)
+                lote = []
+        if lote:
+            gravar()
+            gravados += len(lote)
+        logger.info(f"{gravados} vetores pré-calculados gravados em {time.perf_counter() - inicio:.1f}s")
+        return gravados
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(CHROMA_PATH, f"{name}.manifest.json")
+
+    def _ler_manifest(self, name: str) -> dict | None:
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Manifesto inválido para '{name}': {e}")
+            return None
+
+    def _salvar_manifest(self, name: str, manifest: dict):
+        os.makedirs(CHROMA_PATH, exist_ok=True)
+        with open(self._manifest_path(name), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    def documentos_biblia(self):
+        """
+        Monta (docs, ids, metadatas) de todos os versículos a partir do índice da Bíblia.
+        """
+        # Reutiliza o índice da Bíblia compartilhado com as ferramentas (evita um segundo parse)
+        return obter_indice_biblia(self.biblia_path).documentos()
+
+    def _colecao_atualizada(self, name: str, collection, esperado: dict) -> bool:
+        """
+        Verificação rápida pelo manifesto: todos os campos esperados (hash do JSON, modelo,
+        configuração) iguais e a mesma contagem de documentos da coleção.
+        """
+        manifest = self._ler_manifest(name)
+        return (
+            manifest is not None
+            and all(manifest.get(chave) == valor for chave, valor in esperado.items())
+            and manifest.get("count") == collection.count()
+        )
+
+    def vetores_capitulos(self, vetores_versiculos, metadatas_capitulos: list) -> np.ndarray:
+        """
+        Embedding de cada capítulo como a média normalizada dos vetores dos seus versículos
+        (capítulos ocupam faixas contíguas na ordem dos versículos), sem rodar o modelo.
+        """
+        quantidades = np.asarray([meta["versiculos"] for meta in metadatas_capitulos])
+        inicios = np.concatenate(([0], np.cumsum(quantidades)[:-1]))
+        somas = np.add.reduceat(normalizar_linhas(np.asarray(vetores_versiculos, dtype=np.float32)), inicios, axis=0)
+        return normalizar_linhas(somas / quantidades[:, None])
+
+    def vetores_passagens(self, vetores_versiculos, ids_versiculos: list, metadatas_passagens: list) -> np.ndarray:
+        """
+        Embedding de cada passagem como a média normalizada dos vetores dos seus versículos
+        (passagens são faixas contíguas na ordem dos versículos), sem rodar o modelo.
+        """
+        posicoes = {doc_id: i for i, doc_id in enumerate(ids_versiculos)}
+        inicios = np.asarray([posicoes[f"{m['livro']} {m['capitulo']}:{m['versiculo_inicio']}"] for m in metadatas_passagens])
+        fins = np.asarray([posicoes[f"{m['livro']} {m['capitulo']}:{m['versiculo_fim']}"] + 1 for m in metadatas_passagens])
+        # Somas acumuladas em float64: a soma de cada faixa sai de uma subtração
+        acumulado = np.zeros((len(ids_versiculos) + 1, np.shape(vetores_versiculos)[1]), dtype=np.float64)
+        np.cumsum(normalizar_linhas(np.asarray(vetores_versiculos, dtype=np.float32)), axis=0, out=acumulado[1:])
+        somas = acumulado[fins] - acumulado[inicios]
+        return normalizar_linhas((somas / (fins - inicios)[:, None]).astype(np.float32))
+
     def ensure_collections(self):
         logger.info("Garantindo coleções e atualizando dados se necessário")
 
         # ---------------- BÍBLIA ----------------
         logger.info("Processando coleção Bíblia Ave Maria")
-        biblia = self.load_json(self.biblia_path)
-        docs, ids, metadatas = [], [], []
-        for livro in biblia["antigoTestamento"] + biblia.get("novoTestamento", []):
-            for cap in livro["capitulos"]:
-                for versiculo in cap["versiculos"]:
-                    texto = versiculo["texto"]
-                    ref = f"{livro['nome']} {cap['capitulo']}:{versiculo['versiculo']}"
-                    docs.append(texto)
-                    ids.append(ref)
-                    metadatas.append({
-                        "livro": livro["nome"],
-                        "capitulo": cap["capitulo"],
-                        "versiculo": versiculo["versiculo"]
-                    })
-
-        collection_name = "biblia_ave_maria"
+        collection_name = BIBLIA_COLLECTION
         collection = self._get_collection(collection_name)
-        if len(collection.get()["ids"]) != len(ids):
+
+        # Verificação rápida pelo manifesto: hash do JSON, modelo de embedding e contagem.
+        # O JSON só é lido e os documentos só são montados quando é preciso reindexar.
+        source_hash = calcular_hash_arquivo(self.biblia_path)
+        esperado = {"source_hash": source_hash, "model_name": self.model_name}
+        # Vetores dos versículos, quando já estiverem em memória (reaproveitados pelos capítulos)
+        vetores = None
+        if self._colecao_atualizada(collection_name, collection, esperado):
+            logger.info(f"Coleção '{collection_name}' já está atualizada")
+        else:
             logger.info(f"Atualizando coleção '{collection_name}'")
-            self.client.delete_collection(collection_name)
-            collection = self._get_collection(collection_name)
-            self._add_in_batches(collection_name, docs, ids, metadatas)
+            docs, ids, metadatas = self.documentos_biblia()
+            # Com um artefato de embeddings do mesmo JSON e modelo, a carga não roda o modelo
+            artefato = EmbeddingArtifact.carregar(diretorio_artefato(collection_name), source_hash, self.model_name)
+            if artefato is not None:
+                if artefato.ids == ids:
+                    vetores = artefato.vetores
+                else:
+                    logger.warning(f"Artefato de embeddings de '{collection_name}' não corresponde aos versículos, ignorado")
+            self.sincronizar_colecao(collection, docs, ids, metadatas, vetores=vetores)
+            self._salvar_manifest(collection_name, {**esperado, "count": len(ids)})
+
+        def vetores_versiculos():
+            # Passagens e capítulos derivam dos vetores dos versículos; se não vieram do
+            # artefato nesta execução, são lidos da coleção (o modelo não roda de novo)
+            nonlocal vetores
+            if vetores is None:
+                vetores = ler_vetores_da_colecao(collection, self.documentos_biblia()[1])
+            return vetores
+
+        # ---------------- PASSAGENS ----------------
+        logger.info("Processando coleção de passagens")
+        passagens = self._get_collection(PASSAGENS_COLLECTION)
+        esperado_passagens = {**esperado, "janela": PASSAGEM_JANELA, "passo": PASSAGEM_PASSO}
+        if self._colecao_atualizada(PASSAGENS_COLLECTION, passagens, esperado_passagens):
+            logger.info(f"Coleção '{PASSAGENS_COLLECTION}' já está atualizada")
         else:
-            logger.info(f"Coleção '{collection_name}' já está atualizada")
+            logger.info(f"Atualizando coleção '{PASSAGENS_COLLECTION}'")
+            # O índice da Bíblia (parse do JSON) só é montado quando há o que reconstruir
+            docs, ids, metadatas = obter_indice_biblia(self.biblia_path).passagens(PASSAGEM_JANELA, PASSAGEM_PASSO)
+            vetores_passagens = self.vetores_passagens(vetores_versiculos(), self.documentos_biblia()[1], metadatas)
+            self.sincronizar_colecao(passagens, docs, ids, metadatas, vetores=vetores_passagens)
+            self._salvar_manifest(PASSAGENS_COLLECTION, {**esperado_passagens, "count": len(ids)})
+
+        # ---------------- CAPÍTULOS ----------------
+        logger.info("Processando coleção de capítulos")
+        capitulos = self._get_collection(CAPITULOS_COLLECTION)
+        if self._colecao_atualizada(CAPITULOS_COLLECTION, capitulos, esperado):
+            logger.info(f"Coleção '{CAPITULOS_COLLECTION}' já está atualizada")
+        else:
+            logger.info(f"Atualizando coleção '{CAPITULOS_COLLECTION}'")
+            docs, ids, metadatas = obter_indice_biblia(self.biblia_path).capitulos()
+            self.sincronizar_colecao(capitulos, docs, ids, metadatas, vetores=self.vetores_capitulos(vetores_versiculos(), metadatas))
+            self._salvar_manifest(CAPITULOS_COLLECTION, {**esperado, "count": len(ids)})
 
         logger.info("Todas as coleções foram processadas com sucesso")
         return {
-            "biblia": self._get_collection("biblia_ave_maria")
+            "biblia": collection,
+            "passagens": passagens,
+            "capitulos": capitulos
         }
@@ -0,0 +1,227 @@
+import os
+import re
+import threading
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+import numpy as np
+from src import tracing
+from src.embedding_artifact import normalizar_linhas
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Modelo cujo tokenizer é usado para medir o contexto enviado ao LLM
+TOKENIZER_MODEL = "gpt-4o-mini"
+# Orçamento padrão de tokens de contexto (saídas de ferramentas) por pergunta
+CONTEXT_TOKEN_BUDGET = 3000
+# Tamanho máximo de uma entrada do Easton depois da extração das frases relevantes
+CONTEXT_EASTON_MAX_TOKENS = 350
+# Abaixo disso não vale a pena enviar um pedaço truncado
+MINIMO_TOKENS = 40
+
+AVISO_TRUNCADO = "[... conteúdo truncado: orçamento de contexto desta pergunta atingido]"
+AVISO_ESGOTADO = "Orçamento de contexto desta pergunta esgotado; responda com o que já foi recuperado."
+
+FIM_DE_FRASE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-ZÀ-Ý])")
+
+_encoding = None
+_encoding_carregado = False
+_lock = threading.Lock()
+
+
+def _obter_encoding():
+    """
+    Tokenizer local do modelo (tiktoken), carregado uma vez. Retorna None se o tiktoken
+    não estiver instalado ou não conseguir carregar o vocabulário (ex.: sem rede no
+    primeiro uso); nesse caso a contagem é estimada.
+    """
+    global _encoding, _encoding_carregado
+    if not _encoding_carregado:
+        with _lock:
+            if not _encoding_carregado:
+                try:
+                    import tiktoken
+                    try:
+                        _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+                    except KeyError:
+                        _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning("Tokenizer indisponível (%s); usando estimativa de 4 caracteres por token", e)
+                    _encoding = None
+                _encoding_carregado = True
+    return _encoding
+
+
+def contar_tokens(texto: str) -> int:
+    encoding = _obter_encoding()
+    if encoding is None:
+        return (len(texto) + 3) // 4
+    return len(encoding.encode(texto, disallowed_special=()))
+
+
+def truncar_tokens(texto: str, limite: int) -> str:
+    """
+    Corta o texto em `limite` tokens, recuando até o último espaço para não partir palavras.
+    """
+    encoding = _obter_encoding()
+    if encoding is None:
+        if len(texto) <= limite * 4:
+            return texto
+        cortado = texto[:limite * 4]
+    else:
+        tokens = encoding.encode(texto, disallowed_special=())
+        if len(tokens) <= limite:
+            return texto
+        cortado = encoding.decode(tokens[:limite])
+    espaco = cortado.rfind(" ")
+    return cortado[:espaco] if espaco > len(cortado) // 2 else cortado
+
+
+def dividir_frases(texto: str) -> list[str]:
+    return [f.strip() for f in FIM_DE_FRASE.split(texto) if f.strip()]
+
+
+def extrair_frases_relevantes(texto: str, consulta: str, limite_tokens: int, embedder) -> str:
+    """
+    Reduz um texto longo (ex.: entrada do Easton) a `limite_tokens`: mantém a primeira
+    frase (a definição) e completa com as frases mais próximas da consulta no espaço de
+    embeddings, na ordem original, marcando com "..." os trechos omitidos.
+    `embedder` é a função de embedding do projeto (embed_query para a consulta, chamada
+    direta para as frases).
+    """
+    if contar_tokens(texto) <= limite_tokens:
+        return texto
+    frases = dividir_frases(texto)
+    if len(frases) <= 1:
+        return truncar_tokens(texto, limite_tokens) + " ..."
+
+    with tracing.span("contexto.frases_relevantes", frases=len(frases)):
+        consulta_vetor = normalizar_linhas(np.asarray(embedder.embed_query([consulta]), dtype=np.float32))[0]
+        similaridades = normalizar_linhas(np.asarray(embedder(frases), dtype=np.float32)) @ consulta_vetor
+
+    tamanhos = [contar_tokens(f) for f in frases]
+    escolhidas = {0}
+    usados = tamanhos[0]
+    for i in np.argsort(-similaridades, kind="stable"):
+        if i not in escolhidas and usados + tamanhos[i] <= limite_tokens:
+            escolhidas.add(int(i))
+            usados += tamanhos[i]
+    if usados > limite_tokens:
+        # A própria definição já passa do limite
+        return truncar_tokens(frases[0], limite_tokens) + " ..."
+
+    partes, anterior = [], -1
+    for i in sorted(escolhidas):
+        if i != anterior + 1:
+            partes.append("...")
+        partes.append(frases[i])
+        anterior = i
+    if anterior != len(frases) - 1:
+        partes.append("...")
+    tracing.contar("contexto.frases_omitidas", len(frases) - len(escolhidas))
+    return " ".join(partes)
+
+
+class OrcamentoContexto:
+    """
+    Estado de empacotamento do contexto de uma pergunta: tokens já enviados ao LLM pelas
+    ferramentas (limitados a `limite`) e versículos já enviados, para que uma ferramenta
+    não repita o que outra (ou uma chamada anterior) já trouxe.
+    """
+
+    def __init__(self, pergunta: str, limite: int):
+        self.pergunta = pergunta
+        self.limite = limite
+        self.usados = 0
+        self._versiculos = set()
+        self._lock = threading.Lock()
+
+    @property
+    def restante(self) -> int:
+        return max(0, self.limite - self.usados)
+
+    def ja_enviados(self, versiculos: list[dict]) -> list[bool]:
+        """
+        Para cada versículo ({livro, capitulo, versiculo}), se ele já foi enviado nesta
+        pergunta. Os ainda não enviados passam a contar como enviados.
+        """
+        flags = []
+        with self._lock:
+            for v in versiculos:
+                chave = (v["livro"], str(v["capitulo"]), str(v["versiculo"]))
+                flags.append(chave in self._versiculos)
+                self._versiculos.add(chave)
+        repetidos = sum(flags)
+        if repetidos:
+            tracing.contar("contexto.versiculos_repetidos", repetidos)
+        return flags
+
+    def consumir(self, texto: str) -> str:
+        """
+        Desconta o texto do orçamento, truncando-o (ou trocando-o por um aviso) quando
+        não couber no que resta.
+        """
+        tokens = contar_tokens(texto)
+        with self._lock:
+            restante = self.restante
+            if tokens <= restante:
+                self.usados += tokens
+                tracing.contar("contexto.tokens", tokens)
+                return texto
+            if restante < MINIMO_TOKENS:
+                tracing.contar("contexto.esgotado")
+                return AVISO_ESGOTADO
+            self.usados = self.limite
+        tracing.contar("contexto.tokens", restante)
+        tracing.contar("contexto.truncamentos")
+        logger.info("Saída de ferramenta com %d tokens truncada para %d (orçamento de contexto)", tokens, restante)
+        return truncar_tokens(texto, restante - contar_tokens(AVISO_TRUNCADO)) + "\n" + AVISO_TRUNCADO
+
+
+_orcamento: ContextVar[OrcamentoContexto | None] = ContextVar("orcamento_contexto", default=None)
+
+
+@contextmanager
+def orcamento(pergunta: str, limite: int | None = None):
+    """
+    Abre o orçamento de contexto da pergunta. As ferramentas chamadas dentro do bloco
+    (inclusive em threads que copiam o contexto) compartilham o mesmo orçamento.
+    """
+    if limite is None:
+        limite = int(os.getenv("CONTEXT_TOKEN_BUDGET", str(CONTEXT_TOKEN_BUDGET)))
+    atual = OrcamentoContexto(pergunta, limite)
+    token = _orcamento.set(atual)
+    try:
+        yield atual
+    finally:
+        _orcamento.reset(token)
+        tracing.anotar(contexto_tokens=atual.usados, contexto_limite=atual.limite)
+
+
+def orcamento_atual() -> OrcamentoContexto | None:
+    return _orcamento.get()
+
+
+def empacotar(texto: str) -> str:
+    """
+    Aplica o orçamento da pergunta atual à saída de uma ferramenta (sem orçamento aberto,
+    como nas abas da interface, o texto volta inalterado).
+    """
+    atual = orcamento_atual()
+    return texto if atual is None else atual.consumir(texto)
+
+
+def versiculos_novos(versiculos: list[dict]) -> list[dict]:
+    """
+    Remove os versículos já enviados nesta pergunta.
+    """
+    atual = orcamento_atual()
+    if atual is None:
+        return versiculos
+    return [v for v, repetido in zip(versiculos, atual.ja_enviados(versiculos)) if not repetido]
+
+
+def limite_easton() -> int:
+    return int(os.getenv("CONTEXT_EASTON_MAX_TOKENS", str(CONTEXT_EASTON_MAX_TOKENS)))
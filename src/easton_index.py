@@ -0,0 +1,175 @@
+import bisect
+import json
+from collections import Counter
+import os
+import threading
+import logging
+from src.text_utils import normalizar_texto
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+EASTON_PATH = "./data/dicionario_easton.json"
+
+
+def _bigramas(texto: str) -> Counter:
+    return Counter(texto[i:i + 2] for i in range(len(texto) - 1))
+
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    """
+    Distância de Levenshtein entre a e b, interrompida assim que ultrapassar o limite
+    (nesse caso retorna limite + 1).
+    """
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        atual = [i] + [0] * len(b)
+        for j, cb in enumerate(b, start=1):
+            atual[j] = min(
+                anterior[j] + 1,                 # remoção
+                atual[j - 1] + 1,                # inserção
+                anterior[j - 1] + (ca != cb),    # substituição
+            )
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+class EastonIndex:
+    """
+    Índice do Dicionário de Easton construído uma única vez: mapa de termos normalizados
+    para acertos exatos, lista ordenada para busca por prefixo e fallback por distância
+    de edição limitada.
+    """
+
+    def __init__(self, dicionario: list, mtime: float | None = None):
+        self.mtime = mtime
+        self._exatos = {}        # termo normalizado -> entrada
+        for item in dicionario:
+            chave = normalizar_texto(item["termo"])
+            # Mantém a primeira ocorrência, como na busca linear original
+            if chave and chave not in self._exatos:
+                self._exatos[chave] = item
+        self._ordenados = sorted(self._exatos)
+        self._por_tamanho = {}   # tamanho do termo normalizado -> termos
+        self._por_bigrama = {}   # bigrama -> [(termo, ocorrências)]
+        for chave in self._ordenados:
+            self._por_tamanho.setdefault(len(chave), []).append(chave)
+            for bigrama, qtd in _bigramas(chave).items():
+                self._por_bigrama.setdefault(bigrama, []).append((chave, qtd))
+        logger.info("Índice do Easton construído: %d termos", len(self._exatos))
+
+    def exato(self, termo: str) -> dict | None:
+        return self._exatos.get(normalizar_texto(termo))
+
+    def por_prefixo(self, termo: str, limite: int = 5) -> list[dict]:
+        """
+        Entradas cujo termo normalizado começa com o termo informado (mais curtos primeiro).
+        """
+        prefixo = normalizar_texto(termo)
+        if not prefixo:
+            return []
+        inicio = bisect.bisect_left(self._ordenados, prefixo)
+        chaves = []
+        for chave in self._ordenados[inicio:]:
+            if not chave.startswith(prefixo):
+                break
+            chaves.append(chave)
+        chaves.sort(key=len)
+        return [self._exatos[c] for c in chaves[:limite]]
+
+    def aproximados(self, termo: str, max_distancia: int | None = None, limite: int = 5) -> list[dict]:
+        """
+        Entradas a até max_distancia edições do termo, ordenadas pela distância.
+        Por padrão não aceita edições em termos de até 3 letras, aceita 1 edição até 7
+        letras e 2 nos demais.
+        """
+        alvo = normalizar_texto(termo)
+        if not alvo:
+            return []
+        if max_distancia is None:
+            max_distancia = 0 if len(alvo) <= 3 else 1 if len(alvo) <= 7 else 2
+        # Filtro de q-gramas: cada edição destrói no máximo 2 bigramas, então um termo a
+        # até k edições compartilha ao menos max(len) - 1 - 2k bigramas com o alvo.
+        minimo = len(alvo) - 1 - 2 * max_distancia
+        if minimo > 0:
+            compartilhados = Counter()
+            for bigrama, qtd in _bigramas(alvo).items():
+                for chave, qtd_chave in self._por_bigrama.get(bigrama, ()):
+                    compartilhados[chave] += min(qtd, qtd_chave)
+            possiveis = [
+                c for c, n in compartilhados.items()
+                if abs(len(c) - len(alvo)) <= max_distancia and n >= max(len(c), len(alvo)) - 1 - 2 * max_distancia
+            ]
+        else:
+            possiveis = [
+                c for tamanho in range(len(alvo) - max_distancia, len(alvo) + max_distancia + 1)
+                for c in self._por_tamanho.get(tamanho, [])
+            ]
+
+        candidatos = []
+        for chave in possiveis:
+            distancia = distancia_edicao(alvo, chave, max_distancia)
+            if distancia <= max_distancia:
+                candidatos.append((distancia, chave))
+        candidatos.sort()
+        return [self._exatos[c] for _, c in candidatos[:limite]]
+
+    def buscar(self, termo: str, limite: int = 5) -> tuple[list[dict], str | None]:
+        """
+        Busca em camadas: exato, depois distância de edição e por fim prefixo.
+        Retorna (entradas, camada), com camada "exato", "aproximado" (a primeira entrada
+        veio da distância de edição), "prefixo" (só houve acertos por prefixo, que são
+        apenas sugestões) ou None quando nada foi encontrado.
+        """
+        item = self.exato(termo)
+        if item is not None:
+            return [item], "exato"
+        resultados = self.aproximados(termo, limite=limite)
+        camada = "aproximado" if resultados else "prefixo"
+        for item in self.por_prefixo(termo, limite=limite):
+            if len(resultados) >= limite:
+                break
+            if item not in resultados:
+                resultados.append(item)
+        return resultados, camada if resultados else None
+
+
+_indices: dict[str, EastonIndex] = {}
+_lock = threading.Lock()
+
+
+def obter_indice_easton(path: str = EASTON_PATH) -> EastonIndex:
+    """
+    Retorna o índice do Easton compartilhado pelo processo, reconstruindo-o quando o
+    mtime do arquivo JSON mudar.
+    """
+    mtime = os.path.getmtime(path)
+    indice = _indices.get(path)
+    if indice is not None and indice.mtime == mtime:
+        return indice
+
+    with _lock:
+        indice = _indices.get(path)
+        if indice is None or indice.mtime != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                dicionario = json.load(f)
+            indice = EastonIndex(dicionario, mtime=mtime)
+            _indices[path] = indice
+        return indice
+
+
+def invalidar_indice_easton(path: str | None = None) -> None:
+    """
+    Descarta o índice em cache (de um arquivo ou de todos), forçando nova leitura.
+    """
+    with _lock:
+        if path is None:
+            _indices.clear()
+        else:
+            _indices.pop(path, None)
+    logger.info("Índice do Easton invalidado: %s", path or "todos")
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import logging
+import numpy as np
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+EMBEDDING_ARTIFACT_PATH = "./data/embeddings"
+# Incrementar quando o formato dos arquivos mudar
+ARTIFACT_FORMAT = 1
+# Linhas normalizadas e gravadas por vez ao salvar os vetores
+BLOCO_GRAVACAO = 8192
+
+
+def diretorio_artefato(collection_name: str, base: str | None = None) -> str:
+    return os.path.join(base or os.getenv("EMBEDDING_ARTIFACT_PATH", EMBEDDING_ARTIFACT_PATH), collection_name)
+
+
+def normalizar_linhas(vetores: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    return vetores / np.maximum(normas, 1e-12)
+
+
+class EmbeddingArtifact:
+    """
+    Artefato de embeddings pré-calculados de uma coleção, gerado no build e lido por
+    memory-map: vetores.npy (float32, N x D, normalizados em L2), documentos.json (ids e
+    metadados, na mesma ordem dos vetores) e manifest.json (formato, hash do JSON de origem,
+    modelo, contagem e dimensão). Vários processos do mesmo host compartilham as páginas
+    dos vetores pelo cache do sistema operacional, sem copiá-los.
+    """
+
+    def __init__(self, path: str, manifest: dict, vetores: np.ndarray, ids: list[str], metadatas: list[dict]):
+        self.path = path
+        self.manifest = manifest
+        self.vetores = vetores
+        self.ids = ids
+        self.metadatas = metadatas
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def carregar(cls, path: str, source_hash: str | None = None, model_name: str | None = None) -> "EmbeddingArtifact | None":
+        """
+        Abre o artefato em path (vetores via np.load(mmap_mode="r")). Retorna None se ele
+        não existir, estiver incompleto ou não corresponder ao hash de origem/modelo pedidos.
+        """
+        manifest_path = os.path.join(path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("formato") != ARTIFACT_FORMAT:
+                logger.info("Artefato de embeddings em %s tem formato %s, ignorado", path, manifest.get("formato"))
+                return None
+            if source_hash is not None and manifest.get("source_hash") != source_hash:
+                logger.info("Artefato de embeddings em %s é de outra versão do JSON, ignorado", path)
+                return None
+            if model_name is not None and manifest.get("model_name") != model_name:
+                logger.info("Artefato de embeddings em %s é de outro modelo (%s), ignorado", path, manifest.get("model_name"))
+                return None
+            vetores = np.load(os.path.join(path, "vetores.npy"), mmap_mode="r")
+            with open(os.path.join(path, "documentos.json"), "r", encoding="utf-8") as f:
+                documentos = json.load(f)
+        except Exception as e:
+            logger.warning("Artefato de embeddings inválido em %s: %s", path, e)
+            return None
+        if vetores.shape != (manifest["count"], manifest["dim"]) or len(documentos["ids"]) != manifest["count"]:
+            logger.warning("Artefato de embeddings em %s está inconsistente com o manifesto", path)
+            return None
+        logger.info("Artefato de embeddings carregado (mmap): %s, %d vetores de dimensão %d", path, *vetores.shape)
+        return cls(path, manifest, vetores, documentos["ids"], documentos["metadatas"])
+
+    @classmethod
+    def salvar(
+        cls,
+        path: str,
+        vetores,
+        ids: list[str],
+        metadatas: list[dict],
+        source_hash: str,
+        model_name: str,
+    ) -> "EmbeddingArtifact":
+        """
+        Grava o artefato de forma atômica (diretório temporário + rename), para que um
+        processo lendo o artefato antigo nunca veja arquivos pela metade. Os vetores são
+        normalizados e escritos no .npy (memory-map) em blocos, sem uma segunda cópia da matriz.
+        """
+        vetores = np.asarray(vetores)
+        if vetores.ndim != 2 or len(vetores) != len(ids):
+            raise ValueError(f"Vetores com formato {vetores.shape} para {len(ids)} ids")
+        temporario = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(temporario, ignore_errors=True)
+        os.makedirs(temporario)
+        destino = np.lib.format.open_memmap(
+            os.path.join(temporario, "vetores.npy"), mode="w+", dtype=np.float32, shape=vetores.shape
+        )
+        for inicio in range(0, len(vetores), BLOCO_GRAVACAO):
+            destino[inicio:inicio + BLOCO_GRAVACAO] = normalizar_linhas(
+                np.asarray(vetores[inicio:inicio + BLOCO_GRAVACAO], dtype=np.float32)
+            )
+        destino.flush()
+        del destino
+        with open(os.path.join(temporario, "documentos.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "metadatas": list(metadatas)}, f, ensure_ascii=False)
+        manifest = {
+            "formato": ARTIFACT_FORMAT,
+            "source_hash": source_hash,
+            "model_name": model_name,
+            "count": int(vetores.shape[0]),
+            "dim": int(vetores.shape[1]),
+            "dtype": "float32",
+            "normalizado": True,
+            "criado_em": time.time(),
+        }
+        # O manifesto é gravado por último: sem ele o diretório não é considerado um artefato
+        with open(os.path.join(temporario, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        antigo = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.replace(path, antigo)
+        os.replace(temporario, path)
+        shutil.rmtree(antigo, ignore_errors=True)
+        logger.info("Artefato de embeddings salvo em %s (%d vetores)", path, manifest["count"])
+        return cls.carregar(path)
+
+
+class ColetorDeVetores:
+    """
+    Destino do IndexingPipeline que, em vez de gravar no Chroma, escreve cada lote de
+    vetores calculados na sua linha de uma matriz float32 pré-alocada (o pipeline reordena
+    os documentos por tamanho), sem manter listas de floats do Python.
+    """
+
+    def __init__(self, ids: list[str]):
+        self.posicoes = {doc_id: i for i, doc_id in enumerate(ids)}
+        self.vetores: np.ndarray | None = None
+        self.preenchidos = np.zeros(len(ids), dtype=bool)
+
+    def upsert(self, documents, ids, metadatas, embeddings):
+        lote = np.asarray(embeddings, dtype=np.float32)
+        if self.vetores is None:
+            # A dimensão só é conhecida no primeiro lote
+            self.vetores = np.empty((len(self.posicoes), lote.shape[1]), dtype=np.float32)
+        linhas = [self.posicoes[doc_id] for doc_id in ids]
+        self.vetores[linhas] = lote
+        self.preenchidos[linhas] = True
+
+    def faltando(self) -> int:
+        return int((~self.preenchidos).sum())
+
+
+def ler_vetores_da_colecao(collection, ids: list[str], page_size: int = 5000) -> np.ndarray:
+    """
+    Lê os embeddings gravados na coleção, na ordem de ids, página a página direto para uma
+    matriz float32 pré-alocada. Levanta ValueError se faltar o vetor de algum id.
+    """
+    coletor = ColetorDeVetores(ids)
+    for i in range(0, len(ids), page_size):
+        pagina = collection.get(ids=ids[i:i + page_size], include=["embeddings"])
+        if len(pagina["ids"]):
+            coletor.upsert(None, pagina["ids"], None, pagina["embeddings"])
+    if coletor.faltando():
+        raise ValueError(f"Coleção '{collection.name}' não tem embeddings de {coletor.faltando()} documentos; rode a indexação antes")
+    return coletor.vetores
+
+
+def exportar_biblia(db, collection_name: str, path: str | None = None, da_colecao: bool = False) -> EmbeddingArtifact:
+    """
+    Gera o artefato dos versículos da Bíblia: calcula os embeddings com o IndexingPipeline
+    (usa EMBEDDING_WORKERS) ou, com da_colecao=True, reaproveita os vetores já gravados no Chroma.
+    """
+    # Importado aqui para evitar import circular (chromadb_utils carrega artefatos)
+    from src.chromadb_utils import calcular_hash_arquivo
+    from src.indexing_pipeline import IndexingPipeline
+
+    path = path or diretorio_artefato(collection_name)
+    source_hash = calcular_hash_arquivo(db.biblia_path)
+    _, ids, metadatas = db.documentos_biblia()
+
+    if da_colecao:
+        vetores = ler_vetores_da_colecao(db.client.get_collection(name=collection_name), ids)
+    else:
+        docs, _, _ = db.documentos_biblia()
+        coletor = ColetorDeVetores(ids)
+        IndexingPipeline(
+            db.embedding,
+            db.model_name,
+            workers=db.embedding_workers,
+            encode_batch_size=db.encode_batch_size
+        ).executar(coletor, zip(docs, ids, metadatas))
+        if coletor.faltando():
+            raise ValueError(f"A indexação não gerou o embedding de {coletor.faltando()} versículos")
+        vetores = coletor.vetores
+
+    return EmbeddingArtifact.salvar(path, vetores, ids, metadatas, source_hash, db.model_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o artefato de embeddings pré-calculados dos versículos.")
+    parser.add_argument("--saida", help="Diretório do artefato (padrão: EMBEDDING_ARTIFACT_PATH/<coleção>)")
+    parser.add_argument("--da-colecao", action="store_true", help="Reaproveita os vetores já gravados no ChromaDB em vez de recalcular")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    from src.chromadb_utils import ChromaDB, BIBLIA_COLLECTION
+
+    artefato = exportar_biblia(ChromaDB(), BIBLIA_COLLECTION, path=args.saida, da_colecao=args.da_colecao)
+    print(artefato.manifest)
+
+
+if __name__ == "__main__":
+    main()
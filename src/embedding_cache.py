@@ -0,0 +1,100 @@
+import atexit
+import json
+import os
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def normalizar_consulta(texto: str) -> str:
+    """
+    Normaliza a consulta para uso como chave de cache (Unicode NFC, sem espaços extras,
+    minúsculas). Ao contrário de normalizar_texto, mantém acentos e espaços entre palavras,
+    para que só variações de caixa e espaçamento compartilhem a mesma chave.
+    """
+    texto = unicodedata.normalize("NFC", texto)
+    return " ".join(texto.split()).lower()
+
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU limitado de embeddings de consultas, indexado por (modelo, texto normalizado),
+    com contadores de acertos/erros/despejos e persistência opcional em disco (JSON).
+    """
+
+    def __init__(self, max_itens: int = 2048, path: str | None = None):
+        self.max_itens = max_itens
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._itens: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path:
+            self.carregar()
+            atexit.register(self.salvar)
+
+    def get(self, model_name: str, texto: str) -> list[float] | None:
+        chave = (model_name, texto)
+        with self._lock:
+            vetor = self._itens.get(chave)
+            if vetor is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return vetor
+
+    def put(self, model_name: str, texto: str, vetor: list[float]) -> None:
+        chave = (model_name, texto)
+        with self._lock:
+            self._itens[chave] = list(vetor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def carregar(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            with self._lock:
+                for model_name, texto, vetor in dados[-self.max_itens:]:
+                    self._itens[(model_name, texto)] = vetor
+            logger.info("Cache de embeddings carregado de %s (%d itens)", self.path, len(self._itens))
+        except Exception as e:
+            logger.warning("Não foi possível carregar o cache de embeddings %s: %s", self.path, e)
+
+    def salvar(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            dados = [[model_name, texto, vetor] for (model_name, texto), vetor in self._itens.items()]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dados, f)
+            os.replace(tmp, self.path)
+            logger.info("Cache de embeddings salvo em %s (%d itens)", self.path, len(dados))
+        except Exception as e:
+            logger.warning("Não foi possível salvar o cache de embeddings %s: %s", self.path, e)
@@ -0,0 +1,147 @@
+import contextvars
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from src.biblia_index import obter_indice_biblia
+from src.easton_index import obter_indice_easton
+from src.system_prompts import RESPOSTA_DIRETA_TEMPLATE
+from src.text_utils import normalizar_texto
+from src.context_packing import empacotar, extrair_frases_relevantes, limite_easton, orcamento_atual
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Candidatas a referência do tipo "Gênesis 5", "1 Coríntios 13:4", "Mt 5:3" (leitura literal
+# fica com o agente ReAct); só valem depois de conferidas no índice da Bíblia. O lookahead
+# deixa as candidatas se sobreporem ("diz 1" não consome o "1" de "1 Coríntios 13")
+REFERENCIA = re.compile(r"(?=\b((?:[1-3]\s*|S[ãa]o\s+)?[A-Za-zÀ-ÿ]+)\s+(\d+)(\s*[:.,]\s*\d+)?)")
+PALAVRA = re.compile(r"[A-Za-zÀ-ÿ][A-Za-zÀ-ÿ\-]+")
+
+# Distância de cosseno máxima do melhor versículo para o modo rápido responder sem o ReAct
+FAST_PATH_MAX_DISTANCE = 0.65
+# Threads do pool compartilhado para as buscas concorrentes do modo rápido
+FAST_PATH_WORKERS = 8
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FAST_PATH_WORKERS", str(FAST_PATH_WORKERS))), thread_name_prefix="fast-path"
+)
+
+
+class FastPath:
+    """
+    Modo rápido "recupera e depois gera": executa a busca semântica e a consulta ao Easton
+    em paralelo, busca o trecho do capítulo do melhor versículo assim que ele chega e faz
+    uma única chamada de geração ao LLM. Quando a pergunta não se encaixa nesse plano
+    (leitura literal de capítulo ou nenhum versículo próximo o bastante), coletar() retorna
+    None e o agente ReAct assume.
+    """
+
+    def __init__(self, retrieval, n_results: int = 5, max_distancia: float | None = None, janela: int = 5, max_entidades: int = 2):
+        self.retrieval = retrieval
+        self.n_results = n_results
+        if max_distancia is None:
+            max_distancia = float(os.getenv("FAST_PATH_MAX_DISTANCE", str(FAST_PATH_MAX_DISTANCE)))
+        self.max_distancia = max_distancia
+        self.janela = janela
+        self.max_entidades = max_entidades
+
+    def _referencia_literal(self, question: str) -> bool:
+        """
+        Se a pergunta cita um capítulo: o livro precisa existir no índice e ter o capítulo.
+        Abreviações coincidem com palavras comuns ("os 10 mandamentos" -> Oséias), então
+        sem o nome do livro só contam com versículo ("Os 6:6").
+        """
+        indice = obter_indice_biblia()
+        for m in REFERENCIA.finditer(question):
+            livro, capitulo, versiculo = m.groups()
+            livro_obj = indice.encontrar_livro(livro)
+            if livro_obj is None or indice.obter_capitulo(livro_obj["nome"], capitulo) is None:
+                continue
+            abreviacao = normalizar_texto(livro) == normalizar_texto(livro_obj.get("abreviacao", ""))
+            if abreviacao and normalizar_texto(livro) != normalizar_texto(livro_obj["nome"]) and versiculo is None:
+                continue
+            return True
+        return False
+
+    def _buscar_entidades(self, question: str) -> list[dict]:
+        """
+        Entradas do Easton cujo termo aparece na pergunta (palavras e pares de palavras).
+        """
+        indice = obter_indice_easton()
+        palavras = PALAVRA.findall(question)
+        # Pares de palavras primeiro, depois nomes próprios e por fim as demais palavras
+        candidatos = [f"{a} {b}" for a, b in zip(palavras, palavras[1:])]
+        candidatos += sorted((p for p in palavras if len(p) >= 4), key=lambda p: not p[0].isupper())
+        entradas = []
+        for candidato in candidatos:
+            item = indice.exato(candidato)
+            if item is not None and item not in entradas:
+                entradas.append(item)
+            if len(entradas) >= self.max_entidades:
+                break
+        return entradas
+
+    def _trecho_capitulo(self, versiculo: dict) -> tuple[str, list] | None:
+        """
+        Versículos vizinhos do melhor resultado, lidos do índice em memória (sem LLM).
+        """
+        encontrado = obter_indice_biblia().trecho(
+            versiculo["livro"], versiculo["capitulo"], versiculo["versiculo"], contexto=self.janela
+        )
+        if encontrado is None:
+            return None
+        livro_obj, trecho = encontrado
+        referencia = f"{livro_obj['nome']} {versiculo['capitulo']}:{trecho[0]['versiculo']}-{trecho[-1]['versiculo']}"
+        return referencia, [{**v, "livro": livro_obj["nome"], "capitulo": versiculo["capitulo"]} for v in trecho]
+
+    def coletar(self, question: str) -> str | None:
+        """
+        Recupera o contexto da pergunta ou None se ela deve seguir para o agente ReAct.
+        """
+        if self._referencia_literal(question):
+            logger.info("Modo rápido: referência literal de capítulo, usando agente ReAct")
+            return None
+
+        # Cada tarefa leva uma cópia do contexto para que seus spans entrem no trace da requisição
+        futuro_versiculos = _executor.submit(contextvars.copy_context().run, self.retrieval.buscar_hibrido, question, self.n_results)
+        futuro_entidades = _executor.submit(contextvars.copy_context().run, self._buscar_entidades, question)
+
+        versiculos = futuro_versiculos.result()
+        # A busca lexical só reordena: exige ao menos um versículo vetorialmente próximo
+        distancias = [v["distancia"] for v in versiculos if v["distancia"] is not None]
+        if not distancias or min(distancias) > self.max_distancia:
+            logger.info("Modo rápido: nenhum versículo próximo o bastante, usando agente ReAct")
+            futuro_entidades.cancel()
+            return None
+        futuro_capitulo = _executor.submit(contextvars.copy_context().run, self._trecho_capitulo, versiculos[0])
+        entidades = futuro_entidades.result()
+        capitulo = futuro_capitulo.result()
+
+        orcamento = orcamento_atual()
+        partes = ["## Versículos encontrados"]
+        partes += [f"{v['livro']} {v['capitulo']}:{v['versiculo']} — {v['texto']}" for v in versiculos]
+        if orcamento is not None:
+            orcamento.ja_enviados(versiculos)
+        if capitulo is not None:
+            referencia, trecho = capitulo
+            # Versículos já listados acima viram só o número, mantendo a sequência do trecho
+            repetidos = orcamento.ja_enviados(trecho) if orcamento is not None else [False] * len(trecho)
+            partes += [f"## Contexto do capítulo ({referencia})", "\n".join(
+                f"{v['versiculo']}. (ver acima)" if repetido else f"{v['versiculo']}. {v['texto']}"
+                for v, repetido in zip(trecho, repetidos)
+            )]
+        for item in entidades:
+            descricao = item["descricao"]
+            if orcamento is not None:
+                descricao = extrair_frases_relevantes(descricao, question, limite_easton(), self.retrieval.db.functiom_embedder)
+            partes += [f"## Dicionário de Easton: {item['termo']}", descricao]
+        logger.info(
+            "Modo rápido: %d versículos, capítulo=%s, %d entradas do Easton",
+            len(versiculos), capitulo is not None, len(entidades)
+        )
+        return empacotar("\n\n".join(partes))
+
+    def prompt(self, question: str, contexto: str) -> str:
+        return RESPOSTA_DIRETA_TEMPLATE.format(question=question, contexto=contexto)
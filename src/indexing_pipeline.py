@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Embedder carregado uma vez em cada processo worker
+_worker_embedder = None
+
+
+def _iniciar_worker(model_name: str, encode_batch_size: int, threads: int):
+    global _worker_embedder
+    try:
+        import torch
+        # Evita que N processos disputem todos os núcleos cada um
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_embedder = HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": encode_batch_size})
+
+
+def _embed_no_worker(textos: list[str]) -> list[list[float]]:
+    return _worker_embedder.embed_documents(textos)
+
+
+def agrupar_por_tamanho(itens, chunk_size: int, janela: int):
+    """
+    Lê os itens (doc, id, metadata) em janelas, ordena cada janela pelo tamanho do texto
+    e a corta em lotes de chunk_size. Textos de tamanho parecido no mesmo lote reduzem o
+    padding gasto pelo transformer.
+    """
+    buffer = []
+    for item in itens:
+        buffer.append(item)
+        if len(buffer) >= janela:
+            buffer.sort(key=lambda x: len(x[0]))
+            for i in range(0, len(buffer), chunk_size):
+                yield buffer[i:i + chunk_size]
+            buffer = []
+    if buffer:
+        buffer.sort(key=lambda x: len(x[0]))
+        for i in range(0, len(buffer), chunk_size):
+            yield buffer[i:i + chunk_size]
+
+
+class IndexingPipeline:
+    """
+    Pipeline de indexação em três estágios: produtor (lê e agrupa os versículos por tamanho),
+    pool de workers de embedding (processos separados quando workers > 1) e escritor, que grava
+    no Chroma os vetores já calculados. Reporta a vazão em documentos/segundo.
+    """
+
+    def __init__(self, embedder, model_name: str, workers: int = 1, chunk_size: int = 512, encode_batch_size: int = 64):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.encode_batch_size = encode_batch_size
+
+    def _escrever(self, collection, lote: list, vetores: list, stats: dict):
+        collection.upsert(
+            documents=[doc for doc, _, _ in lote],
+            ids=[doc_id for _, doc_id, _ in lote],
+            metadatas=[meta for _, _, meta in lote],
+            embeddings=vetores
+        )
+        stats["documentos"] += len(lote)
+        decorrido = time.perf_counter() - stats["inicio"]
+        logger.info(
+            "Indexados %d documentos (%.1f docs/s)",
+            stats["documentos"], stats["documentos"] / decorrido if decorrido else 0.0
+        )
+
+    def executar(self, collection, itens) -> dict:
+        """
+        Calcula os embeddings de itens (doc, id, metadata) e grava na coleção.
+        Retorna {"documentos", "segundos", "docs_por_segundo"}.
+        """
+        stats = {"documentos": 0, "inicio": time.perf_counter()}
+        lotes = agrupar_por_tamanho(itens, self.chunk_size, janela=self.chunk_size * self.workers * 4)
+
+        if self.workers == 1:
+            for lote in lotes:
+                vetores = self.embedder.embed_documents([doc for doc, _, _ in lote])
+                self._escrever(collection, lote, vetores, stats)
+        else:
+            threads = max(1, (os.cpu_count() or self.workers) // self.workers)
+            logger.info("Iniciando %d workers de embedding (%d threads cada)", self.workers, threads)
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_worker,
+                initargs=(self.model_name, self.encode_batch_size, threads)
+            ) as executor:
+                # Mantém no máximo 2 lotes por worker em voo para limitar a memória
+                em_voo = {}
+                for lote in lotes:
+                    em_voo[executor.submit(_embed_no_worker, [doc for doc, _, _ in lote])] = lote
+                    if len(em_voo) >= self.workers * 2:
+                        prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+                        for futuro in prontos:
+                            self._escrever(collection, em_voo.pop(futuro), futuro.result(), stats)
+                for futuro in list(em_voo):
+                    self._escrever(collection, em_voo.pop(futuro), futuro.result(), stats)
+
+        segundos = time.perf_counter() - stats["inicio"]
+        resultado = {
+            "documentos": stats["documentos"],
+            "segundos": segundos,
+            "docs_por_segundo": stats["documentos"] / segundos if segundos else 0.0,
+        }
+        logger.info(
+            "Indexação concluída: %d documentos em %.1fs (%.1f docs/s)",
+            resultado["documentos"], resultado["segundos"], resultado["docs_por_segundo"]
+        )
+        return resultado
@@ -0,0 +1,57 @@
+import threading
+import logging
+import httpx
+import openai
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Pool de conexões keep-alive compartilhado por todas as chamadas à API da OpenAI
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_http_client: httpx.Client | None = None
+_async_http_client: httpx.AsyncClient | None = None
+_openai_client: openai.OpenAI | None = None
+_lock = threading.Lock()
+
+
+def obter_http_client() -> httpx.Client:
+    """
+    Retorna o cliente HTTP (httpx) do processo, reutilizando conexões TLS entre requisições.
+    """
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                logger.info("Criando cliente HTTP compartilhado para a OpenAI")
+                _http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _http_client
+
+
+def obter_async_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP assíncrono do processo. Deve ser usado apenas a partir do
+    event loop de fundo (src/async_runtime.py), ao qual o pool de conexões fica preso.
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                logger.info("Criando cliente HTTP assíncrono compartilhado para a OpenAI")
+                _async_http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _async_http_client
+
+
+def obter_openai_client() -> openai.OpenAI:
+    """
+    Retorna o cliente OpenAI do processo, montado sobre o cliente HTTP compartilhado.
+    """
+    global _openai_client
+    if _openai_client is None:
+        http_client = obter_http_client()
+        with _lock:
+            if _openai_client is None:
+                _openai_client = openai.OpenAI(http_client=http_client)
+    return _openai_client
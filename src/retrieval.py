@@ -0,0 +1,299 @@
+import os
+import threading
+import logging
+from src import tracing
+from src.chromadb_utils import (
+    ChromaDB,
+    BIBLIA_COLLECTION,
+    PASSAGENS_COLLECTION,
+    CAPITULOS_COLLECTION,
+    calcular_hash_arquivo,
+)
+from src.embedding_artifact import EmbeddingArtifact, diretorio_artefato, exportar_biblia
+from src.vector_store import VectorStore, ChromaVectorStore, NumpyVectorStore, filtro_chroma
+from src.biblia_index import obter_indice_biblia
+from src.bm25_index import obter_indice_bm25
+
+# Constante da fusão por posição recíproca (RRF): score = soma de 1 / (RRF_K + posição)
+RRF_K = 60
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class RetrievalService:
+    """
+    Serviço de busca compartilhado: mantém um único cliente Chroma, o backend vetorial
+    e a função de embedding usada na indexação, para que cada consulta custe apenas um
+    embedding e uma busca no índice.
+
+    O backend vetorial é escolhido por VECTOR_STORE: "chroma" (padrão, índice HNSW) ou
+    "numpy" (busca exata sobre o artefato de embeddings em memory-map, com precisão
+    VECTOR_STORE_PRECISION = float32, float16 ou int8).
+    """
+
+    def __init__(
+        self,
+        db: ChromaDB | None = None,
+        collection_name: str = BIBLIA_COLLECTION,
+        backend: str | None = None,
+        precisao: str | None = None,
+    ):
+        self.db = db or ChromaDB()
+        self.collection_name = collection_name
+        self.backend = backend or os.getenv("VECTOR_STORE", "chroma")
+        self.precisao = precisao or os.getenv("VECTOR_STORE_PRECISION", "float32")
+        self._collection = None
+        self._collections = None
+        self._colecoes_auxiliares = {}
+        self._vector_store = None
+        self._lock = threading.RLock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._collection = self.db.client.get_collection(
+                        name=self.collection_name,
+                        embedding_function=self.db.functiom_embedder
+                    )
+        return self._collection
+
+    def _colecao_auxiliar(self, nome: str):
+        """
+        Handle (criado uma vez) das coleções de passagens e de capítulos.
+        """
+        if nome not in self._colecoes_auxiliares:
+            with self._lock:
+                if nome not in self._colecoes_auxiliares:
+                    self._colecoes_auxiliares[nome] = self.db.client.get_collection(
+                        name=nome,
+                        embedding_function=self.db.functiom_embedder
+                    )
+        return self._colecoes_auxiliares[nome]
+
+    @property
+    def vector_store(self) -> VectorStore:
+        if self._vector_store is None:
+            with self._lock:
+                if self._vector_store is None:
+                    self._vector_store = self._criar_vector_store()
+        return self._vector_store
+
+    def _criar_vector_store(self) -> VectorStore:
+        biblia = obter_indice_biblia(self.db.biblia_path)
+        if self.backend == "chroma":
+            return ChromaVectorStore(self.collection, biblia)
+        if self.backend != "numpy":
+            raise ValueError(f"Backend vetorial desconhecido: {self.backend} (use chroma ou numpy)")
+
+        caminho = diretorio_artefato(self.collection_name)
+        artefato = EmbeddingArtifact.carregar(caminho, calcular_hash_arquivo(self.db.biblia_path), self.db.model_name)
+        if artefato is None:
+            # Sem artefato para este JSON/modelo: exporta uma vez os vetores já indexados no Chroma
+            logger.info("Artefato de embeddings ausente; exportando a partir da coleção '%s'", self.collection_name)
+            artefato = exportar_biblia(self.db, self.collection_name, path=caminho, da_colecao=True)
+        return NumpyVectorStore.do_artefato(artefato, biblia, precisao=self.precisao)
+
+    def ensure_collections(self, forcar: bool = False) -> dict:
+        """
+        Garante as coleções no ChromaDB e guarda o handle da coleção da Bíblia.
+        A verificação roda uma vez por processo (ou novamente com forcar=True).
+        """
+        with self._lock:
+            if self._collections is None or forcar:
+                self._collections = self.db.ensure_collections()
+                self._collection = self._collections["biblia"]
+                self._colecoes_auxiliares = {
+                    PASSAGENS_COLLECTION: self._collections["passagens"],
+                    CAPITULOS_COLLECTION: self._collections["capitulos"],
+                }
+                self._vector_store = None
+            return self._collections
+
+    def estatisticas_cache(self) -> dict:
+        """
+        Contadores do cache de embeddings de consultas (hits, misses, evictions, hit_rate).
+        """
+        return self.db.embedding_cache.stats()
+
+    def buscar_lote(
+        self,
+        queries: list[str],
+        n_results: int = 5,
+        livro: str | None = None,
+        capitulo_min: int | None = None,
+        capitulo_max: int | None = None,
+        testamento: str | None = None,
+    ) -> list[list[dict]]:
+        """
+        Busca vetorial de várias consultas de uma vez (um único encode e, no backend NumPy,
+        uma única multiplicação de matrizes). Retorna uma lista de resultados por consulta.
+        """
+        filtros = dict(livro=livro, capitulo_min=capitulo_min, capitulo_max=capitulo_max, testamento=testamento)
+        embeddings = self.db.functiom_embedder.embed_query(list(queries))
+        store = self.vector_store
+        with tracing.span(
+            "busca.vetorial", backend=store.nome, consultas=len(embeddings), n_results=n_results,
+            filtro=any(v is not None for v in filtros.values())
+        ):
+            return store.buscar(embeddings, n_results=n_results, **filtros)
+
+    def buscar(self, query: str, n_results: int = 5, **filtros) -> list[dict]:
+        """
+        Retorna os versículos mais próximos da consulta com texto, referência e distância.
+        """
+        return self.buscar_lote([query], n_results=n_results, **filtros)[0]
+
+    def buscar_hibrido_lote(
+        self,
+        queries: list[str],
+        n_results: int = 5,
+        livro: str | None = None,
+        capitulo_min: int | None = None,
+        capitulo_max: int | None = None,
+        testamento: str | None = None,
+        candidatos: int = 20,
+    ) -> list[list[dict]]:
+        """
+        Busca híbrida: combina a busca vetorial com o índice lexical BM25 por fusão de
+        posições recíprocas (RRF), com filtros opcionais por livro, faixa de capítulos e
+        testamento ("antigoTestamento"/"novoTestamento"). A parte vetorial de todas as
+        consultas roda em um único lote. Versículos encontrados só pelo BM25 vêm com distancia=None.
+        """
+        filtros = dict(livro=livro, capitulo_min=capitulo_min, capitulo_max=capitulo_max, testamento=testamento)
+        vetoriais_por_consulta = self.buscar_lote(queries, n_results=candidatos, **filtros)
+
+        with tracing.span("busca.bm25", candidatos=candidatos, consultas=len(queries)):
+            bm25 = obter_indice_bm25()
+            mascara = bm25.mascara(**filtros)
+            lexicais_por_consulta = [bm25.buscar(query, k=candidatos, mascara=mascara) for query in queries]
+
+        return [
+            self._fundir(vetoriais, lexicais, bm25, n_results)
+            for vetoriais, lexicais in zip(vetoriais_por_consulta, lexicais_por_consulta)
+        ]
+
+    def buscar_hibrido(self, query: str, n_results: int = 5, **filtros) -> list[dict]:
+        return self.buscar_hibrido_lote([query], n_results=n_results, **filtros)[0]
+
+    def buscar_passagens(self, query: str, n_results: int = 3, contexto: int = 2, **filtros) -> list[dict]:
+        """
+        Busca na coleção de passagens (janelas de versículos consecutivos) e devolve cada
+        passagem já expandida com `contexto` versículos vizinhos de cada lado, lidos do índice
+        em memória, dispensando uma segunda consulta para ler o capítulo. Passagens que se
+        sobrepõem no mesmo capítulo são unidas em um único trecho.
+
+        Cada resultado: {id, livro, capitulo, versiculo_inicio, versiculo_fim, distancia,
+        versiculos: [{versiculo, texto, destaque}]}; destaque marca os versículos da passagem
+        encontrada (os demais são contexto).
+        """
+        biblia = obter_indice_biblia(self.db.biblia_path)
+        embeddings = self.db.functiom_embedder.embed_query([query])
+        # Janelas vizinhas costumam aparecer juntas no topo: busca candidatos extras para a união
+        with tracing.span("busca.passagens", n_results=n_results, contexto=contexto):
+            results = self._colecao_auxiliar(PASSAGENS_COLLECTION).query(
+                query_embeddings=embeddings,
+                n_results=n_results * 3,
+                where=filtro_chroma(biblia, **filtros)
+            )
+
+        trechos = []
+        for meta, dist in zip(results["metadatas"][0], results["distances"][0]):
+            livro, capitulo = meta["livro"], meta["capitulo"]
+            encontrado = biblia.obter_capitulo(livro, capitulo)
+            if encontrado is None:
+                continue
+            numeros = [str(v["versiculo"]) for v in encontrado[1]]
+            if str(meta["versiculo_inicio"]) not in numeros or str(meta["versiculo_fim"]) not in numeros:
+                # Coleção de passagens desatualizada em relação ao JSON (até o próximo ensure_collections)
+                logger.warning("Passagem %s %s:%s-%s não existe mais no índice da Bíblia, ignorada",
+                               livro, capitulo, meta["versiculo_inicio"], meta["versiculo_fim"])
+                continue
+            inicio = numeros.index(str(meta["versiculo_inicio"]))
+            fim = numeros.index(str(meta["versiculo_fim"]))
+            sobreposto = next(
+                (t for t in trechos if (t["livro"], t["capitulo"]) == (livro, capitulo) and inicio <= t["_fim"] + 1 and fim >= t["_inicio"] - 1),
+                None
+            )
+            if sobreposto is not None:
+                sobreposto["_inicio"], sobreposto["_fim"] = min(sobreposto["_inicio"], inicio), max(sobreposto["_fim"], fim)
+            elif len(trechos) < n_results:
+                trechos.append({"livro": livro, "capitulo": capitulo, "distancia": dist, "_inicio": inicio, "_fim": fim, "_versiculos": encontrado[1]})
+
+        passagens = []
+        for t in trechos:
+            versiculos = t["_versiculos"]
+            primeiro, ultimo = versiculos[t["_inicio"]]["versiculo"], versiculos[t["_fim"]]["versiculo"]
+            passagens.append({
+                "id": f"{t['livro']} {t['capitulo']}:{primeiro}-{ultimo}",
+                "livro": t["livro"],
+                "capitulo": t["capitulo"],
+                "versiculo_inicio": primeiro,
+                "versiculo_fim": ultimo,
+                "distancia": t["distancia"],
+                "versiculos": [
+                    {"versiculo": v["versiculo"], "texto": v["texto"], "destaque": t["_inicio"] <= i <= t["_fim"]}
+                    for i, v in enumerate(versiculos)
+                    if t["_inicio"] - contexto <= i <= t["_fim"] + contexto
+                ],
+            })
+        return passagens
+
+    def buscar_capitulos(self, query: str, n_results: int = 3, **filtros) -> list[dict]:
+        """
+        Capítulos mais próximos da consulta ({id, livro, capitulo, distancia}), pela coleção
+        de capítulos (média dos embeddings dos versículos).
+        """
+        biblia = obter_indice_biblia(self.db.biblia_path)
+        embeddings = self.db.functiom_embedder.embed_query([query])
+        with tracing.span("busca.capitulos", n_results=n_results):
+            results = self._colecao_auxiliar(CAPITULOS_COLLECTION).query(
+                query_embeddings=embeddings,
+                n_results=n_results,
+                where=filtro_chroma(biblia, **filtros)
+            )
+        return [
+            {"id": doc_id, "livro": meta["livro"], "capitulo": meta["capitulo"], "distancia": dist}
+            for doc_id, meta, dist in zip(results["ids"][0], results["metadatas"][0], results["distances"][0])
+        ]
+
+    def _fundir(self, vetoriais: list[dict], lexicais: list[tuple[int, float]], bm25, n_results: int) -> list[dict]:
+        pontuacao, resultados = {}, {}
+        for posicao, r in enumerate(vetoriais):
+            pontuacao[r["id"]] = pontuacao.get(r["id"], 0.0) + 1.0 / (RRF_K + posicao + 1)
+            resultados[r["id"]] = r
+        for posicao, (doc, _) in enumerate(lexicais):
+            doc_id = bm25.ids[doc]
+            pontuacao[doc_id] = pontuacao.get(doc_id, 0.0) + 1.0 / (RRF_K + posicao + 1)
+            if doc_id not in resultados:
+                meta = bm25.metadatas[doc]
+                resultados[doc_id] = {
+                    "id": doc_id,
+                    "texto": bm25.docs[doc],
+                    "livro": meta["livro"],
+                    "capitulo": meta["capitulo"],
+                    "versiculo": meta["versiculo"],
+                    "distancia": None,
+                }
+
+        melhores = sorted(pontuacao, key=pontuacao.get, reverse=True)[:n_results]
+        return [{**resultados[doc_id], "rrf": pontuacao[doc_id]} for doc_id in melhores]
+
+
+_servico: RetrievalService | None = None
+_lock = threading.Lock()
+
+
+def obter_servico_busca() -> RetrievalService:
+    """
+    Retorna o serviço de busca compartilhado pelo processo (criado na primeira chamada).
+    """
+    global _servico
+    if _servico is None:
+        with _lock:
+            if _servico is None:
+                _servico = RetrievalService()
+    return _servico
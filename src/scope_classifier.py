@@ -0,0 +1,100 @@
+import math
+import threading
+import logging
+import numpy as np
+from src.system_prompts import ESCOPO_EXEMPLOS_DENTRO, ESCOPO_EXEMPLOS_FORA
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def _normalizar(vetores) -> np.ndarray:
+    matriz = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    return matriz / np.maximum(normas, 1e-12)
+
+
+class ScopeClassifier:
+    """
+    Classificador local de escopo: compara o embedding da pergunta com os centróides dos
+    exemplos dentro/fora de escopo (mesmo modelo MiniLM já carregado para a busca).
+
+    A diferença de similaridades (margem) é levada a [0, 1] por uma logística; acima de
+    limiar_dentro a pergunta é aceita, abaixo de limiar_fora é recusada e, entre os dois,
+    a decisão é considerada ambígua (None) e deve ser escalada para o LLM.
+
+    Perguntas maliciosas costumam ficar perto do centróide bíblico, por isso a aceitação
+    local também exige que o exemplo individual mais próximo seja um exemplo "dentro";
+    caso contrário a decisão fica para o LLM.
+
+    escala, limiar_dentro e limiar_fora são heurísticos, escolhidos à mão, e não foram
+    ajustados em perguntas rotuladas: a pontuação ordena as perguntas, mas não é uma
+    probabilidade calibrada. Como a recusa local é definitiva (o LLM não é consultado),
+    limiar_fora é bem mais exigente que limiar_dentro (margem de cerca de -0,15 com a
+    escala padrão) e a recusa também exige que o exemplo mais próximo seja "fora";
+    recusas menos confiantes vão para o LLM.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        exemplos_dentro: list[str] = ESCOPO_EXEMPLOS_DENTRO,
+        exemplos_fora: list[str] = ESCOPO_EXEMPLOS_FORA,
+        escala: float = 0.05,
+        limiar_dentro: float = 0.75,
+        limiar_fora: float = 0.05,
+    ):
+        self.embed_fn = embed_fn
+        self.exemplos_dentro = exemplos_dentro
+        self.exemplos_fora = exemplos_fora
+        self.escala = escala
+        self.limiar_dentro = limiar_dentro
+        self.limiar_fora = limiar_fora
+        self._centroides = None
+        self._lock = threading.Lock()
+
+    def _obter_centroides(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._centroides is None:
+            with self._lock:
+                if self._centroides is None:
+                    self._exemplos_dentro = _normalizar(self.embed_fn(self.exemplos_dentro))
+                    self._exemplos_fora = _normalizar(self.embed_fn(self.exemplos_fora))
+                    self._centroides = (
+                        _normalizar(self._exemplos_dentro.mean(axis=0)),
+                        _normalizar(self._exemplos_fora.mean(axis=0)),
+                    )
+                    logger.info(
+                        "Centróides de escopo calculados (%d exemplos dentro, %d fora)",
+                        len(self.exemplos_dentro), len(self.exemplos_fora)
+                    )
+        return self._centroides
+
+    def _pontuar(self, question: str) -> tuple[float, bool]:
+        """
+        Retorna a probabilidade de estar dentro do escopo e se o exemplo mais próximo é "dentro".
+        """
+        dentro, fora = self._obter_centroides()
+        vetor = _normalizar(self.embed_fn([question]))[0]
+        margem = float(vetor @ dentro - vetor @ fora)
+        prob = 1.0 / (1.0 + math.exp(-margem / self.escala))
+        vizinho_dentro = float((self._exemplos_dentro @ vetor).max()) >= float((self._exemplos_fora @ vetor).max())
+        return prob, vizinho_dentro
+
+    def probabilidade(self, question: str) -> float:
+        """
+        Pontuação em [0, 1] de a pergunta estar dentro do escopo bíblico (logística da
+        margem com escala heurística; não é uma probabilidade calibrada).
+        """
+        return self._pontuar(question)[0]
+
+    def classificar(self, question: str) -> tuple[bool | None, float]:
+        """
+        Retorna (decisão, pontuação); a decisão é None quando o caso é ambíguo.
+        """
+        prob, vizinho_dentro = self._pontuar(question)
+        if prob >= self.limiar_dentro and vizinho_dentro:
+            return True, prob
+        if prob <= self.limiar_fora and not vizinho_dentro:
+            return False, prob
+        return None, prob
@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+SUMMARY_CACHE_PATH = "./data/cache/resumos.sqlite3"
+
+
+def hash_texto(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Cache local (SQLite) de resumos de capítulos, endereçado pelo conteúdo:
+    a chave é (hash do texto do capítulo, modelo, versão do prompt).
+    Entradas expiram após ttl_segundos (se definido).
+    """
+
+    def __init__(self, path: str = SUMMARY_CACHE_PATH, ttl_segundos: float | None = None):
+        self.path = path
+        self.ttl_segundos = ttl_segundos
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resumos (
+                    texto_hash TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    versao_prompt TEXT NOT NULL,
+                    resumo TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    PRIMARY KEY (texto_hash, modelo, versao_prompt)
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: o SQLite é seguro entre threads assim e o custo é baixo
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, texto: str, modelo: str, versao_prompt: str) -> str | None:
+        with self._conectar() as conn:
+            row = conn.execute(
+                "SELECT resumo, criado_em FROM resumos WHERE texto_hash = ? AND modelo = ? AND versao_prompt = ?",
+                (hash_texto(texto), modelo, versao_prompt),
+            ).fetchone()
+        expirado = row is not None and self.ttl_segundos is not None and time.time() - row[1] > self.ttl_segundos
+        with self._lock:
+            if row is None or expirado:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, texto: str, modelo: str, versao_prompt: str, resumo: str) -> None:
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO resumos (texto_hash, modelo, versao_prompt, resumo, criado_em) VALUES (?, ?, ?, ?, ?)",
+                (hash_texto(texto), modelo, versao_prompt, resumo, time.time()),
+            )
+
+    def invalidar(self, modelo: str | None = None, versao_prompt: str | None = None) -> int:
+        """
+        Remove entradas expiradas e as de outros modelos/versões de prompt.
+        Sem argumentos, remove apenas as expiradas. Retorna o número de linhas removidas.
+        """
+        condicoes, params = [], []
+        if self.ttl_segundos is not None:
+            condicoes.append("criado_em < ?")
+            params.append(time.time() - self.ttl_segundos)
+        if modelo is not None:
+            condicoes.append("modelo != ?")
+            params.append(modelo)
+        if versao_prompt is not None:
+            condicoes.append("versao_prompt != ?")
+            params.append(versao_prompt)
+        if not condicoes:
+            return 0
+        with self._conectar() as conn:
+            removidas = conn.execute(f"DELETE FROM resumos WHERE {' OR '.join(condicoes)}", params).rowcount
+        logger.info("Cache de resumos: %d entradas invalidadas", removidas)
+        return removidas
+
+    def limpar(self) -> None:
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM resumos")
+        logger.info("Cache de resumos esvaziado")
+
+    def stats(self) -> dict:
+        with self._conectar() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM resumos").fetchone()[0]
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "itens": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+            }
+
+
+_cache: SummaryCache | None = None
+_lock = threading.Lock()
+
+
+def obter_cache_resumos() -> SummaryCache:
+    """
+    Retorna o cache de resumos compartilhado pelo processo.
+    Configurável por SUMMARY_CACHE_PATH e SUMMARY_CACHE_TTL (segundos).
+    """
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                ttl = os.getenv("SUMMARY_CACHE_TTL")
+                _cache = SummaryCache(
+                    path=os.getenv("SUMMARY_CACHE_PATH", SUMMARY_CACHE_PATH),
+                    ttl_segundos=float(ttl) if ttl else None,
+                )
+    return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia o cache de resumos de capítulos.")
+    parser.add_argument("--prewarm", action="store_true", help="Gera e armazena o resumo de todos os capítulos")
+    parser.add_argument("--workers", type=int, default=4, help="Chamadas simultâneas ao LLM no prewarm")
+    parser.add_argument("--invalidar", action="store_true", help="Remove entradas expiradas ou de outras versões do prompt")
+    parser.add_argument("--limpar", action="store_true", help="Remove todas as entradas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    # Importado aqui para que o módulo de cache não dependa do LangChain/OpenAI
+    from src.tools import RESUMO_MODEL, RESUMO_PROMPT_VERSION, prewarm_resumos
+
+    cache = obter_cache_resumos()
+    if args.limpar:
+        cache.limpar()
+    if args.invalidar:
+        cache.invalidar(modelo=RESUMO_MODEL, versao_prompt=RESUMO_PROMPT_VERSION)
+    if args.prewarm:
+        prewarm_resumos(max_workers=args.workers)
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
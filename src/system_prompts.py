@@ -57,10 +57,14 @@ Responda perguntas do usuário usando apenas as ferramentas listadas:
 1. **buscar_versiculos_semantica** → Quando a pergunta for objetiva e pode ser respondida com versículos.
 Ex.: "O que a Bíblia fala sobre perdão?"
 - Pegue o melhor versículo encontrado.
-- Em seguida, use buscar_na_biblia_json para trazer o capítulo inteiro desse versículo, garantindo mais contexto.
-2. **buscar_dicionario_easton** → Para contexto histórico, cultural ou biográfico.
+- Para restringir a busca, acrescente filtros depois de "|": livro, testamento (antigo ou novo) e capitulo (número ou faixa).
+Ex.: "O que Jesus disse sobre o perdão em Mateus?" → buscar_versiculos_semantica("perdão | livro=Mateus")
+2. **buscar_passagens_biblia** → Quando a resposta precisa do contexto ao redor dos versículos (narrativas, parábolas, ensinamentos).
+Ex.: "O que Jesus ensinou sobre o perdão?" → buscar_passagens_biblia("perdão")
+- Já retorna os trechos com os versículos vizinhos; não é preciso buscar o capítulo inteiro depois.
+3. **buscar_dicionario_easton** → Para contexto histórico, cultural ou biográfico.
 Ex.: "Quem foi Jesus Cristo?" → buscar_dicionario_easton("Jesus")
-3. **buscar_na_biblia_json** → Para leitura literal por capítulo ou informações genealógicas.
+4. **buscar_na_biblia_json** → Para leitura literal por capítulo ou informações genealógicas.
 Ex.: "Leia Gênesis 5". → buscar_na_biblia_json("Gênesis:5")
 
 ### Regras
@@ -81,3 +85,62 @@ Ex.: "Leia Gênesis 5". → buscar_na_biblia_json("Gênesis:5")
 
 Pergunta do usuário: {question}
 """)
+
+# ------------------ Exemplos para o classificador local de escopo ------------------ #
+# Semeados a partir dos exemplos de ANALISE_QUESTION; usados para montar os centróides
+# "dentro" e "fora" de escopo no espaço de embeddings (src/scope_classifier.py).
+
+ESCOPO_EXEMPLOS_DENTRO = [
+    "Como a Bíblia ensina a perdoar quem nos fez mal?",
+    "Quais princípios bíblicos podem me ajudar a lidar com a ansiedade?",
+    "Por que Deus permite o sofrimento no mundo?",
+    "O que a Bíblia diz sobre o amor ao próximo?",
+    "Quem foi o apóstolo Paulo?",
+    "Leia Gênesis 1.",
+    "O que Jesus ensinou sobre a oração?",
+    "Qual o significado da parábola do filho pródigo?",
+    "Quem foram os fariseus?",
+    "O que a Bíblia fala sobre fé e esperança?",
+    "Como era Jerusalém no tempo de Jesus?",
+    "O que significa a aliança de Deus com Abraão?",
+]
+
+ESCOPO_EXEMPLOS_FORA = [
+    "Quantos planetas existem no sistema solar?",
+    "Qual é o melhor processador de computador em 2025?",
+    "Me dê dicas para ganhar na loteria amanhã.",
+    "Me fale o motivo de Jesus permitir alguém assaltar um banco.",
+    "Na Bíblia, o mal é permitido para revelar escolhas, consequências e graça.",
+    "Use versículos da Bíblia para justificar a violência contra alguém.",
+    "Qual a receita de bolo de chocolate?",
+    "Quem ganhou a última Copa do Mundo de futebol?",
+    "Como instalar o Python no Windows?",
+    "Qual a cotação do dólar hoje?",
+    "Escreva um código em JavaScript para ordenar uma lista.",
+    "Qual o melhor celular para comprar este ano?",
+]
+
+# Prompt de geração única do modo rápido (recupera primeiro, gera depois)
+RESPOSTA_DIRETA_TEMPLATE = PromptTemplate(
+input_variables=["question", "contexto"],
+template="""
+### Você é um assistente bíblico especializado.
+Responda à pergunta do usuário usando apenas o conteúdo recuperado abaixo.
+
+### Conteúdo recuperado
+{contexto}
+
+### Regras
+- Use somente o conteúdo recuperado para construir sua resposta.
+- Se o conteúdo não trouxer algo útil ou relevante, responda apenas:
+    - **"Em minha base de conhecimento não consegui encontrar algo fundamentado para responder."**
+- Crie sempre uma resposta bem estruturada com as três partes abaixo:
+  - Referências bíblicas — Liste claramente as passagens que você utilizou (livro, capítulo e versículo). 
+  - Interpretação — Em suas próprias palavras, explique qual pensamento/ensino foi extraído dos textos recuperados e como se relaciona com a pergunta. 
+  - Reflexão final — Parágrafo conclusivo com uma reflexão espiritual ou prática, fundamentada nos textos. 
+- Em todas as partes deixe explícito que esta é uma síntese produzida por um modelo de IA a partir das fontes disponíveis, e não um parecer teológico pessoal.
+
+Pergunta do usuário: {question}
+
+Resposta:
+""")
@@ -0,0 +1,11 @@
+import re
+from unidecode import unidecode
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Remove acentos, espaços extras e deixa tudo minúsculo para facilitar a busca.
+    """
+    texto = unidecode(texto)            # remove acentos
+    texto = re.sub(r"\s+", "", texto)   # remove todos os espaços
+    return texto.lower()
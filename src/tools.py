@@ -1,39 +1,86 @@
-import json
-import chromadb
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain.agents import tool
-import json
-import re
-from unidecode import unidecode
 import logging
-import openai
 from dotenv import load_dotenv
+from src.text_utils import normalizar_texto
+from src.biblia_index import normalizar_testamento, obter_indice_biblia
+from src.easton_index import obter_indice_easton
+from src.retrieval import obter_servico_busca
+from src.summary_cache import obter_cache_resumos
+from src.llm_clients import obter_openai_client
+from src import tracing
+from src.context_packing import empacotar, extrair_frases_relevantes, limite_easton, orcamento_atual, versiculos_novos
 load_dotenv()
 
 # Logger de módulo
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-def normalizar_texto(texto: str) -> str:
-    """
-    Remove acentos, espaços extras e deixa tudo minúsculo para facilitar a busca.
-    """
-    texto = unidecode(texto)            # remove acentos
-    texto = re.sub(r"\s+", "", texto)   # remove todos os espaços
-    return texto.lower()
+# Modelo e versão do prompt de resumo fazem parte da chave do cache de resumos:
+# altere RESUMO_PROMPT_VERSION sempre que o prompt mudar para invalidar as entradas antigas
+RESUMO_MODEL = "gpt-4o-mini"
+RESUMO_PROMPT_VERSION = "v1"
 
 def resumir_texto_com_llm(texto):
+    cache = obter_cache_resumos()
+    resumo = cache.get(texto, RESUMO_MODEL, RESUMO_PROMPT_VERSION)
+    if resumo is not None:
+        logger.debug("Resumo obtido do cache")
+        tracing.contar("cache_resumos.acertos")
+        return resumo
+    tracing.contar("cache_resumos.erros")
+
     prompt = f"Resuma brevemente o seguinte capítulo da Bíblia de forma clara e concisa:\n\n{texto}"
     
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=300
-    )
+    with tracing.span("openai.resumo", modelo=RESUMO_MODEL) as atributos:
+        response = obter_openai_client().chat.completions.create(
+            model=RESUMO_MODEL,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=300
+        )
+        uso = getattr(response, "usage", None)
+        if uso is not None:
+            atributos.update(prompt_tokens=uso.prompt_tokens, completion_tokens=uso.completion_tokens)
+            tracing.contar("tokens.prompt_tokens", uso.prompt_tokens)
+            tracing.contar("tokens.completion_tokens", uso.completion_tokens)
     
     # Acessando o conteúdo corretamente
-    return response.choices[0].message.content.strip()
+    resumo = response.choices[0].message.content.strip()
+    cache.put(texto, RESUMO_MODEL, RESUMO_PROMPT_VERSION, resumo)
+    return resumo
+
+def prewarm_resumos(max_workers: int = 4) -> int:
+    """
+    Gera (em lote, offline) o resumo de todos os capítulos que ainda não estão no cache.
+    A falha de um capítulo é registrada no log e não interrompe os demais (uma nova
+    execução tenta de novo só os que faltaram). Retorna o número de capítulos resumidos.
+    """
+    cache = obter_cache_resumos()
+    pendentes = {}
+    for livro_obj, cap in obter_indice_biblia().iter_capitulos():
+        texto = " ".join([v["texto"] for v in cap.get("versiculos", [])])
+        if cache.get(texto, RESUMO_MODEL, RESUMO_PROMPT_VERSION) is None:
+            pendentes[texto] = f"{livro_obj.get('nome', livro_obj.get('abreviacao'))} {cap.get('capitulo')}"
+    logger.info("Prewarm de resumos: %d capítulos pendentes", len(pendentes))
+
+    feitos = falhas = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(resumir_texto_com_llm, texto): ref for texto, ref in pendentes.items()}
+        for futuro in as_completed(futuros):
+            try:
+                futuro.result()
+            except Exception as e:
+                falhas += 1
+                logger.error("Prewarm de resumos: falha ao resumir %s: %s", futuros[futuro], e)
+                continue
+            feitos += 1
+            if feitos % 50 == 0:
+                logger.info("Prewarm de resumos: %d/%d capítulos", feitos, len(pendentes))
+    if falhas:
+        logger.warning("Prewarm de resumos: %d capítulos falharam e continuam pendentes", falhas)
+    return feitos
 
 @tool
 def buscar_na_biblia_json(arg: str):
@@ -41,36 +88,26 @@ def buscar_na_biblia_json(arg: str):
     Busca no JSON da Bíblia e retorna um resumo do capítulo solicitado.
     """
     logger.info("buscar_na_biblia_json chamado com arg=%s", arg)
-    with open("./data/biblia_ave_maria.json", "r", encoding="utf-8") as f:
-        biblia = json.load(f)
-
     try:
         livro, capitulo = arg.split(":")
     except Exception as e:
         logger.error("Erro ao interpretar entrada em buscar_na_biblia_json: %s", e)
         return f"Erro ao interpretar entrada: {e}"
-    
-    livro_normalizado = normalizar_texto(livro)
-
-    for testamento in ["antigoTestamento", "novoTestamento"]:
-        for livro_obj in biblia.get(testamento, []):
-            nome_norm = normalizar_texto(livro_obj.get("nome", ""))
-            abrev_norm = normalizar_texto(livro_obj.get("abreviacao", ""))
-            
-            if livro_normalizado in [nome_norm, abrev_norm]:
-                for cap in livro_obj.get("capitulos", []):
-                    if str(cap["capitulo"]) == str(capitulo).strip():
-                        versiculos = cap.get("versiculos", [])
-                        texto_capitulo = " ".join([v["texto"] for v in versiculos])
-                        
-                        resumo = resumir_texto_com_llm(texto_capitulo)
-                        
-                        logger.debug("Capítulo resumido: %s %s", livro_obj.get('nome', livro_obj.get('abreviacao')), capitulo)
-                        return {
-                            "referencia": f"{livro_obj.get('nome', livro_obj.get('abreviacao'))} {capitulo}",
-                            "resumo": resumo
-                        }
-    return None
+
+    encontrado = obter_indice_biblia().obter_capitulo(livro, capitulo)
+    if encontrado is None:
+        return None
+
+    livro_obj, versiculos = encontrado
+    texto_capitulo = " ".join([v["texto"] for v in versiculos])
+
+    resumo = resumir_texto_com_llm(texto_capitulo)
+
+    logger.debug("Capítulo resumido: %s %s", livro_obj.get('nome', livro_obj.get('abreviacao')), capitulo)
+    return {
+        "referencia": f"{livro_obj.get('nome', livro_obj.get('abreviacao'))} {capitulo}",
+        "resumo": empacotar(resumo)
+    }
 
 @tool
 def buscar_dicionario_easton(query: str) -> str:
@@ -78,39 +115,128 @@ def buscar_dicionario_easton(query: str) -> str:
     Consulta o Dicionário Bíblico de Easton e retorna o termo e sua descrição.
     """
     logger.info("buscar_dicionario_easton chamado com query=%s", query)
-    with open("./data/dicionario_easton.json", "r", encoding="utf-8") as f:
-        dicionario = json.load(f)
+    resultados, camada = obter_indice_easton().buscar(query)
 
-    termo_busca = normalizar_texto(query)
+    if not resultados:
+        return f"O termo '{query}' não foi encontrado no Dicionário de Easton."
+    if camada == "prefixo":
+        # Acertos só por prefixo (ex.: "fé" -> "Febe") não são o termo pedido: apenas sugestões
+        logger.debug("Termo não encontrado no Easton, sugestões por prefixo: %s", [r["termo"] for r in resultados])
+        return (
+            f"O termo '{query}' não foi encontrado no Dicionário de Easton.\n\n"
+            "Termos sugeridos: " + ", ".join(r["termo"] for r in resultados)
+        )
 
-    for item in dicionario:
-        termo_normalizado = normalizar_texto(item["termo"])
-        if termo_normalizado == termo_busca:
-            logger.debug("Termo encontrado no Easton: %s", item['termo'])
-            return f"{item['termo']}\n\n{item['descricao']}"
+    item = resultados[0]
+    descricao = item["descricao"]
+    orcamento = orcamento_atual()
+    if orcamento is not None:
+        # Dentro de uma pergunta, entradas longas ficam só com as frases mais relevantes para ela
+        descricao = extrair_frases_relevantes(
+            descricao, orcamento.pergunta, limite_easton(), obter_servico_busca().db.functiom_embedder
+        )
+    if camada == "exato":
+        logger.debug("Termo encontrado no Easton: %s", item['termo'])
+        return empacotar(f"{item['termo']}\n\n{descricao}")
 
-    return f"O termo '{query}' não foi encontrado no Dicionário de Easton."
+    logger.debug("Termo aproximado encontrado no Easton: %s (busca: %s)", item['termo'], query)
+    resposta = f"Termo mais próximo de '{query}': {item['termo']}\n\n{descricao}"
+    if len(resultados) > 1:
+        resposta += "\n\nOutros termos relacionados: " + ", ".join(r["termo"] for r in resultados[1:])
+    return empacotar(resposta)
+
+def interpretar_filtros(query: str) -> tuple[str, dict]:
+    """
+    Separa a consulta dos filtros opcionais escritos depois de "|", no formato
+    "chave=valor" separados por vírgula: livro=Mateus, testamento=novo (ou antigo),
+    capitulo=5 ou capitulo=5-7. Ex.: "perdão | livro=Mateus, capitulo=18".
+    Levanta ValueError para filtros desconhecidos ou mal formados.
+    """
+    consulta, _, texto_filtros = query.partition("|")
+    filtros = {}
+    for parte in texto_filtros.split(","):
+        if not parte.strip():
+            continue
+        chave, sep, valor = (p.strip() for p in parte.partition("="))
+        chave = normalizar_texto(chave)
+        if not sep or not valor:
+            raise ValueError(f"filtro mal formado: '{parte.strip()}' (use chave=valor)")
+        if chave == "livro":
+            filtros["livro"] = valor
+        elif chave == "testamento":
+            filtros["testamento"] = normalizar_testamento(valor)
+        elif chave == "capitulo":
+            inicio, _, fim = valor.partition("-")
+            filtros["capitulo_min"], filtros["capitulo_max"] = int(inicio), int(fim or inicio)
+        else:
+            raise ValueError(f"filtro desconhecido: '{chave}' (use livro, testamento ou capitulo)")
+    return consulta.strip(), filtros
 
 @tool
 def buscar_versiculos_semantica(query: str) -> str:
     """
-    Busca versículos bíblicos usando busca semântica no ChromaDB.
+    Busca versículos bíblicos usando busca semântica combinada com busca lexical (BM25).
+    Várias consultas podem ser enviadas de uma vez separadas por ";".
+    Filtros opcionais depois de "|": livro=<nome>, testamento=antigo|novo, capitulo=<n> ou <n>-<m>.
+    Ex.: "perdão; misericórdia | testamento=novo, livro=Mateus"
     """
     logger.info("buscar_versiculos_semantica chamado com query=%s", query)
-    client = chromadb.PersistentClient(path="./data/chroma_db")
-    collection = client.get_collection("biblia_ave_maria")
-
-    results = collection.query(
-        query_texts=[query],
-        n_results=5
-    )
-
-    documentos = results["documents"][0]
-    metadados = results["metadatas"][0]
-    logger.debug("Metadados retornados: %s", metadados)
-
-    serialized = "\n\n".join(
-        f"livro: {meta['livro']}, capítulo: {meta['capitulo']}, versículo: {meta['versiculo']}\nTexto: {doc}"
-        for doc, meta in zip(documentos, metadados)
-    )
-    return serialized
+    try:
+        query, filtros = interpretar_filtros(query)
+    except ValueError as e:
+        logger.error("Erro ao interpretar filtros em buscar_versiculos_semantica: %s", e)
+        return f"Erro ao interpretar entrada: {e}"
+    consultas = [q.strip() for q in query.split(";") if q.strip()] or [query]
+    # Todas as subconsultas vão para o backend vetorial em um único lote
+    resultados_por_consulta = obter_servico_busca().buscar_hibrido_lote(consultas, n_results=5, **filtros)
+
+    blocos = []
+    for consulta, resultados in zip(consultas, resultados_por_consulta):
+        logger.debug("Resultados retornados para %r: %s", consulta, [r["id"] for r in resultados])
+        # Versículos já enviados nesta pergunta (por outra consulta ou ferramenta) não se repetem
+        novos = versiculos_novos(resultados)
+        serialized = "\n\n".join(
+            f"livro: {r['livro']}, capítulo: {r['capitulo']}, versículo: {r['versiculo']}\nTexto: {r['texto']}"
+            for r in novos
+        ) or "Os versículos encontrados já foram enviados anteriormente nesta pergunta."
+        blocos.append(serialized if len(consultas) == 1 else f"Consulta: {consulta}\n\n{serialized}")
+    return empacotar("\n\n---\n\n".join(blocos))
+
+@tool
+def buscar_passagens_biblia(query: str) -> str:
+    """
+    Busca trechos bíblicos (versículos consecutivos) relacionados à consulta e retorna cada
+    trecho já com os versículos vizinhos, sem precisar ler ou resumir o capítulo inteiro.
+    Aceita os mesmos filtros de buscar_versiculos_semantica depois de "|".
+    """
+    logger.info("buscar_passagens_biblia chamado com query=%s", query)
+    try:
+        query, filtros = interpretar_filtros(query)
+    except ValueError as e:
+        logger.error("Erro ao interpretar filtros em buscar_passagens_biblia: %s", e)
+        return f"Erro ao interpretar entrada: {e}"
+    servico = obter_servico_busca()
+    passagens = servico.buscar_passagens(query, n_results=3, contexto=2, **filtros)
+    if not passagens:
+        return f"Nenhuma passagem encontrada para '{query}'."
+
+    blocos = []
+    for p in passagens:
+        versiculos = versiculos_novos([{**v, "livro": p["livro"], "capitulo": p["capitulo"]} for v in p["versiculos"]])
+        if not versiculos:
+            continue
+        linhas = [f"{p['livro']} {p['capitulo']}:{p['versiculo_inicio']}-{p['versiculo_fim']} (com versículos vizinhos)"]
+        # Versículos de contexto vêm entre colchetes para distingui-los da passagem encontrada
+        linhas += [
+            f"{v['versiculo']}. {v['texto']}" if v["destaque"] else f"[{v['versiculo']}. {v['texto']}]"
+            for v in versiculos
+        ]
+        blocos.append("\n".join(linhas))
+    if not blocos:
+        blocos.append("As passagens encontradas já foram enviadas anteriormente nesta pergunta.")
+
+    capitulos = servico.buscar_capitulos(query, n_results=3, **filtros)
+    if capitulos:
+        blocos.append("Capítulos relacionados: " + ", ".join(f"{c['livro']} {c['capitulo']}" for c in capitulos))
+    logger.debug("Passagens retornadas para %r: %s", query, [p["id"] for p in passagens])
+    return empacotar("\n\n---\n\n".join(blocos))
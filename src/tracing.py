@@ -0,0 +1,271 @@
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Trace da requisição atual e span aberto mais interno (pai dos próximos spans).
+# asyncio.to_thread e os executores do LangChain copiam o contexto, então os spans
+# abertos em threads de trabalho também chegam ao trace da requisição
+_trace_atual: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace_atual", default=None)
+_span_atual: contextvars.ContextVar[int | None] = contextvars.ContextVar("span_atual", default=None)
+
+
+class Trace:
+    """
+    Registro de uma requisição: spans com início/duração relativos ao começo do trace,
+    contadores agregados (tokens, acertos de cache, iterações do ReAct) e atributos livres.
+    Seguro para spans registrados a partir de várias threads.
+    """
+
+    def __init__(self, nome: str, atributos: dict):
+        self.id = uuid.uuid4().hex[:16]
+        self.nome = nome
+        self.atributos = dict(atributos)
+        self.inicio = time.time()
+        self.duracao_ms: float | None = None
+        self.spans: list[dict] = []
+        self.contadores: dict[str, float] = {}
+        self._t0 = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def agora_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000.0
+
+    def novo_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def registrar(self, span_id: int, pai: int | None, nome: str, inicio_ms: float, fim_ms: float, atributos: dict) -> None:
+        with self._lock:
+            self.spans.append({
+                "id": span_id,
+                "pai": pai,
+                "nome": nome,
+                "inicio_ms": round(inicio_ms, 2),
+                "duracao_ms": round(fim_ms - inicio_ms, 2),
+                "atributos": atributos,
+            })
+
+    def contar(self, chave: str, n: float = 1) -> None:
+        with self._lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + n
+
+    def finalizar(self) -> None:
+        self.duracao_ms = round(self.agora_ms(), 2)
+
+    def para_dict(self) -> dict:
+        with self._lock:
+            return {
+                "trace_id": self.id,
+                "nome": self.nome,
+                "inicio": self.inicio,
+                "duracao_ms": self.duracao_ms,
+                "atributos": dict(self.atributos),
+                "contadores": dict(self.contadores),
+                "spans": sorted(self.spans, key=lambda s: (s["inicio_ms"], s["id"])),
+            }
+
+
+# Últimos traces do processo (painel de depuração) e exportação opcional em JSONL
+_recentes: deque[dict] = deque(maxlen=int(os.getenv("TRACE_BUFFER", "50")))
+_lock = threading.Lock()
+
+
+def _exportar(trace: Trace) -> None:
+    registro = trace.para_dict()
+    logger.info(
+        "Trace %s (%s): %.0f ms, %d spans, %s",
+        trace.id, trace.nome, trace.duracao_ms, len(registro["spans"]), registro["contadores"]
+    )
+    path = os.getenv("TRACE_PATH")
+    with _lock:
+        _recentes.append(registro)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.warning("Falha ao exportar trace para %s: %s", path, e)
+
+
+@contextmanager
+def iniciar_trace(nome: str, **atributos):
+    """
+    Abre o trace de uma requisição no contexto atual; ao sair, ele é finalizado, guardado
+    entre os recentes e, se TRACE_PATH estiver definido, anexado ao arquivo JSONL.
+    """
+    trace = Trace(nome, atributos)
+    token_trace = _trace_atual.set(trace)
+    token_span = _span_atual.set(None)
+    try:
+        yield trace
+    except Exception as e:
+        trace.atributos["erro"] = repr(e)
+        raise
+    finally:
+        _span_atual.reset(token_span)
+        _trace_atual.reset(token_trace)
+        trace.finalizar()
+        _exportar(trace)
+
+
+@contextmanager
+def span(nome: str, **atributos):
+    """
+    Mede um trecho da requisição atual. Devolve o dict de atributos para que o chamador
+    anote resultados (ex.: atributos["acerto"] = True). Sem trace ativo, não registra nada.
+    """
+    trace = _trace_atual.get()
+    if trace is None:
+        yield atributos
+        return
+    span_id = trace.novo_id()
+    pai = _span_atual.get()
+    token = _span_atual.set(span_id)
+    inicio = trace.agora_ms()
+    try:
+        yield atributos
+    except Exception as e:
+        atributos["erro"] = repr(e)
+        raise
+    finally:
+        _span_atual.reset(token)
+        trace.registrar(span_id, pai, nome, inicio, trace.agora_ms(), atributos)
+
+
+def trace_atual() -> Trace | None:
+    return _trace_atual.get()
+
+
+def contar(chave: str, n: float = 1) -> None:
+    """
+    Incrementa um contador do trace atual (no-op sem trace ativo).
+    """
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.contar(chave, n)
+
+
+def anotar(**atributos) -> None:
+    """
+    Adiciona atributos ao trace atual (ex.: caminho="fast_path").
+    """
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.atributos.update(atributos)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Handler do LangChain que transforma as chamadas ao LLM e às ferramentas em spans do
+    trace (com contagem de tokens) e conta as iterações do agente ReAct.
+    """
+
+    # Executa no próprio loop/thread da chamada, onde o contexto do trace está ativo
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._abertos: dict = {}
+
+    def _abrir(self, run_id, nome: str, atributos: dict, definir_pai: bool = False) -> None:
+        span_id = self.trace.novo_id()
+        pai = _span_atual.get()
+        self._abertos[run_id] = (span_id, pai, nome, self.trace.agora_ms(), atributos)
+        if definir_pai:
+            # Spans abertos dentro da ferramenta (busca, embeddings) ficam sob ela
+            _span_atual.set(span_id)
+
+    def _fechar(self, run_id, restaurar_pai: bool = False, **extra) -> None:
+        aberto = self._abertos.pop(run_id, None)
+        if aberto is None:
+            return
+        span_id, pai, nome, inicio, atributos = aberto
+        atributos.update(extra)
+        self.trace.registrar(span_id, pai, nome, inicio, self.trace.agora_ms(), atributos)
+        if restaurar_pai:
+            _span_atual.set(pai)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._abrir(run_id, "llm", {"prompt_chars": sum(len(p) for p in prompts)})
+        self.trace.contar("llm_chamadas")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        aberto = self._abertos.get(run_id)
+        if aberto is not None:
+            aberto[4]["tokens_stream"] = aberto[4].get("tokens_stream", 0) + 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        uso = (response.llm_output or {}).get("token_usage") or {}
+        tokens = {k: uso[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens") if k in uso}
+        for chave in ("prompt_tokens", "completion_tokens"):
+            if chave in tokens:
+                self.trace.contar(f"tokens.{chave}", tokens[chave])
+        self._fechar(run_id, **tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._fechar(run_id, erro=repr(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        nome = (serialized or {}).get("name") or kwargs.get("name") or "ferramenta"
+        self._abrir(run_id, f"ferramenta.{nome}", {"entrada": str(input_str)[:200]}, definir_pai=True)
+        self.trace.contar("ferramentas")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._fechar(run_id, restaurar_pai=True, saida_chars=len(str(output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._fechar(run_id, restaurar_pai=True, erro=repr(error))
+
+    def on_agent_action(self, action, *, run_id, **kwargs):
+        self.trace.contar("react_iteracoes")
+
+
+def callbacks() -> list:
+    """
+    Callbacks do LangChain para a requisição atual (lista vazia sem trace ativo).
+    """
+    trace = _trace_atual.get()
+    return [TracingCallbackHandler(trace)] if trace is not None else []
+
+
+def traces_recentes(n: int | None = None) -> list[dict]:
+    with _lock:
+        recentes = list(_recentes)
+    return recentes if n is None else recentes[-n:]
+
+
+def resumo_etapas(traces: list[dict] | None = None) -> list[dict]:
+    """
+    Agrega os spans dos traces recentes por nome: chamadas, média e p95 (ms), do mais lento
+    para o mais rápido em tempo total — serve para decidir onde cortar latência.
+    """
+    duracoes: dict[str, list[float]] = {}
+    for trace in traces if traces is not None else traces_recentes():
+        for s in trace["spans"]:
+            duracoes.setdefault(s["nome"], []).append(s["duracao_ms"])
+    resumo = []
+    for nome, valores in duracoes.items():
+        valores.sort()
+        resumo.append({
+            "etapa": nome,
+            "chamadas": len(valores),
+            "total_ms": round(sum(valores), 1),
+            "media_ms": round(sum(valores) / len(valores), 1),
+            "p95_ms": round(valores[min(len(valores) - 1, int(0.95 * len(valores)))], 1),
+        })
+    return sorted(resumo, key=lambda r: -r["total_ms"])
@@ -0,0 +1,178 @@
+import logging
+import numpy as np
+from src import tracing
+from src.biblia_index import BibliaIndex
+from src.embedding_artifact import EmbeddingArtifact, normalizar_linhas
+
+# Logger de módulo
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+PRECISOES = ("float32", "float16", "int8")
+
+
+def filtro_chroma(
+    biblia: BibliaIndex,
+    livro: str | None = None,
+    capitulo_min: int | None = None,
+    capitulo_max: int | None = None,
+    testamento: str | None = None,
+) -> dict | None:
+    """
+    Traduz os filtros de versículos para a cláusula where do Chroma.
+    """
+    condicoes = []
+    if livro is not None:
+        livro_obj = biblia.encontrar_livro(livro)
+        condicoes.append({"livro": livro_obj["nome"] if livro_obj else livro})
+    if testamento is not None:
+        condicoes.append({"livro": {"$in": biblia.livros_do_testamento(testamento)}})
+    if capitulo_min is not None:
+        condicoes.append({"capitulo": {"$gte": capitulo_min}})
+    if capitulo_max is not None:
+        condicoes.append({"capitulo": {"$lte": capitulo_max}})
+    if not condicoes:
+        return None
+    return condicoes[0] if len(condicoes) == 1 else {"$and": condicoes}
+
+
+class VectorStore:
+    """
+    Interface dos backends de busca vetorial de versículos. buscar() recebe os embeddings
+    de uma ou mais consultas e retorna, para cada uma, os n_results versículos mais próximos
+    como dicts {id, texto, livro, capitulo, versiculo, distancia} (distância de cosseno).
+    Filtros aceitos: livro, capitulo_min, capitulo_max e testamento.
+    """
+
+    nome = "base"
+
+    def buscar(self, embeddings, n_results: int = 5, **filtros) -> list[list[dict]]:
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Backend sobre uma coleção do Chroma (índice HNSW persistido em SQLite).
+    """
+
+    nome = "chroma"
+
+    def __init__(self, collection, biblia: BibliaIndex):
+        self.collection = collection
+        self.biblia = biblia
+
+    def buscar(self, embeddings, n_results: int = 5, **filtros) -> list[list[dict]]:
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            where=filtro_chroma(self.biblia, **filtros)
+        )
+        return [
+            [
+                {
+                    "id": doc_id,
+                    "texto": doc,
+                    "livro": meta["livro"],
+                    "capitulo": meta["capitulo"],
+                    "versiculo": meta["versiculo"],
+                    "distancia": dist,
+                }
+                for doc_id, doc, meta, dist in zip(ids, docs, metas, dists)
+            ]
+            for ids, docs, metas, dists in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Busca exata por força bruta: matriz de versículos normalizada (N x D) multiplicada pela
+    matriz das consultas (D x M) em uma única chamada BLAS, com top-k por argpartition.
+
+    Em float32 a matriz é usada como veio do artefato (memory-map, compartilhada entre
+    processos). float16 e int8 (escala por linha) reduzem a memória a 1/2 e 1/4; nesses
+    casos a matriz é convertida para float32 em blocos de `bloco` linhas durante a busca.
+    Vetores que não estejam normalizados em L2 são normalizados antes da quantização
+    (em float32 isso cria uma cópia em memória no lugar do memory-map).
+    """
+
+    nome = "numpy"
+
+    def __init__(self, vetores, biblia: BibliaIndex, precisao: str = "float32", bloco: int = 8192):
+        if precisao not in PRECISOES:
+            raise ValueError(f"Precisão inválida: {precisao} (use {', '.join(PRECISOES)})")
+        self.biblia = biblia
+        self.docs, self.ids, self.metadatas = biblia.documentos()
+        if len(vetores) != len(self.ids):
+            raise ValueError(f"{len(vetores)} vetores para {len(self.ids)} versículos")
+        self.precisao = precisao
+        self.bloco = bloco
+        self.escala = None
+        if not np.allclose(np.linalg.norm(vetores, axis=1), 1.0, atol=1e-3):
+            logger.info("Backend vetorial NumPy: vetores não normalizados, normalizando em L2")
+            vetores = normalizar_linhas(np.asarray(vetores, dtype=np.float32))
+        if precisao == "float32":
+            self.matriz = vetores if vetores.dtype == np.float32 else np.asarray(vetores, dtype=np.float32)
+        elif precisao == "float16":
+            self.matriz = np.asarray(vetores, dtype=np.float16)
+        else:
+            maximos = np.abs(vetores).max(axis=1).astype(np.float32)
+            self.escala = np.maximum(maximos, 1e-12) / 127.0
+            self.matriz = np.rint(vetores / self.escala[:, None]).astype(np.int8)
+        logger.info(
+            "Backend vetorial NumPy: %d vetores (%s, %.1f MB)",
+            len(self.ids), precisao, self.matriz.nbytes / (1024 * 1024)
+        )
+
+    @classmethod
+    def do_artefato(cls, artefato: EmbeddingArtifact, biblia: BibliaIndex, precisao: str = "float32") -> "NumpyVectorStore":
+        _, ids, _ = biblia.documentos()
+        if artefato.ids != ids:
+            raise ValueError(f"Artefato de embeddings em {artefato.path} não corresponde aos versículos")
+        return cls(artefato.vetores, biblia, precisao=precisao)
+
+    def _similaridades(self, consultas: np.ndarray) -> np.ndarray:
+        if self.precisao == "float32":
+            return self.matriz @ consultas.T
+        similaridades = np.empty((len(self.matriz), len(consultas)), dtype=np.float32)
+        for inicio in range(0, len(self.matriz), self.bloco):
+            bloco = self.matriz[inicio:inicio + self.bloco].astype(np.float32)
+            resultado = bloco @ consultas.T
+            if self.escala is not None:
+                resultado *= self.escala[inicio:inicio + self.bloco, None]
+            similaridades[inicio:inicio + self.bloco] = resultado
+        return similaridades
+
+    def buscar(self, embeddings, n_results: int = 5, **filtros) -> list[list[dict]]:
+        consultas = normalizar_linhas(np.asarray(embeddings, dtype=np.float32))
+        with tracing.span("numpy.matmul", consultas=len(consultas), precisao=self.precisao):
+            similaridades = self._similaridades(consultas)
+        mascara = self.biblia.mascara(**filtros)
+        if mascara is not None:
+            similaridades[~mascara] = -np.inf
+        k = min(n_results, len(self.ids) if mascara is None else int(mascara.sum()))
+        if k <= 0:
+            return [[] for _ in consultas]
+
+        # top-k de todas as consultas de uma vez (uma coluna por consulta)
+        candidatos = np.argpartition(-similaridades, k - 1, axis=0)[:k]
+        pontuacoes = np.take_along_axis(similaridades, candidatos, axis=0)
+        ordem = np.argsort(-pontuacoes, axis=0, kind="stable")
+        candidatos = np.take_along_axis(candidatos, ordem, axis=0)
+        pontuacoes = np.take_along_axis(pontuacoes, ordem, axis=0)
+
+        resultados = []
+        for coluna in range(len(consultas)):
+            resultados.append([
+                {
+                    "id": self.ids[i],
+                    "texto": self.docs[i],
+                    "livro": self.metadatas[i]["livro"],
+                    "capitulo": self.metadatas[i]["capitulo"],
+                    "versiculo": self.metadatas[i]["versiculo"],
+                    "distancia": float(1.0 - s),
+                }
+                for i, s in zip(candidatos[:, coluna], pontuacoes[:, coluna])
+            ])
+        return resultados
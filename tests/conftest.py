@@ -0,0 +1,13 @@
+import pytest
+
+
+def _capitulo(numero, versiculos):
+    return {"capitulo": numero, "versiculos": [{"versiculo": v, "texto": f"texto {numero}:{v}"} for v in range(1, versiculos + 1)]}
+
+
+@pytest.fixture
+def capitulo():
+    """
+    Monta um capítulo no formato do JSON da Bíblia: capitulo(numero, quantidade_de_versiculos).
+    """
+    return _capitulo
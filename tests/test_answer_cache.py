@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from src import answer_cache
+from src.answer_cache import AnswerCache
+
+
+def _atende(meta, where):
+    if not where:
+        return True
+    (campo, condicao), = where.items()
+    if not isinstance(condicao, dict):
+        return meta[campo] == condicao
+    (operador, valor), = condicao.items()
+    return {"$ne": meta[campo] != valor, "$lt": meta[campo] < valor}[operador]
+
+
+class ColecaoFalsa:
+    """
+    Subconjunto da API de coleção do Chroma usado pelo AnswerCache (espaço de cosseno).
+    """
+
+    def __init__(self):
+        self.itens = {}
+        self.leituras = 0
+
+    def count(self):
+        return len(self.itens)
+
+    def get(self, where=None, include=()):
+        self.leituras += 1
+        selecionados = [(i, m) for i, (_, m) in self.itens.items() if _atende(m, where)]
+        return {"ids": [i for i, _ in selecionados], "metadatas": [m for _, m in selecionados]}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for doc_id, vetor, meta in zip(ids, embeddings, metadatas):
+            self.itens[doc_id] = (np.asarray(vetor, dtype=np.float32), meta)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.itens.pop(doc_id, None)
+
+    def query(self, query_embeddings, n_results, where, include):
+        consulta = np.asarray(query_embeddings[0], dtype=np.float32)
+        candidatos = sorted(
+            (1.0 - float(v @ consulta / (np.linalg.norm(v) * np.linalg.norm(consulta))), i, m)
+            for i, (v, m) in self.itens.items() if _atende(m, where)
+        )[:n_results]
+        return {
+            "ids": [[i for _, i, _ in candidatos]],
+            "metadatas": [[m for _, _, m in candidatos]],
+            "distances": [[d for d, _, _ in candidatos]],
+        }
+
+
+class ClienteFalso:
+    def __init__(self):
+        self.colecoes = {}
+
+    def get_or_create_collection(self, name, metadata, embedding_function):
+        return self.colecoes.setdefault(name, ColecaoFalsa())
+
+
+def embed(textos):
+    # Perguntas sobre o mesmo tema (primeira palavra) ficam quase paralelas
+    vetores = []
+    for texto in textos:
+        tema, _, resto = texto.partition(" ")
+        vetor = np.zeros(64, dtype=np.float32)
+        vetor[sum(map(ord, tema)) % 64] = 1.0
+        vetor[sum(map(ord, resto)) % 64] += 0.1
+        vetores.append(vetor.tolist())
+    return vetores
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: agora[0])
+    return agora
+
+
+def _cache(cliente, versao="v1", **kwargs):
+    return AnswerCache(cliente, embed, versao, **kwargs)
+
+
+def test_acerto_por_similaridade_e_contadores(relogio):
+    cache = _cache(ClienteFalso())
+    cache.salvar("perdão na Bíblia", "resposta")
+    assert cache.buscar("perdão na Bíblia") == "resposta"
+    assert cache.buscar("perdão segundo a Bíblia") == "resposta"
+    assert cache.buscar("fé e obras") is None
+    assert cache.stats() | {"hit_rate": None} == {"itens": 1, "hits": 2, "misses": 1, "evictions": 0, "hit_rate": None}
+
+
+def test_entrada_expirada_nao_responde(relogio):
+    cache = _cache(ClienteFalso(), ttl_segundos=60)
+    cache.salvar("perdão", "resposta")
+    relogio[0] += 61
+    assert cache.buscar("perdão") is None
+
+
+def test_outra_versao_invalida_as_entradas(relogio):
+    cliente = ClienteFalso()
+    _cache(cliente, versao="v1").salvar("perdão", "resposta antiga")
+    cache = _cache(cliente, versao="v2")
+    assert cache.collection.count() == 0
+    assert cache.buscar("perdão") is None
+
+
+def test_despejo_em_lote_ate_90_por_cento(relogio):
+    cache = _cache(ClienteFalso(), ttl_segundos=None, max_itens=10)
+    for i in range(11):
+        relogio[0] += 1
+        cache.salvar(f"tema{i} pergunta", f"resposta {i}")
+    # Passou de 10: as mais antigas saem até sobrar 90% da capacidade
+    assert cache.collection.count() == 9
+    assert cache.stats()["evictions"] == 2
+    assert cache.buscar("tema0 pergunta") is None
+    assert cache.buscar("tema10 pergunta") == "resposta 10"
+
+
+def test_expiradas_sao_removidas_sem_ler_a_colecao_a_cada_gravacao(relogio):
+    cache = _cache(ClienteFalso(), ttl_segundos=60, max_itens=1000)
+    cache.salvar("antiga", "r")
+    relogio[0] += 61
+    leituras = cache.collection.leituras
+    for i in range(answer_cache.EXPURGO_A_CADA - 2):
+        cache.salvar(f"tema{i} pergunta", "r")
+    assert cache.collection.leituras == leituras
+    assert cache.collection.count() == answer_cache.EXPURGO_A_CADA - 1
+    cache.salvar("mais uma", "r")
+    assert cache.collection.leituras == leituras + 1
+    assert cache.collection.count() == answer_cache.EXPURGO_A_CADA - 1
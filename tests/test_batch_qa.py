@@ -0,0 +1,132 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+from src import batch_qa
+from src.batch_qa import BatchQA, ler_checkpoint
+
+
+def limite_de_taxa(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after else {}
+    resposta = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.openai.com/v1/completions"))
+    return openai.RateLimitError("limite de taxa", response=resposta, body=None)
+
+
+class AgenteFalso:
+    def __init__(self, erros=()):
+        self.erros = list(erros)
+        self.perguntas = []
+        self._lock = threading.Lock()
+        self.db = SimpleNamespace(
+            embedding_cache=SimpleNamespace(max_itens=100),
+            functiom_embedder=SimpleNamespace(embed_query=lambda textos: [[0.0] for _ in textos]),
+        )
+
+    def ask(self, pergunta, propagar_erros=False):
+        with self._lock:
+            self.perguntas.append(pergunta)
+            if self.erros:
+                raise self.erros.pop(0)
+        return f"resposta para {pergunta}"
+
+
+class RelogioFalso:
+    """
+    Substitui o módulo time em batch_qa: sleep só avança o relógio e fica registrado.
+    """
+
+    def __init__(self):
+        self.agora = 0.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    def sleep(self, segundos):
+        self.esperas.append(round(segundos, 3))
+        self.agora += segundos
+
+    def perf_counter(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(batch_qa, "time", relogio)
+    monkeypatch.setattr(batch_qa.random, "random", lambda: 0.0)
+    return relogio
+
+
+def _itens(*perguntas):
+    return [{"request_id": f"r{i}", "pergunta": p} for i, p in enumerate(perguntas, start=1)]
+
+
+def _saida(path):
+    with open(path, encoding="utf-8") as f:
+        return {r["request_id"]: r for r in map(json.loads, f)}
+
+
+def test_perguntas_normalizadas_iguais_sao_respondidas_uma_vez(tmp_path):
+    agente = AgenteFalso()
+    saida = tmp_path / "respostas.jsonl"
+    resumo = BatchQA(agente, str(saida), concorrencia=2).executar(
+        _itens("O que é a fé?", "  o que é a   FÉ? ", "Quem foi Moisés?")
+    )
+    assert sorted(agente.perguntas) == ["O que é a fé?", "Quem foi Moisés?"]
+    assert resumo["perguntas_unicas"] == 2 and resumo["ok"] == 3
+    registros = _saida(saida)
+    assert registros["r2"]["duplicada_de"] == "r1"
+    assert registros["r2"]["resposta"] == registros["r1"]["resposta"]
+
+
+def test_retoma_do_checkpoint(tmp_path):
+    saida = tmp_path / "respostas.jsonl"
+    BatchQA(AgenteFalso(), str(saida)).executar(_itens("O que é a fé?", "Quem foi Moisés?"))
+    with open(saida, "a", encoding="utf-8") as f:
+        f.write('{"request_id": "r9", "status": "o')  # linha truncada por uma interrupção
+
+    agente = AgenteFalso()
+    itens = _itens("O que é a fé?", "Quem foi Moisés?", "Quem foi Davi?")
+    itens.append({"request_id": "r4", "pergunta": "quem foi moisés?"})
+    resumo = BatchQA(agente, str(saida)).executar(itens)
+
+    # Já respondidas não chamam o agente; a pergunta nova com texto já respondido é reaproveitada
+    assert agente.perguntas == ["Quem foi Davi?"]
+    assert resumo["ja_concluidos"] == 2 and resumo["reaproveitados"] == 1
+    concluidos = ler_checkpoint(str(saida))
+    assert set(concluidos) == {"r1", "r2", "r3", "r4"}
+    assert concluidos["r4"]["duplicada_de"] == "r2"
+
+
+def test_backoff_exponencial_em_limite_de_taxa(tmp_path, relogio):
+    agente = AgenteFalso(erros=[limite_de_taxa(), limite_de_taxa()])
+    batch = BatchQA(agente, str(tmp_path / "s.jsonl"), espera_base=1.0)
+    resposta, tentativas, erro = batch._responder("O que é a fé?")
+    assert (resposta, tentativas, erro) == ("resposta para O que é a fé?", 3, None)
+    assert relogio.esperas == [1.0, 2.0]
+
+
+def test_retry_after_e_limite_de_tentativas(tmp_path, relogio):
+    agente = AgenteFalso(erros=[limite_de_taxa(retry_after="7")] * 3)
+    batch = BatchQA(agente, str(tmp_path / "s.jsonl"), max_tentativas=3, espera_base=1.0)
+    resposta, tentativas, erro = batch._responder("O que é a fé?")
+    assert resposta is None and tentativas == 3
+    assert isinstance(erro, openai.RateLimitError)
+    assert relogio.esperas == [7.0, 7.0]
+
+
+def test_limite_de_taxa_pausa_todos_os_workers(tmp_path, relogio):
+    batch = BatchQA(AgenteFalso(erros=[limite_de_taxa()]), str(tmp_path / "s.jsonl"), espera_base=4.0)
+    batch._responder("primeira")
+    # Outro worker que chega durante a pausa espera o que falta antes de chamar o agente
+    relogio.agora -= 3.0
+    outro = AgenteFalso()
+    batch.agent = outro
+    batch._responder("segunda")
+    assert relogio.esperas == [4.0, 3.0]
+    assert outro.perguntas == ["segunda"]
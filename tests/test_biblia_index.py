@@ -0,0 +1,48 @@
+import pytest
+from src.biblia_index import BibliaIndex, normalizar_testamento
+
+
+@pytest.fixture
+def indice(capitulo):
+    return BibliaIndex({
+        "antigoTestamento": [{"nome": "Gênesis", "abreviacao": "gn", "capitulos": [capitulo(1, 9), capitulo(2, 3)]}],
+        "novoTestamento": [{"nome": "Mateus", "abreviacao": "mt", "capitulos": [capitulo(5, 6)]}],
+    })
+
+
+@pytest.mark.parametrize("valor,esperado", [
+    ("novoTestamento", "novoTestamento"),
+    ("NovoTestamento", "novoTestamento"),
+    ("novo", "novoTestamento"),
+    ("Antigo", "antigoTestamento"),
+])
+def test_normalizar_testamento(valor, esperado):
+    assert normalizar_testamento(valor) == esperado
+
+
+def test_testamento_desconhecido_e_erro_claro(indice):
+    with pytest.raises(ValueError, match="Testamento inválido"):
+        indice.livros_do_testamento("apocrifos")
+    with pytest.raises(ValueError, match="Testamento inválido"):
+        indice.mascara(testamento="apocrifos")
+
+
+def test_mascara_por_testamento(indice):
+    _, ids, _ = indice.documentos()
+    mascara = indice.mascara(testamento="novo")
+    assert [doc_id for doc_id, ok in zip(ids, mascara) if ok] == [f"Mateus 5:{v}" for v in range(1, 7)]
+
+
+def test_passagens_cobrem_todo_ocapitulo(indice):
+    _, ids, metadatas = indice.passagens(janela=4, passo=2)
+    assert [i for i in ids if i.startswith("Gênesis 1:")] == [
+        "Gênesis 1:1-4", "Gênesis 1:3-6", "Gênesis 1:5-8", "Gênesis 1:6-9"
+    ]
+    # Capítulo menor que a janela vira uma única passagem
+    assert "Gênesis 2:1-3" in ids
+    assert metadatas[0] == {"livro": "Gênesis", "capitulo": 1, "versiculo_inicio": 1, "versiculo_fim": 4}
+
+
+def test_trecho_com_contexto(indice):
+    _, versiculos = indice.trecho("gn", 1, 3, 4, contexto=1)
+    assert [v["versiculo"] for v in versiculos] == [2, 3, 4, 5]
@@ -0,0 +1,66 @@
+import pytest
+from src.biblia_index import BibliaIndex
+from src.bm25_index import BM25Index, tokenizar
+
+
+def _livro(nome, abreviacao, textos_por_capitulo):
+    return {"nome": nome, "abreviacao": abreviacao, "capitulos": [
+        {"capitulo": n, "versiculos": [{"versiculo": v, "texto": t} for v, t in enumerate(textos, start=1)]}
+        for n, textos in enumerate(textos_por_capitulo, start=1)
+    ]}
+
+
+@pytest.fixture
+def bm25():
+    return BM25Index(BibliaIndex({
+        "antigoTestamento": [_livro("Gênesis", "gn", [
+            ["No princípio Deus criou os céus e a terra", "O amor de Deus é eterno"],
+            ["A terra era sem forma e vazia"],
+        ])],
+        "novoTestamento": [_livro("Mateus", "mt", [
+            ["Amai o próximo: amor, amor e mais amor", "Perdão aos irmãos setenta vezes sete"],
+            ["A fé move montanhas e o amor tudo suporta"],
+        ])],
+    }))
+
+
+def _ids(bm25, resultados):
+    return [bm25.ids[posicao] for posicao, _ in resultados]
+
+
+def test_tokenizar_remove_acentos_e_stopwords():
+    assert tokenizar("O Perdão de Deus") == ["perdao", "deus"]
+
+
+def test_ranking(bm25):
+    resultados = bm25.buscar("amor")
+    # Maior frequência do termo vem primeiro; só versículos com o termo aparecem
+    assert _ids(bm25, resultados)[0] == "Mateus 1:1"
+    assert set(_ids(bm25, resultados)) == {"Mateus 1:1", "Gênesis 1:2", "Mateus 2:1"}
+    pontuacoes = [p for _, p in resultados]
+    assert pontuacoes == sorted(pontuacoes, reverse=True)
+
+
+def test_termo_raro_pesa_mais(bm25):
+    # "terra" aparece em dois versículos, "princípio" em um só
+    assert _ids(bm25, bm25.buscar("terra princípio"))[0] == "Gênesis 1:1"
+
+
+def test_sem_acentos_e_sem_resultado(bm25):
+    assert _ids(bm25, bm25.buscar("perdao")) == ["Mateus 1:2"]
+    assert bm25.buscar("de que") == []
+    assert bm25.buscar("inexistente") == []
+
+
+def test_limite_k(bm25):
+    assert len(bm25.buscar("amor", k=2)) == 2
+
+
+@pytest.mark.parametrize("filtros,esperados", [
+    ({"livro": "Mateus"}, {"Mateus 1:1", "Mateus 2:1"}),
+    ({"testamento": "antigo"}, {"Gênesis 1:2"}),
+    ({"livro": "mt", "capitulo_min": 2}, {"Mateus 2:1"}),
+    ({"livro": "Gênesis", "capitulo_min": 2}, set()),
+])
+def test_filtros(bm25, filtros, esperados):
+    assert set(_ids(bm25, bm25.buscar("amor", mascara=bm25.mascara(**filtros)))) == esperados
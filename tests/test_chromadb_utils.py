@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_huggingface")
+from src.chromadb_utils import ChromaDB
+
+
+def test_vetores_passagens_sao_media_dos_versiculos():
+    ids = ["Gn 1:1", "Gn 1:2", "Gn 1:3", "Gn 2:1", "Gn 2:2"]
+    vetores = np.asarray([[1, 0], [0, 1], [1, 1], [2, 0], [0, 3]], dtype=np.float32)
+    metadatas = [
+        {"livro": "Gn", "capitulo": 1, "versiculo_inicio": 1, "versiculo_fim": 2},
+        {"livro": "Gn", "capitulo": 2, "versiculo_inicio": 1, "versiculo_fim": 2},
+    ]
+    resultado = ChromaDB.vetores_passagens(None, vetores, ids, metadatas)
+    esperado = np.asarray([[1, 1], [1, 1]], dtype=np.float32) / np.sqrt(2)
+    np.testing.assert_allclose(resultado, esperado, atol=1e-6)
+
+
+class EmbedderFalso:
+    def __init__(self):
+        self.textos = []
+
+    def embed_documents(self, textos):
+        self.textos += textos
+        return [[float(len(t)), float(sum(map(ord, t)))] for t in textos]
+
+
+def test_mesmo_vetor_com_e_sem_cache():
+    from src.chromadb_utils import LangchainEmbeddingFunction
+    from src.embedding_cache import QueryEmbeddingCache
+
+    consultas = ["O Perdão", "o  perdão", "Moisés"]
+    sem_cache = LangchainEmbeddingFunction(EmbedderFalso(), "m")
+    embedder = EmbedderFalso()
+    com_cache = LangchainEmbeddingFunction(embedder, "m", QueryEmbeddingCache())
+
+    assert com_cache.embed_query(consultas[:1]) == sem_cache.embed_query(consultas[:1])
+    # O modelo recebe o texto original; a forma normalizada é só a chave do cache
+    assert embedder.textos == ["O Perdão"]
+    # Variação de caixa/espaçamento reaproveita a entrada, e cada chave é codificada uma vez por lote
+    com_cache.embed_query(consultas)
+    assert embedder.textos == ["O Perdão", "Moisés"]
+    assert com_cache.cache.stats()["hits"] == 2
@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+from src import context_packing
+from src.context_packing import AVISO_ESGOTADO, AVISO_TRUNCADO, OrcamentoContexto, empacotar, extrair_frases_relevantes, orcamento
+
+
+@pytest.fixture(autouse=True)
+def estimativa_de_tokens(monkeypatch):
+    # Sem tiktoken: 4 caracteres por token, contagem determinística
+    monkeypatch.setattr(context_packing, "_encoding", None)
+    monkeypatch.setattr(context_packing, "_encoding_carregado", True)
+
+
+def _texto(tokens):
+    return "x" * (4 * tokens)
+
+
+def test_saidas_dentro_do_orcamento_passam_inteiras():
+    atual = OrcamentoContexto("pergunta", limite=100)
+    assert atual.consumir(_texto(30)) == _texto(30)
+    assert atual.consumir(_texto(30)) == _texto(30)
+    assert atual.usados == 60
+
+
+def test_orcamento_esgotado_e_saidas_pequenas_ainda_cabem():
+    atual = OrcamentoContexto("pergunta", limite=100)
+    atual.consumir(_texto(70))
+    # Restam 30 tokens (< MINIMO_TOKENS): uma saída grande vira o aviso e não consome nada
+    assert atual.consumir(_texto(200)) == AVISO_ESGOTADO
+    assert atual.usados == 70
+    # Uma saída pequena posterior ainda cabe no que sobrou
+    assert atual.consumir(_texto(20)) == _texto(20)
+    assert atual.restante == 10
+
+
+def test_saida_grande_e_truncada_e_depois_esgota():
+    atual = OrcamentoContexto("pergunta", limite=100)
+    truncado = atual.consumir("palavra " * 200)
+    assert truncado.endswith(AVISO_TRUNCADO)
+    assert context_packing.contar_tokens(truncado) <= 100
+    assert atual.restante == 0
+    assert atual.consumir(_texto(1)) == AVISO_ESGOTADO
+
+
+def test_empacotar_usa_o_orcamento_da_pergunta():
+    assert empacotar(_texto(500)) == _texto(500)
+    with orcamento("pergunta", limite=50) as atual:
+        empacotar(_texto(45))
+        assert empacotar(_texto(45)) == AVISO_ESGOTADO
+        assert atual.usados == 45
+
+
+class EmbedderPorPalavra:
+    """
+    Embedding de brinquedo: uma dimensão por palavra-chave, contando as ocorrências.
+    """
+
+    PALAVRAS = ("água", "fogo", "terra")
+
+    def _vetor(self, texto):
+        texto = texto.lower()
+        return [texto.count(p) for p in self.PALAVRAS] + [0.01]
+
+    def __call__(self, textos):
+        return [self._vetor(t) for t in textos]
+
+    def embed_query(self, textos):
+        return [self._vetor(t) for t in textos]
+
+
+def test_extrair_frases_mais_relevantes():
+    frases = [
+        "Batismo é o rito de iniciação cristã.",
+        "Era feito com fogo segundo alguns profetas.",
+        "João batizava com água no rio Jordão.",
+        "A terra de Israel tinha muitos rios.",
+        "Jesus falou de água viva à samaritana.",
+    ]
+    texto = " ".join(frases)
+    limite = sum(context_packing.contar_tokens(f) for f in (frases[0], frases[2], frases[4])) + 1
+    resultado = extrair_frases_relevantes(texto, "água", limite, EmbedderPorPalavra())
+    # Mantém a definição e as frases sobre água, na ordem original, marcando as omissões
+    assert resultado == f"{frases[0]} ... {frases[2]} ... {frases[4]}"
+
+
+def test_texto_curto_nao_e_alterado():
+    assert extrair_frases_relevantes("Frase curta.", "água", 100, EmbedderPorPalavra()) == "Frase curta."
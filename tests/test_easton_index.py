@@ -0,0 +1,60 @@
+import pytest
+from src.easton_index import EastonIndex
+
+DICIONARIO = [
+    {"termo": "Abraão", "descricao": "Pai de uma multidão."},
+    {"termo": "Getsêmani", "descricao": "Jardim ao pé do monte das Oliveiras."},
+    {"termo": "Fariseus", "descricao": "Seita dos judeus."},
+    {"termo": "Febe", "descricao": "Diaconisa da igreja de Cencréia."},
+    {"termo": "Feno", "descricao": "Erva cortada e seca."},
+    {"termo": "Febre", "descricao": "Doença."},
+    {"termo": "Felix", "descricao": "Governador da Judéia."},
+    {"termo": "Ferro", "descricao": "Metal."},
+]
+
+
+@pytest.fixture
+def indice():
+    return EastonIndex(DICIONARIO)
+
+
+@pytest.mark.parametrize("termo", ["Abraão", "abraao", "GETSÊMANI"])
+def test_exato(indice, termo):
+    resultados, camada = indice.buscar(termo)
+    assert camada == "exato"
+    assert len(resultados) == 1
+
+
+@pytest.mark.parametrize("termo,esperado", [("Abrahão", "Abraão"), ("Getsemane", "Getsêmani"), ("Farizeus", "Fariseus")])
+def test_aproximado_por_distancia_de_edicao(indice, termo, esperado):
+    resultados, camada = indice.buscar(termo)
+    assert camada == "aproximado"
+    assert resultados[0]["termo"] == esperado
+
+
+def test_so_prefixo_e_sugestao(indice):
+    resultados, camada = indice.buscar("Abra")
+    assert camada == "prefixo"
+    assert [r["termo"] for r in resultados] == ["Abraão"]
+
+
+def test_termo_curto_sem_entrada_nao_vira_termo_proximo(indice):
+    # "fé" não existe no dicionário: Febe, Feno etc. são só sugestões por prefixo
+    resultados, camada = indice.buscar("fé")
+    assert camada == "prefixo"
+    assert {r["termo"] for r in resultados} == {"Febe", "Feno", "Febre", "Felix", "Ferro"}
+
+
+def test_nao_encontrado(indice):
+    assert indice.buscar("Zorobabel") == ([], None)
+
+
+def test_ferramenta_nao_apresenta_descricao_de_sugestao(monkeypatch, indice):
+    pytest.importorskip("langchain")
+    from src import tools
+
+    monkeypatch.setattr(tools, "obter_indice_easton", lambda: indice)
+    resposta = tools.buscar_dicionario_easton.invoke("fé")
+    assert "não foi encontrado" in resposta
+    assert "Termos sugeridos: " in resposta
+    assert "Diaconisa" not in resposta
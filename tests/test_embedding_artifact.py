@@ -0,0 +1,97 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from src.embedding_artifact import ARTIFACT_FORMAT, ColetorDeVetores, EmbeddingArtifact, ler_vetores_da_colecao
+
+IDS = ["Gênesis 1:1", "Gênesis 1:2", "Gênesis 1:3"]
+METADATAS = [{"livro": "Gênesis", "capitulo": 1, "versiculo": v} for v in (1, 2, 3)]
+
+
+@pytest.fixture
+def vetores():
+    return np.asarray([[3.0, 4.0], [0.0, 2.0], [1.0, 1.0]], dtype=np.float32)
+
+
+@pytest.fixture
+def artefato(tmp_path, vetores):
+    return EmbeddingArtifact.salvar(str(tmp_path / "biblia"), vetores, IDS, METADATAS, "hash-json", "modelo")
+
+
+def test_ida_e_volta(tmp_path, artefato, vetores):
+    carregado = EmbeddingArtifact.carregar(str(tmp_path / "biblia"), "hash-json", "modelo")
+    assert carregado.ids == IDS and carregado.metadatas == METADATAS
+    # Vetores abertos por memory-map, somente leitura e normalizados em L2
+    assert isinstance(carregado.vetores, np.memmap)
+    assert not carregado.vetores.flags.writeable
+    np.testing.assert_allclose(carregado.vetores, vetores / np.linalg.norm(vetores, axis=1, keepdims=True), rtol=1e-6)
+    assert {k: carregado.manifest[k] for k in ("formato", "source_hash", "model_name", "count", "dim", "dtype")} == {
+        "formato": ARTIFACT_FORMAT, "source_hash": "hash-json", "model_name": "modelo", "count": 3, "dim": 2, "dtype": "float32",
+    }
+    assert len(artefato) == 3
+
+
+def test_salvar_nao_altera_a_entrada_e_substitui_o_anterior(tmp_path, vetores):
+    path = str(tmp_path / "biblia")
+    original = vetores.copy()
+    EmbeddingArtifact.salvar(path, vetores, IDS, METADATAS, "hash-antigo", "modelo")
+    EmbeddingArtifact.salvar(path, vetores[::-1], IDS[::-1], METADATAS[::-1], "hash-novo", "modelo")
+    np.testing.assert_array_equal(vetores, original)
+    assert EmbeddingArtifact.carregar(path, "hash-novo").ids == IDS[::-1]
+    assert sorted(os.listdir(tmp_path)) == ["biblia"]
+
+
+@pytest.mark.parametrize("source_hash,model_name", [("outro-hash", "modelo"), ("hash-json", "outro-modelo")])
+def test_hash_ou_modelo_diferente_e_ignorado(tmp_path, artefato, source_hash, model_name):
+    assert EmbeddingArtifact.carregar(str(tmp_path / "biblia"), source_hash, model_name) is None
+
+
+def test_manifesto_ausente_ou_inconsistente_e_ignorado(tmp_path, artefato):
+    path = str(tmp_path / "biblia")
+    manifest_path = os.path.join(path, "manifest.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    for alterado in ({**manifest, "count": 4}, {**manifest, "formato": ARTIFACT_FORMAT + 1}):
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(alterado, f)
+        assert EmbeddingArtifact.carregar(path) is None
+    os.remove(manifest_path)
+    assert EmbeddingArtifact.carregar(path) is None
+    assert EmbeddingArtifact.carregar(str(tmp_path / "inexistente")) is None
+
+
+def test_salvar_rejeita_vetores_desalinhados(tmp_path, vetores):
+    with pytest.raises(ValueError):
+        EmbeddingArtifact.salvar(str(tmp_path / "biblia"), vetores[:2], IDS, METADATAS, "h", "m")
+
+
+def test_coletor_escreve_cada_lote_na_linha_do_id():
+    coletor = ColetorDeVetores(IDS)
+    coletor.upsert(documents=None, ids=[IDS[2], IDS[0]], metadatas=None, embeddings=[[3.0, 3.0], [1.0, 1.0]])
+    assert coletor.faltando() == 1
+    coletor.upsert(documents=None, ids=[IDS[1]], metadatas=None, embeddings=[[2.0, 2.0]])
+    assert coletor.vetores.dtype == np.float32
+    np.testing.assert_array_equal(coletor.vetores[:, 0], [1.0, 2.0, 3.0])
+
+
+class ColecaoFalsa:
+    name = "biblia"
+
+    def __init__(self, vetores):
+        self.vetores = vetores
+
+    def get(self, ids, include):
+        # O Chroma não garante a ordem dos ids pedidos
+        encontrados = [i for i in reversed(ids) if i in self.vetores]
+        return {"ids": encontrados, "embeddings": [self.vetores[i] for i in encontrados]}
+
+
+def test_ler_vetores_da_colecao_na_ordem_dos_ids():
+    colecao = ColecaoFalsa({doc_id: [float(n), 0.0] for n, doc_id in enumerate(IDS)})
+    vetores = ler_vetores_da_colecao(colecao, IDS, page_size=2)
+    np.testing.assert_array_equal(vetores[:, 0], [0.0, 1.0, 2.0])
+    with pytest.raises(ValueError, match="1 documentos"):
+        ler_vetores_da_colecao(ColecaoFalsa({IDS[0]: [1.0, 0.0], IDS[1]: [0.0, 1.0]}), IDS)
@@ -0,0 +1,35 @@
+from src.embedding_cache import QueryEmbeddingCache, normalizar_consulta
+
+
+def test_normalizar_consulta():
+    assert normalizar_consulta("  O  Perdão\tna Bíblia ") == "o perdão na bíblia"
+
+
+def test_contadores_de_acertos_erros_e_despejos():
+    cache = QueryEmbeddingCache(max_itens=2)
+    assert cache.get("m", "a") is None
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert cache.get("m", "a") == [1.0]
+    # "a" acabou de ser usada: o despejo leva "b", a menos recente
+    cache.put("m", "c", [3.0])
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "c") == [3.0]
+    assert cache.stats() == {"itens": 2, "max_itens": 2, "hits": 2, "misses": 2, "evictions": 1, "hit_rate": 0.5}
+
+
+def test_chave_inclui_o_modelo():
+    cache = QueryEmbeddingCache()
+    cache.put("m1", "a", [1.0])
+    assert cache.get("m2", "a") is None
+
+
+def test_persistencia(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = QueryEmbeddingCache(max_itens=2, path=path)
+    for texto in ("a", "b", "c"):
+        cache.put("m", texto, [float(ord(texto))])
+    cache.salvar()
+    recarregado = QueryEmbeddingCache(max_itens=2, path=path)
+    assert recarregado.get("m", "a") is None
+    assert recarregado.get("m", "c") == [99.0]
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+from src.biblia_index import BibliaIndex
+
+pytest.importorskip("langchain_core")
+from src import fast_path
+
+
+@pytest.fixture
+def caminho(monkeypatch, capitulo):
+    indice = BibliaIndex({
+        "antigoTestamento": [{"nome": "Oséias", "abreviacao": "os", "capitulos": [capitulo(n, 12) for n in range(1, 15)]}],
+        "novoTestamento": [
+            {"nome": "Atos", "abreviacao": "at", "capitulos": [capitulo(n, 10) for n in range(1, 29)]},
+            {"nome": "1 Coríntios", "abreviacao": "1co", "capitulos": [capitulo(13, 13)]},
+        ],
+    })
+    monkeypatch.setattr(fast_path, "obter_indice_biblia", lambda: indice)
+    return fast_path.FastPath(retrieval=None)
+
+
+@pytest.mark.parametrize("pergunta", ["Resuma Oséias 6", "O que diz 1 Coríntios 13:4?", "Explique Os 6:6"])
+def test_referencia_literal(caminho, pergunta):
+    assert caminho._referencia_literal(pergunta)
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Quais são os 10 mandamentos?",
+    "Quem eram as 12 tribos de Israel?",
+    "Quem esteve at 3 dias no ventre do peixe?",
+    "O que diz Oséias 40?",
+])
+def test_numero_solto_nao_e_referencia(caminho, pergunta):
+    assert not caminho._referencia_literal(pergunta)
+
+
+def test_distancia_maxima_configuravel(monkeypatch):
+    monkeypatch.setenv("FAST_PATH_MAX_DISTANCE", "0.5")
+    assert fast_path.FastPath(retrieval=None).max_distancia == 0.5
+    assert fast_path.FastPath(retrieval=None, max_distancia=0.3).max_distancia == 0.3
+
+
+def test_so_resultados_do_bm25_vao_para_o_react(monkeypatch, caminho):
+    from src.easton_index import EastonIndex
+
+    # Versículos encontrados só pelo BM25 vêm com distancia=None e não bastam para o modo rápido
+    lexicais = [{"id": "Atos 1:1", "livro": "Atos", "capitulo": 1, "versiculo": 1, "texto": "t", "distancia": None}]
+    caminho.retrieval = SimpleNamespace(buscar_hibrido=lambda question, n_results: lexicais)
+    monkeypatch.setattr(fast_path, "obter_indice_easton", lambda: EastonIndex([]))
+    assert caminho.coletar("O que é a graça?") is None
@@ -0,0 +1,115 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_huggingface")
+from src import retrieval
+from src.biblia_index import BibliaIndex
+
+
+class ColecaoFalsa:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def query(self, query_embeddings, n_results, where):
+        metadatas = []
+        for doc_id in self.ids:
+            livro, resto = doc_id.rsplit(" ", 1)
+            capitulo, faixa = resto.split(":")
+            inicio, fim = faixa.split("-")
+            metadatas.append({"livro": livro, "capitulo": int(capitulo), "versiculo_inicio": int(inicio), "versiculo_fim": int(fim)})
+        return {"ids": [self.ids], "metadatas": [metadatas], "distances": [[0.1 * (i + 1) for i in range(len(self.ids))]]}
+
+
+@pytest.fixture
+def servico(monkeypatch):
+    biblia = BibliaIndex({"antigoTestamento": [{"nome": "Gênesis", "abreviacao": "gn", "capitulos": [
+        {"capitulo": 1, "versiculos": [{"versiculo": v, "texto": f"g{v}"} for v in range(1, 10)]},
+    ]}]})
+    monkeypatch.setattr(retrieval, "obter_indice_biblia", lambda *a, **k: biblia)
+    servico = retrieval.RetrievalService.__new__(retrieval.RetrievalService)
+    servico._lock = threading.RLock()
+    servico.db = SimpleNamespace(biblia_path=None, functiom_embedder=SimpleNamespace(embed_query=lambda q: [[0.0]]))
+    return servico
+
+
+def _com_passagens(servico, ids):
+    servico._colecoes_auxiliares = {retrieval.PASSAGENS_COLLECTION: ColecaoFalsa(ids)}
+    return servico
+
+
+def test_passagens_sobrepostas_sao_unidas(servico):
+    passagens = _com_passagens(servico, ["Gênesis 1:3-6", "Gênesis 1:5-8"]).buscar_passagens("x", n_results=2, contexto=1)
+    assert [p["id"] for p in passagens] == ["Gênesis 1:3-8"]
+    assert [(v["versiculo"], v["destaque"]) for v in passagens[0]["versiculos"]][0] == (2, False)
+
+
+def test_passagem_desatualizada_e_ignorada(servico):
+    # Versículos 20-23 não existem mais no JSON (coleção ainda não sincronizada)
+    passagens = _com_passagens(servico, ["Gênesis 1:20-23", "Gênesis 1:1-4"]).buscar_passagens("x", n_results=2)
+    assert [p["id"] for p in passagens] == ["Gênesis 1:1-4"]
+
+
+def _versiculo(doc_id, distancia):
+    livro, resto = doc_id.rsplit(" ", 1)
+    capitulo, versiculo = resto.split(":")
+    return {"id": doc_id, "texto": "t", "livro": livro, "capitulo": int(capitulo), "versiculo": int(versiculo), "distancia": distancia}
+
+
+@pytest.fixture
+def bm25_falso():
+    ids = ["Gênesis 1:1", "Gênesis 1:2", "Gênesis 1:3"]
+    return SimpleNamespace(
+        ids=ids,
+        docs=[f"texto {i}" for i in ids],
+        metadatas=[{"livro": "Gênesis", "capitulo": 1, "versiculo": v} for v in (1, 2, 3)],
+    )
+
+
+def test_rrf_une_as_duas_listas(servico, bm25_falso):
+    vetoriais = [_versiculo("Gênesis 1:1", 0.2), _versiculo("Gênesis 1:2", 0.3)]
+    # Gênesis 1:3 só aparece no BM25 (1ª posição); Gênesis 1:1 aparece nas duas listas
+    lexicais = [(2, 5.0), (0, 3.0)]
+    fundidos = servico._fundir(vetoriais, lexicais, bm25_falso, n_results=3)
+
+    assert [r["id"] for r in fundidos] == ["Gênesis 1:1", "Gênesis 1:3", "Gênesis 1:2"]
+    k = retrieval.RRF_K
+    assert fundidos[0]["rrf"] == pytest.approx(1 / (k + 1) + 1 / (k + 2))
+    assert fundidos[1]["rrf"] == pytest.approx(1 / (k + 1))
+    assert fundidos[2]["rrf"] == pytest.approx(1 / (k + 2))
+    # Resultado vetorial mantém a distância; o encontrado só pelo BM25 vem sem distância
+    assert fundidos[0]["distancia"] == 0.2
+    assert fundidos[1]["distancia"] is None
+    assert fundidos[1]["texto"] == "texto Gênesis 1:3"
+
+
+def test_rrf_respeita_n_results(servico, bm25_falso):
+    fundidos = servico._fundir([_versiculo("Gênesis 1:1", 0.2)], [(1, 2.0), (2, 1.0)], bm25_falso, n_results=2)
+    assert [r["id"] for r in fundidos] == ["Gênesis 1:1", "Gênesis 1:2"]
+
+
+def test_hibrido_aplica_filtros_nas_duas_buscas(monkeypatch, servico, bm25_falso):
+    chamadas = {}
+
+    def buscar_lote(queries, n_results, **filtros):
+        chamadas["vetorial"] = filtros
+        return [[] for _ in queries]
+
+    def mascara(**filtros):
+        chamadas["bm25"] = filtros
+        return "mascara"
+
+    def buscar(query, k, mascara):
+        chamadas["mascara"] = mascara
+        return [(0, 1.0)]
+
+    bm25_falso.mascara, bm25_falso.buscar = mascara, buscar
+    monkeypatch.setattr(retrieval, "obter_indice_bm25", lambda: bm25_falso)
+    monkeypatch.setattr(servico, "buscar_lote", buscar_lote)
+
+    (resultado,) = servico.buscar_hibrido_lote(["luz"], livro="Gênesis", capitulo_min=1)
+    esperado = {"livro": "Gênesis", "capitulo_min": 1, "capitulo_max": None, "testamento": None}
+    assert chamadas == {"vetorial": esperado, "bm25": esperado, "mascara": "mascara"}
+    assert [r["id"] for r in resultado] == ["Gênesis 1:1"]
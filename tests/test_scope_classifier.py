@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+from src.scope_classifier import ScopeClassifier
+
+# Espaço de embeddings 2D de brinquedo: eixo x = bíblico, eixo y = fora do escopo
+VETORES = {
+    "dentro a": [1.0, 0.0], "dentro b": [0.9, 0.1],
+    "fora a": [0.0, 1.0], "fora b": [0.1, 0.9],
+    "biblica": [0.95, 0.05], "receita de bolo": [0.0, 1.0],
+    "levemente fora": [0.47, 0.53],
+}
+
+
+@pytest.fixture
+def classificador():
+    return ScopeClassifier(
+        lambda textos: [VETORES[t] for t in textos],
+        exemplos_dentro=["dentro a", "dentro b"],
+        exemplos_fora=["fora a", "fora b"],
+    )
+
+
+def test_aceita_e_recusa_com_confianca(classificador):
+    assert classificador.classificar("biblica")[0] is True
+    assert classificador.classificar("receita de bolo")[0] is False
+
+
+def test_recusa_pouco_confiante_vai_para_o_llm(classificador):
+    decisao, prob = classificador.classificar("levemente fora")
+    assert 0.05 < prob < 0.25
+    assert decisao is None
@@ -0,0 +1,51 @@
+import pytest
+from src import summary_cache
+from src.summary_cache import SummaryCache
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(summary_cache.time, "time", lambda: agora[0])
+    return agora
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SummaryCache(path=str(tmp_path / "resumos.sqlite3"), ttl_segundos=60)
+
+
+def test_acerto_e_erro_por_texto_modelo_e_versao(cache, relogio):
+    cache.put("Gênesis 1", "m", "v1", "resumo")
+    assert cache.get("Gênesis 1", "m", "v1") == "resumo"
+    assert cache.get("Gênesis 1", "m", "v2") is None
+    assert cache.get("Gênesis 1", "outro", "v1") is None
+    assert cache.get("Gênesis 2", "m", "v1") is None
+    assert cache.stats() == {"itens": 1, "hits": 1, "misses": 3, "hit_rate": 0.25}
+
+
+def test_entrada_expira_apos_o_ttl(cache, relogio):
+    cache.put("Gênesis 1", "m", "v1", "resumo")
+    relogio[0] += 59
+    assert cache.get("Gênesis 1", "m", "v1") == "resumo"
+    relogio[0] += 2
+    assert cache.get("Gênesis 1", "m", "v1") is None
+
+
+def test_invalidar_remove_expiradas_e_outras_versoes(cache, relogio):
+    cache.put("antigo", "m", "v2", "r")
+    relogio[0] += 120
+    cache.put("versao antiga", "m", "v1", "r")
+    cache.put("outro modelo", "outro", "v2", "r")
+    cache.put("atual", "m", "v2", "r")
+    assert cache.invalidar(modelo="m", versao_prompt="v2") == 3
+    assert cache.get("atual", "m", "v2") == "r"
+    assert cache.stats()["itens"] == 1
+
+
+def test_invalidar_sem_ttl_nem_filtros_nao_remove_nada(tmp_path):
+    cache = SummaryCache(path=str(tmp_path / "resumos.sqlite3"))
+    cache.put("Gênesis 1", "m", "v1", "resumo")
+    assert cache.invalidar() == 0
+    cache.limpar()
+    assert cache.stats()["itens"] == 0
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("langchain")
+from src.tools import interpretar_filtros
+
+
+def test_sem_filtros():
+    assert interpretar_filtros("perdão; misericórdia") == ("perdão; misericórdia", {})
+
+
+def test_filtros():
+    consulta, filtros = interpretar_filtros("perdão | livro=Mateus, testamento=Novo, capitulo=5-7")
+    assert consulta == "perdão"
+    assert filtros == {"livro": "Mateus", "testamento": "novoTestamento", "capitulo_min": 5, "capitulo_max": 7}
+
+
+@pytest.mark.parametrize("entrada", ["perdão | testamento=apocrifos", "perdão | autor=Paulo", "perdão | livro"])
+def test_filtro_invalido(entrada):
+    with pytest.raises(ValueError):
+        interpretar_filtros(entrada)
+
+
+def test_prewarm_continua_apos_falha(monkeypatch, caplog):
+    from src import tools
+    from src.biblia_index import BibliaIndex
+
+    capitulos = [{"capitulo": n, "versiculos": [{"versiculo": 1, "texto": f"capítulo {n}"}]} for n in range(1, 6)]
+    indice = BibliaIndex({"antigoTestamento": [{"nome": "Gênesis", "abreviacao": "gn", "capitulos": capitulos}]})
+
+    class CacheVazio:
+        def get(self, *args):
+            return None
+
+    def resumir(texto):
+        if texto == "capítulo 2":
+            raise RuntimeError("limite de requisições")
+        return "resumo"
+
+    monkeypatch.setattr(tools, "obter_indice_biblia", lambda: indice)
+    monkeypatch.setattr(tools, "obter_cache_resumos", CacheVazio)
+    monkeypatch.setattr(tools, "resumir_texto_com_llm", resumir)
+    assert tools.prewarm_resumos(max_workers=2) == 4
+    assert "falha ao resumir Gênesis 2" in caplog.text
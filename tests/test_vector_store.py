@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from src.biblia_index import BibliaIndex
+
+pytest.importorskip("langchain_core")
+from src.vector_store import NumpyVectorStore
+
+
+@pytest.fixture
+def biblia(capitulo):
+    return BibliaIndex({
+        "antigoTestamento": [{"nome": "Gênesis", "abreviacao": "gn", "capitulos": [capitulo(1, 10), capitulo(2, 10)]}],
+        "novoTestamento": [
+            {"nome": "Mateus", "abreviacao": "mt", "capitulos": [capitulo(n, 10) for n in range(1, 4)]},
+            {"nome": "Marcos", "abreviacao": "mc", "capitulos": [capitulo(1, 10)]},
+        ],
+    })
+
+
+@pytest.fixture
+def vetores(biblia):
+    # Vetores propositalmente sem normalização: o backend precisa normalizá-los
+    gerador = np.random.default_rng(7)
+    n = len(biblia.documentos()[1])
+    return (gerador.normal(size=(n, 16)) * gerador.uniform(0.5, 5.0, size=(n, 1))).astype(np.float32)
+
+
+def _referencia(vetores, consultas, k):
+    matriz = vetores / np.linalg.norm(vetores, axis=1, keepdims=True)
+    consultas = consultas / np.linalg.norm(consultas, axis=1, keepdims=True)
+    similaridades = matriz @ consultas.T
+    return np.argsort(-similaridades, axis=0)[:k].T, similaridades
+
+
+@pytest.mark.parametrize("precisao,tolerancia", [("float32", 1e-5), ("float16", 2e-3), ("int8", 2e-2)])
+def test_top_k_igual_a_forca_bruta(biblia, vetores, precisao, tolerancia):
+    consultas = np.random.default_rng(11).normal(size=(3, 16)).astype(np.float32) * 3
+    store = NumpyVectorStore(vetores, biblia, precisao=precisao)
+    resultados = store.buscar(consultas, n_results=5)
+    esperados, similaridades = _referencia(vetores, consultas, 5)
+    ids = biblia.documentos()[1]
+    posicao = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    for coluna, (resultado, esperado) in enumerate(zip(resultados, esperados)):
+        if precisao == "float32":
+            assert [r["id"] for r in resultado] == [ids[i] for i in esperado]
+        # Em precisão reduzida, empates próximos podem trocar de lugar, mas nenhum
+        # resultado pode ficar abaixo do k-ésimo da referência além da tolerância
+        quinto = similaridades[esperado[-1], coluna]
+        for r in resultado:
+            exata = similaridades[posicao[r["id"]], coluna]
+            assert 1.0 - r["distancia"] == pytest.approx(exata, abs=tolerancia)
+            assert exata >= quinto - 2 * tolerancia
+            assert 0.0 <= r["distancia"] <= 2.0
+        distancias = [r["distancia"] for r in resultado]
+        assert distancias == sorted(distancias)
+
+
+@pytest.mark.parametrize("filtros,aceito", [
+    ({"livro": "Mateus"}, lambda r: r["livro"] == "Mateus"),
+    ({"testamento": "antigo"}, lambda r: r["livro"] == "Gênesis"),
+    ({"livro": "mt", "capitulo_min": 2, "capitulo_max": 3}, lambda r: r["livro"] == "Mateus" and 2 <= r["capitulo"] <= 3),
+])
+def test_filtros(biblia, vetores, filtros, aceito):
+    store = NumpyVectorStore(vetores, biblia)
+    (resultado,) = store.buscar(vetores[:1], n_results=50, **filtros)
+    esperado = int(biblia.mascara(**filtros).sum())
+    assert len(resultado) == min(50, esperado)
+    assert all(aceito(r) for r in resultado)
+
+
+def test_filtro_sem_correspondencia(biblia, vetores):
+    store = NumpyVectorStore(vetores, biblia)
+    assert store.buscar(vetores[:1], n_results=5, livro="Inexistente") == [[]]
+    assert store.buscar(vetores[:1], n_results=5, livro="Marcos", capitulo_min=2) == [[]]